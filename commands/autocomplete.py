@@ -3,6 +3,7 @@ import discord
 from discord import app_commands
 from core import factories
 from core.base_models import EntityLinkType, EntityType, SystemType
+from core.utils import get_controlled_companion_ids
 from data.repositories.repository_factory import repositories
 from rpg_systems.fate.fate_character import FateCharacter
 from rpg_systems.mgt2e.mgt2e_character import MGT2ECharacter
@@ -14,7 +15,7 @@ from rpg_systems.mgt2e.mgt2e_character import MGT2ECharacter
 
 async def owned_player_character_names_autocomplete(interaction: discord.Interaction, current: str):
     """Autocomplete for getting owned player characters"""
-    all_chars = repositories.character.get_all_pcs_and_npcs_by_guild(interaction.guild.id)
+    all_chars = await repositories.run(repositories.character.get_all_pcs_and_npcs_by_guild, interaction.guild.id)
     pcs = [
         c for c in all_chars
         if not c.is_npc and str(c.owner_id) == str(interaction.user.id)
@@ -24,14 +25,14 @@ async def owned_player_character_names_autocomplete(interaction: discord.Interac
 
 async def all_pc_names_autocomplete(interaction: discord.Interaction, current: str):
     """Autocomplete for getting all PCs"""
-    all_chars = repositories.character.get_all_pcs_and_npcs_by_guild(interaction.guild.id)
+    all_chars = await repositories.run(repositories.character.get_all_pcs_and_npcs_by_guild, interaction.guild.id)
     pcs = [c for c in all_chars if not c.is_npc]
     options = [c.name for c in pcs if current.lower() in c.name.lower()]
     return [app_commands.Choice(name=name, value=name) for name in options[:25]]
 
 async def owned_character_npc_or_companion_autocomplete(interaction: discord.Interaction, current: str):
     """Autocomplete for commands that can target PCs, NPCs, and companions"""
-    all_chars = repositories.character.get_all_by_guild(interaction.guild.id)
+    all_chars = await repositories.run(repositories.character.get_all_by_guild, interaction.guild.id)
     
     # Check if user is GM
     is_gm = await repositories.server.has_gm_permission(interaction.guild.id, interaction.user)
@@ -49,21 +50,9 @@ async def owned_character_npc_or_companion_autocomplete(interaction: discord.Int
             # Users can see companions they own or that are controlled by their characters
             if str(c.owner_id) == str(interaction.user.id) or is_gm:
                 options.append(c.name)
-            else:
-                # Check if user owns any characters that control this companion
-                controlling_chars = repositories.link.get_parents(
-                    str(interaction.guild.id),
-                    c.id,
-                    EntityLinkType.CONTROLS.value
-                )
-                
-                user_controls_companion = any(
-                    str(controller.owner_id) == str(interaction.user.id) 
-                    for controller in controlling_chars
-                )
-                
-                if user_controls_companion:
-                    options.append(c.name)
+            elif c.id in await get_controlled_companion_ids(interaction):
+                # User owns a character that controls this companion
+                options.append(c.name)
     
     # Filter by current input
     filtered_options = [n for n in options if current.lower() in n.lower()]
@@ -71,7 +60,7 @@ async def owned_character_npc_or_companion_autocomplete(interaction: discord.Int
 
 async def owned_companion_autocomplete(interaction: discord.Interaction, current: str):
     """Autocomplete specifically for companion entities"""
-    all_chars = repositories.character.get_all_by_guild(interaction.guild.id)
+    all_chars = await repositories.run(repositories.character.get_all_by_guild, interaction.guild.id)
     
     # Check if user is GM
     is_gm = await repositories.server.has_gm_permission(interaction.guild.id, interaction.user)
@@ -83,21 +72,9 @@ async def owned_companion_autocomplete(interaction: discord.Interaction, current
             # Users can see companions they own or that are controlled by their characters
             if str(c.owner_id) == str(interaction.user.id) or is_gm:
                 options.append(c.name)
-            else:
-                # Check if user owns any characters that control this companion
-                controlling_chars = repositories.link.get_parents(
-                    str(interaction.guild.id),
-                    c.id,
-                    EntityLinkType.CONTROLS.value
-                )
-                
-                user_controls_companion = any(
-                    str(controller.owner_id) == str(interaction.user.id) 
-                    for controller in controlling_chars
-                )
-                
-                if user_controls_companion:
-                    options.append(c.name)
+            elif c.id in await get_controlled_companion_ids(interaction):
+                # User owns a character that controls this companion
+                options.append(c.name)
     
     # Filter by current input
     filtered_options = [name for name in options if current.lower() in name.lower()]
@@ -109,10 +86,10 @@ async def owned_player_characters_autocomplete(interaction: discord.Interaction,
     
     if is_gm:
         # GMs can see all entities as potential owners
-        characters = repositories.character.get_all_pcs_and_npcs_by_guild(str(interaction.guild.id))
+        characters = await repositories.run(repositories.character.get_all_pcs_and_npcs_by_guild, str(interaction.guild.id))
     else:
         # Users can only use their own entities as owners
-        characters = repositories.character.get_user_characters(str(interaction.guild.id), str(interaction.user.id))
+        characters = await repositories.run(repositories.character.get_user_characters, str(interaction.guild.id), str(interaction.user.id))
     
     # Filter by current input
     filtered_entities = [
@@ -127,7 +104,7 @@ async def owned_player_characters_autocomplete(interaction: discord.Interaction,
 
 async def active_player_characters_autocomplete(interaction: discord.Interaction, current: str):
     """Autocomplete for active player characters in the current guild"""
-    active_chars = repositories.active_character.get_all_active_characters(interaction.guild.id)
+    active_chars = await repositories.run(repositories.active_character.get_all_active_characters, interaction.guild.id)
     
     # Filter characters based on permissions
     options = list[str]()
@@ -146,7 +123,7 @@ async def multi_character_autocomplete(interaction: discord.Interaction, current
     already_selected = [part.strip() for part in parts[:-1]] if len(parts) > 1 else []
     
     # Get available characters (excluding already selected)
-    all_chars = repositories.character.get_all_pcs_and_npcs_by_guild(str(interaction.guild.id))
+    all_chars = await repositories.run(repositories.character.get_all_pcs_and_npcs_by_guild, str(interaction.guild.id))
     is_gm = await repositories.server.has_gm_permission(str(interaction.guild.id), interaction.user)
     
     available_chars = []
@@ -167,21 +144,9 @@ async def multi_character_autocomplete(interaction: discord.Interaction, current
         elif char.entity_type == EntityType.COMPANION:
             if str(char.owner_id) == str(interaction.user.id) or is_gm:
                 available_chars.append(char.name)
-            else:
-                # Check if user owns any characters that control this companion
-                controlling_chars = repositories.link.get_parents(
-                    str(interaction.guild.id),
-                    char.id,
-                    EntityLinkType.CONTROLS.value
-                )
-                
-                user_controls_companion = any(
-                    str(controller.owner_id) == str(interaction.user.id) 
-                    for controller in controlling_chars
-                )
-                
-                if user_controls_companion:
-                    available_chars.append(char.name)
+            elif char.id in await get_controlled_companion_ids(interaction):
+                # User owns a character that controls this companion
+                available_chars.append(char.name)
     
     # Build the choice values (preserve what's already typed + add new selection)
     prefix = ', '.join(already_selected)
@@ -220,7 +185,7 @@ async def multi_character_autocomplete(interaction: discord.Interaction, current
 
 async def entity_type_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     """Autocomplete for entity types based on current system"""
-    system = repositories.server.get_system(str(interaction.guild.id))
+    system = await repositories.run(repositories.server.get_system, str(interaction.guild.id))
     valid_types = factories.get_system_entity_types(system)
     
     # Filter based on user input
@@ -240,7 +205,8 @@ async def accessible_entities_autocomplete(interaction: discord.Interaction, cur
     is_gm = await repositories.server.has_gm_permission(str(interaction.guild.id), interaction.user)
     
     # Get all entities the user can access
-    accessible_entities = repositories.entity.get_all_accessible(
+    accessible_entities = await repositories.run(
+        repositories.entity.get_all_accessible,
         str(interaction.guild.id), 
         str(interaction.user.id), 
         is_gm
@@ -262,11 +228,8 @@ async def accessible_entities_autocomplete(interaction: discord.Interaction, cur
             elif entity.access_type == "public":
                 access_indicator = " [PUBLIC]"
             else:
-                # Check if controlled
-                controlled_entities = repositories.entity.get_entities_controlled_by_user(
-                    str(interaction.guild.id), str(interaction.user.id)
-                )
-                if any(e.id == entity.id for e in controlled_entities):
+                # Check if controlled (off the event loop, since the link graph may need to load the guild)
+                if await repositories.run(repositories.link_graph.user_controls, str(interaction.guild.id), str(interaction.user.id), entity.id):
                     access_indicator = " [CONTROLLED]"
                 else:
                     access_indicator = " [ACCESS]"
@@ -285,7 +248,8 @@ async def top_level_entities_autocomplete(interaction: discord.Interaction, curr
     is_gm = await repositories.server.has_gm_permission(str(interaction.guild.id), interaction.user)
     
     # Get all entities the user can access
-    entities = repositories.entity.get_all_accessible(
+    entities = await repositories.run(
+        repositories.entity.get_all_accessible,
         str(interaction.guild.id), 
         str(interaction.user.id), 
         is_gm
@@ -308,11 +272,8 @@ async def top_level_entities_autocomplete(interaction: discord.Interaction, curr
             elif entity.access_type == "public":
                 access_indicator = " [PUBLIC]"
             else:
-                # Check if controlled
-                controlled_entities = repositories.entity.get_entities_controlled_by_user(
-                    str(interaction.guild.id), str(interaction.user.id)
-                )
-                if any(e.id == entity.id for e in controlled_entities):
+                # Check if controlled (off the event loop, since the link graph may need to load the guild)
+                if await repositories.run(repositories.link_graph.user_controls, str(interaction.guild.id), str(interaction.user.id), entity.id):
                     access_indicator = " [CONTROLLED]"
                 else:
                     access_indicator = " [ACCESS]"
@@ -352,7 +313,7 @@ async def initiative_type_autocomplete(
 
 async def initiative_participant_names_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     """Autocomplete for participants in the current initiative."""
-    initiative = repositories.initiative.get_active_initiative(str(interaction.guild.id), str(interaction.channel.id))
+    initiative = await repositories.run(repositories.initiative.get_active_initiative, str(interaction.guild.id), str(interaction.channel.id))
     if not initiative:
         return []
     # Only suggest names that match the current input
@@ -368,12 +329,12 @@ async def initiative_addable_names_autocomplete(interaction: discord.Interaction
     """
     guild_id = str(interaction.guild.id)
     channel_id = str(interaction.channel.id)
-    initiative = repositories.initiative.get_active_initiative(guild_id, channel_id)
+    initiative = await repositories.run(repositories.initiative.get_active_initiative, guild_id, channel_id)
     if not initiative:
         return []
 
     # Get all PCs and NPCs in the guild
-    all_chars = repositories.character.get_all_pcs_and_npcs_by_guild(guild_id)
+    all_chars = await repositories.run(repositories.character.get_all_pcs_and_npcs_by_guild, guild_id)
     # Names already in initiative (case-insensitive)
     in_initiative = {p.name.lower() for p in initiative.participants}
 
@@ -419,7 +380,7 @@ async def ic_channels_autocomplete(interaction: discord.Interaction, current: st
         return []
     
     # Get all IC channels for this guild
-    all_channels = repositories.channel_permissions.get_all_channel_permissions(str(interaction.guild.id))
+    all_channels = await repositories.run(repositories.channel_permissions.get_all_channel_permissions, str(interaction.guild.id))
     if not all_channels:
         return []
     ic_channel_ids = [channel.channel_id for channel in all_channels if channel.channel_type == 'ic']
@@ -445,7 +406,7 @@ async def ic_channels_autocomplete(interaction: discord.Interaction, current: st
 
 async def roll_parameters_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     """Provide helpful autocomplete for roll parameters based on the system"""
-    system = repositories.server.get_system(str(interaction.guild.id))
+    system = await repositories.run(repositories.server.get_system, str(interaction.guild.id))
     
     choices = []
     
@@ -503,7 +464,7 @@ async def _get_fate_roll_parameter_choices(guild_id: str, current: str, parts: L
         skill_part = current_typing[6:]  # Remove "skill:" prefix
         
         # Get default skills for this guild/system
-        default_skills = repositories.default_skills.get_default_skills(guild_id, SystemType.FATE)
+        default_skills = await repositories.run(repositories.default_skills.get_default_skills, guild_id, SystemType.FATE)
         if not default_skills:
             default_skills = FateCharacter.DEFAULT_SKILLS
         
@@ -601,7 +562,7 @@ async def _get_mgt2e_roll_parameter_choices(guild_id: str, current: str, parts:
         skill_part = current_typing[6:]  # Remove "skill:" prefix
         
         # Get default skills for this guild/system
-        default_skills = repositories.default_skills.get_default_skills(guild_id, SystemType.MGT2E)
+        default_skills = await repositories.run(repositories.default_skills.get_default_skills, guild_id, SystemType.MGT2E)
         if not default_skills:
             default_skills = MGT2ECharacter.DEFAULT_SKILLS
         
@@ -698,7 +659,7 @@ async def homebrew_rules_autocomplete(interaction: discord.Interaction, current:
         List of app_commands.Choice objects for autocomplete
     """
     try:
-        homebrew_rules = repositories.homebrew.get_all_homebrew_rules(str(interaction.guild.id))
+        homebrew_rules = await repositories.run(repositories.homebrew.get_all_homebrew_rules, str(interaction.guild.id))
         options = [rule.rule_name for rule in homebrew_rules if current.lower() in rule.rule_name.lower()]
         return [app_commands.Choice(name=name, value=name) for name in options[:25]]
     except Exception:
@@ -710,13 +671,13 @@ async def homebrew_rules_autocomplete(interaction: discord.Interaction, current:
 # =================================================
 
 async def npcs_not_in_scene_autocomplete(interaction: discord.Interaction, current: str):
-    all_chars = repositories.character.get_all_pcs_and_npcs_by_guild(str(interaction.guild.id))
-    active_scene = repositories.scene.get_active_scene(str(interaction.guild.id))
+    all_chars = await repositories.run(repositories.character.get_all_pcs_and_npcs_by_guild, str(interaction.guild.id))
+    active_scene = await repositories.run(repositories.scene.get_active_scene, str(interaction.guild.id))
     
     if not active_scene:
         return []
 
-    scene_npcs = set(repositories.scene_npc.get_scene_npc_ids(str(interaction.guild.id), str(active_scene.scene_id)))
+    scene_npcs = set(await repositories.run(repositories.scene_npc.get_scene_npc_ids, str(interaction.guild.id), str(active_scene.scene_id)))
     npcs = [
         c for c in all_chars
         if c.is_npc and c.id not in scene_npcs and current.lower() in c.name.lower()
@@ -725,17 +686,17 @@ async def npcs_not_in_scene_autocomplete(interaction: discord.Interaction, curre
     return [app_commands.Choice(name=name, value=name) for name in options[:25]]
 
 async def npcs_in_scene_autocomplete(interaction: discord.Interaction, current: str):
-    active_scene = repositories.scene.get_active_scene(str(interaction.guild.id))
+    active_scene = await repositories.run(repositories.scene.get_active_scene, str(interaction.guild.id))
     if not active_scene:
         return []
-    all_chars = repositories.scene_npc.get_scene_npcs(str(interaction.guild.id), active_scene.scene_id)
+    all_chars = await repositories.run(repositories.scene_npc.get_scene_npcs, str(interaction.guild.id), active_scene.scene_id)
     
     npcs = [c for c in all_chars]
     options = [c.name for c in npcs]
     return [app_commands.Choice(name=name, value=name) for name in options[:25]]
 
 async def scene_names_autocomplete(interaction: discord.Interaction, current: str):
-    scenes = repositories.scene.get_all_scenes(str(interaction.guild.id))
+    scenes = await repositories.run(repositories.scene.get_all_scenes, str(interaction.guild.id))
     return [
         app_commands.Choice(name=f"{s.name}{'✓' if s.is_active else ''}", value=s.name)
         for s in scenes
@@ -4,7 +4,7 @@ from discord.ext import commands
 from commands.autocomplete import owned_character_npc_or_companion_autocomplete, owned_companion_autocomplete, all_pc_names_autocomplete, owned_player_character_names_autocomplete
 from core.base_models import AccessType, BaseCharacter, EntityType, EntityLinkType
 from core.command_decorators import gm_role_required, no_ic_channels, player_or_gm_role_required
-from core.utils import _can_user_edit_character, _can_user_view_character, _check_character_possessions, _get_character_by_name_or_nickname, _resolve_character, _set_character_avatar
+from core.utils import _can_user_edit_character, _can_user_view_character, _check_character_possessions, _get_character_by_name_or_nickname, _resolve_character, _set_character_avatar, get_controlled_companion_ids
 from data.repositories.repository_factory import repositories
 import core.factories as factories
 
@@ -98,25 +98,13 @@ class CharacterCommands(commands.Cog):
                 await interaction.followup.send("❌ Only GMs can view NPCs.", ephemeral=True)
                 return
             # Show only user's characters and companions they control
+            controlled_companion_ids = await get_controlled_companion_ids(interaction)
             user_characters = []
             for char in characters:
                 if char.owner_id == str(interaction.user.id):
                     user_characters.append(char)
-                elif char.entity_type == EntityType.COMPANION:
-                    # Check if user owns any characters that control this companion
-                    controlling_chars = repositories.link.get_parents(
-                        str(interaction.guild.id),
-                        char.id,
-                        EntityLinkType.CONTROLS.value
-                    )
-                    
-                    user_controls_companion = any(
-                        str(controller.owner_id) == str(interaction.user.id) 
-                        for controller in controlling_chars
-                    )
-                    
-                    if user_controls_companion:
-                        user_characters.append(char)
+                elif char.entity_type == EntityType.COMPANION and char.id in controlled_companion_ids:
+                    user_characters.append(char)
             
             characters = user_characters
         else:
@@ -135,26 +123,20 @@ class CharacterCommands(commands.Cog):
         embed = discord.Embed(title=title, color=discord.Color.blue())
         
         if show_links:
-            # Show detailed information for CONTROLS links
+            # Show detailed information for CONTROLS links, summarized for every character at once
+            link_summaries = repositories.entity_details.get_link_summaries(
+                str(interaction.guild.id),
+                [char.id for char in characters]
+            )
             character_info = []
             for char in characters:
-                controlled_by = repositories.link.get_parents(
-                    str(interaction.guild.id), 
-                    char.id, 
-                    EntityLinkType.CONTROLS.value
-                )
-                
-                controls_entities = repositories.link.get_children(
-                    str(interaction.guild.id),
-                    char.id,
-                    EntityLinkType.CONTROLS.value
-                )
+                summary = link_summaries[char.id]
                 
                 info = f"**{char.name}** ({char.entity_type.value.upper()})"
-                if controlled_by:
-                    info += f"\n  *Controlled by: {', '.join([c.name for c in controlled_by])}*"
-                if controls_entities:
-                    info += f"\n  *Controls: {', '.join([e.name for e in controls_entities])}*"
+                if summary.controlled_by:
+                    info += f"\n  *Controlled by: {', '.join([c['name'] for c in summary.controlled_by])}*"
+                if summary.controls:
+                    info += f"\n  *Controls: {', '.join([e['name'] for e in summary.controls])}*"
 
                 character_info.append(info)
             
@@ -177,17 +159,17 @@ class CharacterCommands(commands.Cog):
                 )
             
             if companions:
+                # Who controls each companion, looked up for all of them at once
+                link_summaries = repositories.entity_details.get_link_summaries(
+                    str(interaction.guild.id),
+                    [char.id for char in companions]
+                )
                 companion_lines = []
                 for char in companions:
-                    # Get who controls this companion
-                    controlling_chars = repositories.link.get_parents(
-                        str(interaction.guild.id),
-                        char.id,
-                        EntityLinkType.CONTROLS.value
-                    )
+                    controlling_chars = link_summaries[char.id].controlled_by
                     
                     if controlling_chars:
-                        controller_names = [c.name for c in controlling_chars]
+                        controller_names = [c['name'] for c in controlling_chars]
                         companion_lines.append(f"• {char.name} (controlled by {', '.join(controller_names)})")
                     else:
                         companion_lines.append(f"• {char.name} (no controller)")
@@ -317,11 +299,17 @@ class CharacterCommands(commands.Cog):
     @player_or_gm_role_required()
     @no_ic_channels()
     async def switch(self, interaction: discord.Interaction, char_name: str):
-        user_chars = repositories.character.get_user_characters(interaction.guild.id, interaction.user.id)
-        character = next(
-            (c for c in user_chars if c.name.lower() == char_name.lower()),
-            None
-        )
+        # Other entities may share the name up to case, so pick among the ones that are the user's own characters
+        character = None
+        for character_id in await repositories.run(repositories.name_index.get_entity_ids_by_name, interaction.guild.id, char_name):
+            candidate = await repositories.run(repositories.character.get_by_id, character_id)
+            if (
+                candidate
+                and str(candidate.owner_id) == str(interaction.user.id)
+                and candidate.entity_type in (EntityType.PC, EntityType.COMPANION)
+            ):
+                character = candidate
+                break
         if not character:
             await interaction.response.send_message(f"❌ You don't have a character named `{char_name}`.", ephemeral=True)
             return
@@ -559,17 +547,15 @@ class CharacterCommands(commands.Cog):
             # List all companions controlled by user's characters
             user_chars = repositories.character.get_user_characters(str(interaction.guild.id), str(interaction.user.id), include_npcs=is_gm)
             
+            link_summaries = repositories.entity_details.get_link_summaries(
+                str(interaction.guild.id),
+                [char.id for char in user_chars]
+            )
             all_companions = []
             for char in user_chars:
-                companions = repositories.link.get_children(
-                    str(interaction.guild.id),
-                    char.id,
-                    EntityLinkType.CONTROLS.value
-                )
-                companions = [c for c in companions if c.entity_type == EntityType.COMPANION]
-                
-                for comp in companions:
-                    all_companions.append((char.name, comp.name))
+                for comp in link_summaries[char.id].controls:
+                    if comp['entity_type'] == EntityType.COMPANION.value:
+                        all_companions.append((char.name, comp['name']))
             
             if not all_companions:
                 await interaction.followup.send("You have no companions.", ephemeral=True)
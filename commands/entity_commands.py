@@ -149,13 +149,13 @@ class EntityCommands(commands.Cog):
                 await interaction.followup.send(f"❌ Owner entity `{owner_entity}` not found.", ephemeral=True)
                 return
             
-            entities = repositories.link.get_children(
-                str(interaction.guild.id), 
-                owner.id, 
-                EntityLinkType.POSSESSES.value
-            )
+            # Two levels of the possession tree give the entities and their possessed counts in one query
+            tree = owner.get_possession_tree(str(interaction.guild.id), max_depth=2)
+            entities = [node.entity for node in tree.children]
+            possessed_counts = {node.entity.id: len(node.children) for node in tree.children}
             title = f"Entities possessed by {owner.name}"
         else:
+            possessed_counts = None
             # Get accessible entities for this user
             entities = repositories.entity.get_all_accessible(
                 str(interaction.guild.id), 
@@ -166,7 +166,7 @@ class EntityCommands(commands.Cog):
             # Filter to only entities that are not owned by other entities
             top_level_entities = []
             for entity in entities:
-                owners = repositories.link.get_parents(
+                owners = repositories.link_graph.get_parent_ids(
                     str(interaction.guild.id), 
                     entity.id, 
                     EntityLinkType.POSSESSES.value
@@ -214,13 +214,16 @@ class EntityCommands(commands.Cog):
                         entry += " (your PC)"
                 
                 # Show possessed entities count if any
-                possessed_entities = repositories.link.get_children(
-                    str(interaction.guild.id), 
-                    entity.id, 
-                    EntityLinkType.POSSESSES.value
-                )
-                if possessed_entities:
-                    entry += f" ({len(possessed_entities)} possessed)"
+                if possessed_counts is not None:
+                    possessed_count = possessed_counts.get(entity.id, 0)
+                else:
+                    possessed_count = len(repositories.link.get_children(
+                        str(interaction.guild.id), 
+                        entity.id, 
+                        EntityLinkType.POSSESSES.value
+                    ))
+                if possessed_count:
+                    entry += f" ({possessed_count} possessed)"
                 
                 entity_list.append(entry)
             
@@ -450,35 +453,17 @@ class EntityCommands(commands.Cog):
             await interaction.followup.send(f"❌ Invalid access type. Must be 'public' or 'gm_only'.", ephemeral=True)
             return
         
-        # Get all possessed entities recursively
-        def get_all_possessed_recursively(entity_id: str, visited: set = None) -> List[BaseEntity]:
-            """Recursively get all possessed entities to avoid infinite loops"""
-            if visited is None:
-                visited = set()
-            
-            if entity_id in visited:
-                return []
-            
-            visited.add(entity_id)
-            possessed = repositories.link.get_children(
-                str(interaction.guild.id), 
-                entity_id, 
-                EntityLinkType.POSSESSES.value
-            )
-            
-            all_possessed = possessed.copy()
-            for child in possessed:
-                all_possessed.extend(get_all_possessed_recursively(child.id, visited))
-            
-            return all_possessed
-        
         # Set access for the main entity
         entity.set_access_type(new_access_type)
         system = repositories.server.get_system(str(interaction.guild.id))
         repositories.entity.upsert_entity(str(interaction.guild.id), entity, system=system)
         
-        # Get all possessed entities
-        all_possessed = get_all_possessed_recursively(entity.id)
+        # Get all possessed entities at any depth (the possession tree stops at POSSESSION_TREE_MAX_DEPTH)
+        all_possessed = repositories.link.get_descendants(
+            str(interaction.guild.id),
+            entity.id,
+            EntityLinkType.POSSESSES.value
+        )
         
         # Set access for all possessed entities
         updated_count = 1  # Count the main entity
@@ -114,7 +114,9 @@ class HelpCommands(commands.Cog):
                 "Roll dice for your character or request rolls from others.\n"
                 "• `/roll check [parameters] [difficulty]` - Roll dice for your active character\n"
                 "• `/roll custom` - Open the custom roll UI\n"
+                "• `/roll odds [formula] [modifier] [difficulty]` - See the exact odds of a roll\n"
                 "• `/roll request [chars] [parameters]` - (GM) Request rolls from players\n"
+                "• `/roll group [chars] [parameters]` - (GM) Roll the same check for several characters at once\n"
                 "Roll parameters autocomplete based on your RPG system."
             ),
             color=discord.Color.purple()
@@ -219,6 +221,7 @@ class HelpCommands(commands.Cog):
                 "• `/setup default-skills-file [.txt file]` - Set default skills (GM)\n"
                 "• `/setup openai set-api-key [api_key]` - Set OpenAI API key (GM)\n"
                 "• `/setup channel type [channel] [type]` - Set channel restrictions (GM)\n"
+                "• `/setup diagnostics` - Show database query timings and cache stats (Admin)\n"
                 "See `/setup ...` commands for more."
             ),
             color=discord.Color.dark_gold()
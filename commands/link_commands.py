@@ -62,7 +62,7 @@ class LinkCommands(commands.Cog):
             return
         
         # Check if link already exists
-        existing = repositories.link.get_link_by_entities(
+        existing = repositories.link_graph.has_link(
             str(interaction.guild.id), from_char.id, to_char.id, link_type
         )
         
@@ -204,12 +204,8 @@ class LinkCommands(commands.Cog):
             await interaction.response.send_message(f"❌ Entity '{entity_name}' not found.", ephemeral=True)
             return
         
-        # Get all links involving this entity using the view
-        entity_details = repositories.entity_details.get_by_id(entity.id)
-        
-        if not entity_details:
-             await interaction.response.send_message(f"**{entity_name}** has no links.", ephemeral=True)
-             return
+        # Get all links involving this entity from the maintained link summary
+        entity_details = repositories.entity_details.get_link_summary(str(interaction.guild.id), entity.id)
 
         embed = discord.Embed(
             title=f"🔗 Links for {entity_name}",
@@ -219,7 +215,7 @@ class LinkCommands(commands.Cog):
         outgoing_links = []
         incoming_links = []
 
-        # Add pre-aggregated links from the view
+        # Add pre-aggregated links
         if entity_details.possessed_items:
             outgoing_links.extend([f"• **Possesses** {entity['name']}" for entity in entity_details.possessed_items])
         if entity_details.controls:
@@ -293,8 +289,8 @@ class LinkCommands(commands.Cog):
             return
         
         current_possessor = current_possessors[0]
-        current_links = current_possessor.get_links_to_entity(guild_id, item.id, EntityLinkType.POSSESSES)
-        current_quantity = current_links[0].metadata.get("quantity", 1) if current_links else 1
+        current_link = repositories.link.get_link_by_entities(guild_id, current_possessor.id, item.id, EntityLinkType.POSSESSES.value)
+        current_quantity = current_link.metadata.get("quantity", 1) if current_link else 1
         
         # Determine transfer quantity
         transfer_quantity = quantity if quantity is not None else current_quantity
@@ -330,10 +326,10 @@ class LinkCommands(commands.Cog):
         guild_id = str(interaction.guild.id)
         
         # Remove existing ownership links
-        existing_possessors = repositories.link.get_parents(guild_id, entity.id, EntityLinkType.POSSESSES.value)
-        for possessor in existing_possessors:
+        existing_possessor_ids = repositories.link_graph.get_parent_ids(guild_id, entity.id, EntityLinkType.POSSESSES.value)
+        for possessor_id in existing_possessor_ids:
             repositories.link.delete_links_by_entities(
-                guild_id, possessor.id, entity.id, EntityLinkType.POSSESSES.value
+                guild_id, possessor_id, entity.id, EntityLinkType.POSSESSES.value
             )
         
         # Create new ownership link
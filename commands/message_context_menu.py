@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from core.utils import _get_character_by_name_or_nickname
+from commands.narration import NARRATION_WEBHOOK_NAME, is_narration_webhook
 
 
 async def can_user_edit_message(guild_id: int, user: discord.User, message: discord.Message) -> bool:
@@ -36,15 +37,16 @@ async def edit_narration_context(interaction: discord.Interaction, message: disc
         await interaction.response.send_message("❌ This is not a narrated message.", ephemeral=True)
         return
         
-    # Get the webhook to verify it's ours
-    try:
-        webhook = await interaction.client.fetch_webhook(message.webhook_id)
-        if webhook.name != "RoleByPostCharacters":
-            await interaction.response.send_message("❌ This is not a narrated message from this bot.", ephemeral=True)
+    # Get the webhook to verify it's ours (skip the fetch for webhooks we already know)
+    if not is_narration_webhook(message.webhook_id):
+        try:
+            webhook = await interaction.client.fetch_webhook(message.webhook_id)
+            if webhook.name != NARRATION_WEBHOOK_NAME:
+                await interaction.response.send_message("❌ This is not a narrated message from this bot.", ephemeral=True)
+                return
+        except:
+            await interaction.response.send_message("❌ Unable to verify message origin.", ephemeral=True)
             return
-    except:
-        await interaction.response.send_message("❌ Unable to verify message origin.", ephemeral=True)
-        return
         
     # Check if user has permission to edit this message
     if not await can_user_edit_message(interaction.guild.id, interaction.user, message):
@@ -63,15 +65,16 @@ async def view_character_sheet_from_narration_context(interaction: discord.Inter
         await interaction.response.send_message("❌ This is not a narrated message.", ephemeral=True)
         return
 
-    # Get the webhook to verify it's ours
-    try:
-        webhook = await interaction.client.fetch_webhook(message.webhook_id)
-        if webhook.name != "RoleByPostCharacters":
-            await interaction.response.send_message("❌ This is not a narrated message from this bot.", ephemeral=True)
+    # Get the webhook to verify it's ours (skip the fetch for webhooks we already know)
+    if not is_narration_webhook(message.webhook_id):
+        try:
+            webhook = await interaction.client.fetch_webhook(message.webhook_id)
+            if webhook.name != NARRATION_WEBHOOK_NAME:
+                await interaction.response.send_message("❌ This is not a narrated message from this bot.", ephemeral=True)
+                return
+        except:
+            await interaction.response.send_message("❌ Unable to verify message origin.", ephemeral=True)
             return
-    except:
-        await interaction.response.send_message("❌ Unable to verify message origin.", ephemeral=True)
-        return
 
     # Check if user has permission to view this message
     if not await can_user_edit_message(interaction.guild.id, interaction.user, message):
@@ -1,17 +1,104 @@
 import re
+import asyncio
+import logging
+from typing import Dict
 import discord
 from core.base_models import BaseCharacter, EntityType, SystemType
 import core.factories as factories
 from data.repositories.repository_factory import repositories
 from core.utils import _get_character_by_name_or_nickname
 
+NARRATION_WEBHOOK_NAME = "RoleByPostCharacters"
+
+# Narration webhooks by channel id, so posting doesn't list a channel's webhooks every time
+_narration_webhooks: Dict[int, discord.Webhook] = {}
+_narration_webhook_locks: Dict[int, asyncio.Lock] = {}
+
+async def get_narration_webhook(channel: discord.TextChannel) -> discord.Webhook:
+    """Get the bot's narration webhook for a channel, finding or creating it on first use"""
+    webhook = _narration_webhooks.get(channel.id)
+    if webhook:
+        return webhook
+    
+    lock = _narration_webhook_locks.setdefault(channel.id, asyncio.Lock())
+    async with lock:
+        # Another narration may have populated the registry while we waited
+        webhook = _narration_webhooks.get(channel.id)
+        if not webhook:
+            webhook = next((wh for wh in await channel.webhooks() if wh.name == NARRATION_WEBHOOK_NAME), None) or await channel.create_webhook(name=NARRATION_WEBHOOK_NAME)
+            _narration_webhooks[channel.id] = webhook
+    return webhook
+
+def evict_narration_webhook(channel_id: int) -> None:
+    """Forget the cached narration webhook for a channel"""
+    _narration_webhooks.pop(channel_id, None)
+
+async def refresh_narration_webhook(channel) -> None:
+    """
+    Handle a webhooks update for a channel. Creating the narration webhook triggers one too,
+    so the cached webhook is only forgotten if it's no longer in the channel under our name.
+    """
+    cached = _narration_webhooks.get(channel.id)
+    if cached is None or not hasattr(channel, 'webhooks'):
+        return
+    try:
+        webhooks = await channel.webhooks()
+    except discord.HTTPException as e:
+        logging.warning(f"Could not list webhooks for channel {channel.id}: {e}")
+        webhooks = []
+    still_there = any(wh.id == cached.id and wh.name == NARRATION_WEBHOOK_NAME for wh in webhooks)
+    if not still_there and _narration_webhooks.get(channel.id) is cached:
+        evict_narration_webhook(channel.id)
+
+def is_narration_webhook(webhook_id: int) -> bool:
+    """Check whether a webhook id belongs to a cached narration webhook"""
+    return any(webhook.id == webhook_id for webhook in _narration_webhooks.values())
+
+async def _send_with_narration_webhook(channel: discord.TextChannel, **kwargs) -> None:
+    """Send through the channel's narration webhook, replacing it once if it was deleted"""
+    webhook = await get_narration_webhook(channel)
+    try:
+        await webhook.send(**kwargs)
+    except discord.NotFound:
+        evict_narration_webhook(channel.id)
+        webhook = await get_narration_webhook(channel)
+        await webhook.send(**kwargs)
+
+async def preload_narration_webhooks(bot: discord.Client) -> int:
+    """Look up existing narration webhooks for every IC channel so the first post in each skips the lookup"""
+    count = 0
+    for guild in bot.guilds:
+        try:
+            permissions = await repositories.run(repositories.channel_permissions.get_all_channel_permissions, str(guild.id))
+        except Exception as e:
+            logging.error(f"Error loading channel permissions for guild {guild.id}: {e}")
+            continue
+        
+        for permission in permissions:
+            if permission.channel_type != 'ic':
+                continue
+            channel = guild.get_channel(int(permission.channel_id))
+            if not channel or channel.id in _narration_webhooks or not hasattr(channel, 'webhooks'):
+                continue
+            if not channel.permissions_for(guild.me).manage_webhooks:
+                continue
+            try:
+                webhook = next((wh for wh in await channel.webhooks() if wh.name == NARRATION_WEBHOOK_NAME), None)
+            except discord.HTTPException as e:
+                logging.warning(f"Could not list webhooks for channel {channel.id}: {e}")
+                continue
+            if webhook:
+                _narration_webhooks[channel.id] = webhook
+                count += 1
+    return count
+
 async def process_narration(message: discord.Message):
     """Process messages with special prefixes for character speech and GM narration."""
     if not message.guild:
         return  # Only process in guild channels
     
     # Check channel restrictions for narration
-    channel_type = repositories.channel_permissions.get_channel_type(
+    channel_type = await repositories.channel_permissions.get_channel_type_async(
         str(message.guild.id), 
         str(message.channel.id)
     )
@@ -60,7 +147,7 @@ async def process_narration(message: discord.Message):
     # Handle special cases first
     if first_part.lower() == 'pc':
         # pc::message format - use active character
-        character = repositories.active_character.get_active_character(guild_id, user_id)
+        character = await repositories.run(repositories.active_character.get_active_character, guild_id, user_id)
         if not character:
             await message.channel.send("❌ You don't have an active character set. Use `/char switch` first.", delete_after=10)
             try:
@@ -177,16 +264,12 @@ async def can_user_speak_as_character(guild_id: int, user_id: int, character: Ba
     
     # If it's a companion, check if user owns any characters that control this companion
     if character.entity_type == EntityType.COMPANION:
-        from core.base_models import EntityLinkType
-        controlling_chars = repositories.link.get_parents(
+        return await repositories.run(
+            repositories.link_graph.user_controls,
             str(guild_id),
-            character.id,
-            EntityLinkType.CONTROLS.value
+            str(user_id),
+            character.id
         )
-        
-        for controller in controlling_chars:
-            if str(controller.owner_id) == str(user_id):
-                return True
     
     return False
 
@@ -200,8 +283,8 @@ async def process_gm_narration(message: discord.Message, narration_content: str)
         await message.channel.send("❌ I need 'Manage Webhooks' permission to send GM narration.", delete_after=10)
         return
     
-    # Get or create the webhook
-    webhook = next((wh for wh in await target_channel.webhooks() if wh.name == "RoleByPostCharacters"), None) or await target_channel.create_webhook(name="RoleByPostCharacters")
+    # Webhooks live on the parent channel when narrating in a thread
+    webhook_channel = target_channel.parent if isinstance(target_channel, discord.Thread) else target_channel
     
     # Create GM narration embed
     embed = discord.Embed(
@@ -221,13 +304,19 @@ async def process_gm_narration(message: discord.Message, narration_content: str)
         everyone=False
     )
     
+    send_kwargs = {}
+    if isinstance(target_channel, discord.Thread):
+        send_kwargs['thread'] = target_channel
+    
     # Send the GM narration using webhook
     try:
-        await webhook.send(
+        await _send_with_narration_webhook(
+            webhook_channel,
             embeds=[embed],
             username="GM",
             avatar_url=message.author.display_avatar.url,
-            allowed_mentions=allowed_mentions
+            allowed_mentions=allowed_mentions,
+            **send_kwargs
         )
         try:
             await message.delete()
@@ -250,8 +339,6 @@ async def send_narration_webhook(message: discord.Message, character: BaseCharac
     # Determine display name (use alias if provided)
     display_name = alias if alias else character.name
     
-    # Get or create the first webhook with the name "RoleByPostCharacters"
-    webhook = next((wh for wh in await webhook_channel.webhooks() if wh.name == "RoleByPostCharacters"), None) or await webhook_channel.create_webhook(name="RoleByPostCharacters")
 
     embed = discord.Embed(
         description=content,
@@ -265,38 +352,21 @@ async def send_narration_webhook(message: discord.Message, character: BaseCharac
         everyone=False
     )
 
+    send_kwargs = {}
     if character.avatar_url:
         embed.set_thumbnail(url=character.avatar_url)
-        if isinstance(message.channel, discord.Thread):
-            # For threads, use the thread's webhook to maintain context
-            await webhook.send(
-                embeds=[embed],
-                username=display_name,
-                avatar_url=character.avatar_url,
-                allowed_mentions=allowed_mentions,
-                thread=message.channel
-            )
-        else:
-            await webhook.send(
-                embeds=[embed],
-                username=display_name,
-                avatar_url=character.avatar_url,
-                allowed_mentions=allowed_mentions
-            )
-    else:
-        if isinstance(message.channel, discord.Thread):
-            await webhook.send(
-                embeds=[embed],
-                username=display_name,
-                allowed_mentions=allowed_mentions,
-                thread=message.channel
-            )
-        else:
-            await webhook.send(
-                embeds=[embed],
-                username=display_name,
-                allowed_mentions=allowed_mentions
-            )
+        send_kwargs['avatar_url'] = character.avatar_url
+    if isinstance(message.channel, discord.Thread):
+        # For threads, use the thread's webhook to maintain context
+        send_kwargs['thread'] = message.channel
+
+    await _send_with_narration_webhook(
+        webhook_channel,
+        embeds=[embed],
+        username=display_name,
+        allowed_mentions=allowed_mentions,
+        **send_kwargs
+    )
 
 def get_character_color(character):
     """Return a color for the character based on system and character type."""
@@ -36,7 +36,7 @@ class NarrationCommands(commands.Cog):
                 return
             
             # Verify it's an IC channel
-            channel_type = repositories.channel_permissions.get_channel_type(
+            channel_type = await repositories.channel_permissions.get_channel_type_async(
                 str(interaction.guild.id), 
                 str(target_channel.id)
             )
@@ -48,7 +48,7 @@ class NarrationCommands(commands.Cog):
             channel_mention = target_channel.mention
         else:
             # Default to current channel, but verify it's IC
-            channel_type = repositories.channel_permissions.get_channel_type(
+            channel_type = await repositories.channel_permissions.get_channel_type_async(
                 str(interaction.guild.id), 
                 str(interaction.channel.id)
             )
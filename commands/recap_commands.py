@@ -3,9 +3,11 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import datetime
-import openai
 import logging
 from core.command_decorators import gm_role_required, ic_channel_only, no_ic_channels, player_or_gm_role_required
+from core.llm_client import llm_client
+from core.recap_summarizer import RecapSummarizer
+from core.story_archive import get_story_messages, prune_story_archive
 from data.repositories.repository_factory import repositories
 
 class RecapCommands(commands.Cog):
@@ -13,6 +15,8 @@ class RecapCommands(commands.Cog):
         self.bot = bot
         self.recap_tasks = {}  # Store auto-recap tasks by guild_id
         self.inactive_threshold_days = 30  # Consider a server inactive after 30 days of no messages
+        self.chunk_summary_retention_days = 60  # Cached recap chunk summaries older than this are dropped
+        self.story_archive_retention_days = 60  # Archived story posts older than this are dropped
         
         # Schedule recovery of recap tasks on bot startup
         bot.loop.create_task(self._startup_recovery())
@@ -54,7 +58,7 @@ class RecapCommands(commands.Cog):
             
         try:
             # Generate the recap
-            summary = await self._generate_summary(messages, api_key)
+            summary = await self._generate_summary(messages, api_key, interaction.guild.id)
             
             # Create embed
             embed = discord.Embed(
@@ -203,7 +207,7 @@ class RecapCommands(commands.Cog):
     async def recap_auto_status(self, interaction: discord.Interaction):
         """Show the current automatic recap settings for this server"""
         settings = repositories.auto_recap.get_settings(str(interaction.guild.id))
-        api_key_set = repositories.api_key.get_openai_key(str(interaction.guild.id)) is not None
+        api_key_set = repositories.api_key.has_openai_key(str(interaction.guild.id))
         
         # Create embed
         embed = discord.Embed(
@@ -318,6 +322,11 @@ class RecapCommands(commands.Cog):
                 await self._cleanup_inactive_servers()
                 logging.info("Inactive server cleanup complete")
                 
+                # Chunk summaries older than any likely recap window won't be reused
+                cutoff_day = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.chunk_summary_retention_days)).date().isoformat()
+                await repositories.run(repositories.recap_chunk_summary.delete_before, cutoff_day)
+                await prune_story_archive(self.story_archive_retention_days)
+                
                 # Wait 24 hours before the next cleanup
                 await asyncio.sleep(86400)  # 24 hours
             except Exception as e:
@@ -486,75 +495,15 @@ class RecapCommands(commands.Cog):
     
     async def _gather_story_messages(self, channel, days):
         """Gather messages from the last X days that contain story content"""
-        # Calculate cutoff time
-        now = datetime.datetime.now(datetime.timezone.utc)
-        cutoff_time = now - datetime.timedelta(days=days)
-        
-        story_messages = []
-        async for message in channel.history(limit=1000, after=cutoff_time):
-            # Skip bot messages that aren't narration
-            if message.author.bot and not (
-                # Include webhook messages (narrations)
-                message.webhook_id or 
-                # Include embeds with narration/story content
-                (message.embeds and message.author.id == self.bot.user.id and
-                 any(e.description for e in message.embeds))
-            ):
-                continue
-                
-            # Skip command messages
-            if message.content and message.content.startswith('/'):
-                continue
-                
-            # Skip system messages
-            if not message.content and not message.embeds:
-                continue
-                
-            # If it's a narration message with embed, extract content
-            if message.embeds and message.author.id == self.bot.user.id:
-                for embed in message.embeds:
-                    if embed.description:
-                        author_name = embed.author.name if embed.author else "Narrator"
-                        story_messages.append({
-                            'author': author_name,
-                            'content': embed.description,
-                            'timestamp': message.created_at.isoformat()
-                        })
-            # Regular user message
-            elif message.content:
-                story_messages.append({
-                    'author': message.author.display_name,
-                    'content': message.content,
-                    'timestamp': message.created_at.isoformat()
-                })
-                    
-        return story_messages
+        return await get_story_messages(channel, self.bot.user.id, days)
     
-    async def _generate_summary(self, messages, api_key):
+    async def _generate_summary(self, messages, api_key, guild_id):
         """Use OpenAI API to generate a summary of the story messages"""
-        # Sort messages by timestamp
-        messages.sort(key=lambda x: x['timestamp'])
-        
-        # Construct prompt
-        messages_text = "\n\n".join([f"{msg['author']}: {msg['content']}" for msg in messages])
-        
-        prompt = [
-            {"role": "system", "content": "You are a skilled storyteller tasked with creating concise summaries of tabletop RPG play-by-post games. Focus on the narrative, character development, and key plot points. Ignore out-of-character discussions, dice rolls, and game mechanics. Your summary should read like a story recap that helps players remember what happened."},
-            {"role": "user", "content": f"Here are the recent posts from our play-by-post RPG game. Please provide a coherent, well-structured summary of the main story events:\n\n{messages_text}"}
-        ]
+        async def complete(prompt, max_tokens):
+            return await llm_client.complete(str(guild_id), api_key, prompt, model=RecapSummarizer.MODEL, max_tokens=max_tokens)
         
-        # Make API request using OpenAI client library
         try:
-            client = openai.OpenAI(api_key=api_key)
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=prompt,
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
-            
+            return await RecapSummarizer(complete).summarize(str(guild_id), messages)
         except Exception as e:
             logging.error(f"Error calling OpenAI API: {str(e)}")
             raise Exception(f"OpenAI API error: {str(e)}")
@@ -641,7 +590,7 @@ class RecapCommands(commands.Cog):
                 
             # Generate the recap
             logging.info(f"Generating recap for guild {guild_id} with {len(messages)} messages")
-            summary = await self._generate_summary(messages, api_key)
+            summary = await self._generate_summary(messages, api_key, guild_id)
             
             # Create embed
             embed = discord.Embed(
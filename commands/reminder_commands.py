@@ -1,18 +1,33 @@
 import re
+import time
+import heapq
 import asyncio
 import datetime
+import logging
 import discord
 from discord.ext import commands
 from discord import app_commands
+from core.dm_dispatcher import dm_dispatcher
 from core.command_decorators import gm_role_required, no_ic_channels, player_or_gm_role_required
+from core.utils import get_role_members
 from data.repositories.repository_factory import repositories
 
 
 class ReminderCommands(commands.Cog):
+    # Most reminders claimed from the database per batch
+    CLAIM_BATCH_SIZE = 50
+    # Longest the timer sleeps before re-checking the queue, so claims from a dead sender get picked up
+    MAX_SLEEP_SECONDS = 3600
+
     def __init__(self, bot):
         self.bot = bot
-        # Dictionary to track active mention reminders by (guild_id, user_id)
-        self.active_mention_reminders = {}
+        # Min-heap of (due_at, reminder id) for pending reminders; the timer loop sleeps until the first one
+        self._due_heap = []
+        self._queued_ids = set()
+        self._wakeup = asyncio.Event()
+        
+        # Recover pending reminders and start the timer loop
+        bot.loop.create_task(self._reminder_loop())
 
     reminder_group = app_commands.Group(name="reminder", description="Commands for reminding users to post")
 
@@ -36,16 +51,7 @@ class ReminderCommands(commands.Cog):
         message: str = "Please remember to post your actions!",
         delay: str = "24h"
     ):
-        targets = set()
-        if user:
-            targets.add(user)
-        if role:
-            # Use fetch_members to ensure we get all role members
-            members = [member async for member in interaction.guild.fetch_members() 
-                      if role in member.roles]
-            targets.update(members)
-            
-        if not targets:
+        if not user and not role:
             await interaction.response.send_message("❌ Please specify at least one user or role to remind.", ephemeral=True)
             return
             
@@ -66,13 +72,43 @@ class ReminderCommands(commands.Cog):
         else:
             await interaction.response.send_message("❌ Invalid delay format. Use like '24h', '2d', or '90m'.", ephemeral=True)
             return
+        
+        targets = set()
+        if user:
+            targets.add(user)
+        membership_note = ""
+        if role:
+            if not interaction.guild.chunked:
+                # Resolving members may need a gateway or REST fetch, which can outlast the 3 second response window
+                await interaction.response.defer(ephemeral=True)
+            members, source, elapsed = await get_role_members(interaction.guild, role)
+            targets.update(members)
+            membership_note = f"\n-# {role.name}: {len(members)} member{'s' if len(members) != 1 else ''} from {source} in {elapsed:.2f}s"
+        
+        if not targets:
+            await self._respond(interaction, f"❌ No members found in {role.name}.")
+            return
             
         now = datetime.datetime.now(datetime.timezone.utc).timestamp()
-        for user in targets:
-            repositories.reminder.set_reminder_time(str(interaction.guild.id), str(user.id), now)
-            self.bot.loop.create_task(self._schedule_dm_reminder(interaction.guild.id, user, message, now, delay_seconds))
+        reminders = await repositories.run(
+            repositories.scheduled_reminder.schedule_many,
+            str(interaction.guild.id),
+            [str(user.id) for user in targets],
+            'dm',
+            now,
+            now + delay_seconds,
+            message
+        )
+        self._queue_reminders(reminders)
             
-        await interaction.response.send_message(f"⏰ Reminder{'s' if len(targets) > 1 else ''} scheduled for {delay}.", ephemeral=True)
+        await self._respond(interaction, f"⏰ Reminder{'s' if len(targets) > 1 else ''} scheduled for {delay}.{membership_note}")
+    
+    async def _respond(self, interaction: discord.Interaction, content: str):
+        """Reply ephemerally whether or not the response was deferred"""
+        if interaction.response.is_done():
+            await interaction.followup.send(content, ephemeral=True)
+        else:
+            await interaction.response.send_message(content, ephemeral=True)
     
     @app_commands.default_permissions(administrator=True)
     @reminder_group.command(
@@ -103,14 +139,18 @@ class ReminderCommands(commands.Cog):
             await interaction.response.send_message("❌ Invalid time format. Use like '15 minutes', '2 hours', or '1 day'.", ephemeral=True)
             return
         
-        # Set the reminder in the database
+        # Store the reminder so it survives restarts
         now = datetime.datetime.now(datetime.timezone.utc).timestamp()
-        repositories.reminder.set_reminder_time(str(interaction.guild.id), str(user.id), now)
-        
-        # Schedule the reminder
-        self.bot.loop.create_task(
-            self._schedule_dm_reminder(interaction.guild.id, user, message, now, time_seconds)
+        reminders = await repositories.run(
+            repositories.scheduled_reminder.schedule_many,
+            str(interaction.guild.id),
+            [str(user.id)],
+            'dm',
+            now,
+            now + time_seconds,
+            message
         )
+        self._queue_reminders(reminders)
         
         await interaction.response.send_message(f"✅ Reminder set for {user.mention} in {time}.", ephemeral=True)
     
@@ -273,83 +313,115 @@ class ReminderCommands(commands.Cog):
                 return int(match.group(1)) * 86400
         return None
 
-    async def _schedule_dm_reminder(self, guild_id, user, message, reminder_time, delay_seconds):
-        """Internal method to handle the delayed sending of reminders"""
-        await asyncio.sleep(delay_seconds)
+    def _queue_reminders(self, reminders) -> None:
+        """Add stored reminders to the timer heap, waking the loop if one is due sooner than its next wake-up"""
+        wake = False
+        for reminder in reminders:
+            if reminder.id in self._queued_ids:
+                continue
+            if not self._due_heap or reminder.due_at < self._due_heap[0][0]:
+                wake = True
+            heapq.heappush(self._due_heap, (reminder.due_at, reminder.id))
+            self._queued_ids.add(reminder.id)
+        if wake:
+            self._wakeup.set()
+
+    async def _recover_reminders(self) -> None:
+        """Load every pending reminder from the database into the timer heap"""
+        released = await repositories.run(repositories.scheduled_reminder.release_stale_claims)
+        if released:
+            logging.warning(f"Released {released} stale reminder claims")
+        pending = await repositories.run(repositories.scheduled_reminder.get_pending)
+        self._queue_reminders(pending)
+        logging.info(f"Recovered {len(pending)} pending reminders")
+
+    async def _reminder_loop(self):
+        """Single timer loop that sends reminders as they come due"""
+        await self.bot.wait_until_ready()
+        await self._recover_reminders()
         
-        # Only send reminder if the user hasn't posted since the reminder was set
-        last_msg = repositories.last_message_time.get_last_message_time(str(guild_id), str(user.id))
-        if not last_msg or last_msg < reminder_time:
+        while not self.bot.is_closed():
             try:
-                await user.send(f"**Reminder from {self.bot.get_guild(guild_id).name}:** {message}")
-            except discord.Forbidden:
-                pass  # Can't DM user - they have DMs disabled
+                self._wakeup.clear()
+                delay = self._due_heap[0][0] - time.time() if self._due_heap else self.MAX_SLEEP_SECONDS
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, self.MAX_SLEEP_SECONDS))
+                    except asyncio.TimeoutError:
+                        if not self._due_heap or self._due_heap[0][0] > time.time():
+                            # Periodic re-sync picks up reminders whose sender died mid-send
+                            await self._recover_reminders()
+                    continue
+                
+                await self._send_due_reminders()
             except Exception as e:
-                print(f"Error sending reminder to {user}: {e}")
+                logging.error(f"Error in reminder loop: {e}")
+                await asyncio.sleep(60)
+
+    async def _send_due_reminders(self):
+        """Claim due reminders from the database in batches and send them"""
+        now = time.time()
+        while self._due_heap and self._due_heap[0][0] <= now:
+            _, reminder_id = heapq.heappop(self._due_heap)
+            self._queued_ids.discard(reminder_id)
+        
+        while True:
+            reminders = await repositories.run(repositories.scheduled_reminder.claim_due, now, self.CLAIM_BATCH_SIZE)
+            if not reminders:
+                return
+            for reminder in reminders:
+                await self._send_reminder(reminder)
+            await repositories.run(repositories.scheduled_reminder.delete_by_ids, [reminder.id for reminder in reminders])
+            if len(reminders) < self.CLAIM_BATCH_SIZE:
+                return
+
+    async def _send_reminder(self, reminder):
+        """Queue one reminder DM if the user hasn't posted since it was set"""
+        guild = self.bot.get_guild(int(reminder.guild_id))
+        if not guild:
+            return
+        
+        last_msg = await repositories.run(repositories.last_message_time.get_last_message_time, reminder.guild_id, reminder.user_id)
+        if reminder.kind == 'mention':
+            if last_msg and last_msg > reminder.reminder_time:
+                return
+            content = (
+                f"**Automatic Reminder from {guild.name}:** "
+                f"You were mentioned and haven't responded yet. Please check the server!"
+            )
+        else:
+            if last_msg and last_msg >= reminder.reminder_time:
+                return
+            content = f"**Reminder from {guild.name}:** {reminder.message}"
+        
+        # The dispatcher paces DMs so a role-wide reminder doesn't trip Discord's rate limits
+        dm_dispatcher.enqueue(int(reminder.user_id), content)
 
     async def handle_mention(self, message, mentioned_user):
         """Handle automatic reminders for user mentions"""
-        guild_id = message.guild.id
-        user_id = mentioned_user.id
+        guild_id = str(message.guild.id)
+        user_id = str(mentioned_user.id)
             
         # Check if automatic reminders are enabled for this server
-        settings = repositories.auto_reminder_settings.get_settings(str(guild_id))
+        settings = await repositories.run(repositories.auto_reminder_settings.get_settings, guild_id)
         if not settings.enabled:
             return
             
         # Check if the user has opted out
-        if repositories.auto_reminder_optout.is_user_opted_out(str(guild_id), str(user_id)):
-            return
-            
-        # Check if there's already an active reminder for this user in this guild
-        reminder_key = (guild_id, user_id)
-        if reminder_key in self.active_mention_reminders:
-            # Update the timestamp of the existing reminder to reset the timer
-            self.active_mention_reminders[reminder_key]["timestamp"] = message.created_at.timestamp()
+        if await repositories.run(repositories.auto_reminder_optout.is_user_opted_out, guild_id, user_id):
             return
             
-        # Create a new reminder
+        # A user has at most one pending mention reminder per guild; a repeat mention refreshes it
         now = message.created_at.timestamp()
-        repositories.reminder.set_reminder_time(str(guild_id), str(user_id), now)
-        
-        # Create task and store it in the dictionary
-        task = self.bot.loop.create_task(
-            self._schedule_auto_reminder(
-                guild_id, 
-                mentioned_user, 
-                now, 
-                settings.delay_seconds,
-                reminder_key
-            )
+        reminder = await repositories.run(
+            repositories.scheduled_reminder.schedule_mention,
+            guild_id,
+            user_id,
+            now,
+            now + settings.delay_seconds
         )
-        self.active_mention_reminders[reminder_key] = {
-            "timestamp": now,
-            "task": task
-        }
-
-    async def _schedule_auto_reminder(self, guild_id, user, reminder_time, delay_seconds, reminder_key):
-        """Internal method to handle automatic reminders"""
-        try:
-            await asyncio.sleep(delay_seconds)
-            
-            # Only send reminder if the user hasn't posted since the reminder was set
-            last_msg = repositories.last_message_time.get_last_message_time(str(guild_id), str(user.id))
-            if not last_msg or last_msg <= reminder_time:
-                try:
-                    guild_name = self.bot.get_guild(guild_id).name
-                    await user.send(
-                        f"**Automatic Reminder from {guild_name}:** "
-                        f"You were mentioned and haven't responded yet. Please check the server!"
-                    )
-                except discord.Forbidden:
-                    pass  # Can't DM user - they have DMs disabled
-                except Exception as e:
-                    print(f"Error sending auto reminder to {user}: {e}")
-                    
-        finally:
-            # Remove the reminder from the active list
-            if reminder_key in self.active_mention_reminders:
-                del self.active_mention_reminders[reminder_key]
+        if reminder:
+            self._queue_reminders([reminder])
 
 async def setup_reminder_commands(bot: commands.Bot):
     await bot.add_cog(ReminderCommands(bot))
\ No newline at end of file
@@ -1,10 +1,14 @@
+import asyncio
+import dataclasses
 import discord
 from discord.ext import commands
 from discord import app_commands
 from commands.autocomplete import multi_character_autocomplete, roll_parameters_autocomplete
-from core.command_decorators import no_ic_channels, player_or_gm_role_required
+from core.batch_roll import build_batch_summary_embed, roll_batch
+from core.command_decorators import gm_role_required, no_ic_channels, player_or_gm_role_required
 from core.generic_roll_formulas import RollFormula
-from core.generic_roll_mechanics import execute_roll
+from core.generic_roll_mechanics import CoreRollMechanicType, RollMechanicConfig, execute_roll
+from core.roll_odds import compute_odds
 from core.shared_views import RequestRollView
 import core.factories as factories
 from data.repositories import character_repository
@@ -63,6 +67,68 @@ class RollCommands(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"❌ Error rolling dice: {str(e)}", ephemeral=True)
 
+    @roll_group.command(
+        name="odds",
+        description="Show the exact odds of a roll with this server's roll mechanic"
+    )
+    @app_commands.describe(
+        formula="Dice formula to check (defaults to the server's core roll, e.g. 1d20, 2d6, 5d10)",
+        modifier="Flat modifier added to the total (ignored for dice pools)",
+        difficulty="Optional difficulty to work out the chance of success"
+    )
+    @player_or_gm_role_required()
+    @no_ic_channels()
+    async def roll_odds(self, interaction: discord.Interaction, formula: str = None, modifier: int = 0, difficulty: int = None):
+        """Work out the exact outcome distribution of a roll"""
+        system = repositories.server.get_system(str(interaction.guild.id))
+        roll_formula_obj = factories.get_specific_roll_formula(interaction.guild.id, system, {})
+        roll_config = roll_formula_obj.roll_config or RollMechanicConfig(CoreRollMechanicType.ROLL_AND_SUM, "1d20")
+        if formula and formula.strip():
+            # Same mechanic and success rules, different dice
+            roll_formula_obj = RollFormula(dataclasses.replace(roll_config, dice_formula=formula.strip()), {})
+        elif roll_formula_obj.roll_config is None:
+            roll_formula_obj = RollFormula(roll_config, {})
+
+        try:
+            # Wide formulas take a moment to convolve, so keep it off the event loop
+            odds = await asyncio.to_thread(compute_odds, roll_formula_obj, modifier, difficulty)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {str(e)}", ephemeral=True)
+            return
+
+        unit = " successes" if odds.counts_successes else ""
+        embed = discord.Embed(
+            title=f"🎲 Odds for {odds.formula}",
+            description="Dice pool: counting successes" if odds.counts_successes else None,
+            color=discord.Color.blue()
+        )
+        if modifier and not odds.counts_successes:
+            embed.title += f" {modifier:+d}"
+
+        if odds.success_chance is not None:
+            if odds.counts_successes:
+                goal = f"at least {difficulty} successes"
+            else:
+                goal = f"{roll_config.success_criteria.value} {difficulty}"
+            embed.add_field(name="Chance of Success", value=f"**{odds.success_chance:.1%}** to roll {goal}", inline=False)
+
+        embed.add_field(name="Average", value=f"{odds.distribution.mean():.2f}{unit}", inline=True)
+        embed.add_field(
+            name="Percentiles",
+            value=" • ".join(f"{fraction:.0%}: {value}" for fraction, value in odds.percentiles().items()),
+            inline=False
+        )
+
+        outcomes = odds.likely_outcomes()
+        if outcomes and len(outcomes) <= 25:
+            highest = max(p for _, p in outcomes)
+            chart = "\n".join(f"{value:>4} {'█' * max(1, round(p / highest * 20)):<20} {p:6.2%}" for value, p in outcomes)
+            embed.add_field(name="Distribution", value=f"```\n{chart}\n```", inline=False)
+        elif outcomes:
+            embed.add_field(name="Likely Range", value=f"{outcomes[0][0]} to {outcomes[-1][0]}{unit}", inline=False)
+
+        await interaction.response.send_message(embed=embed)
+
     @roll_group.command(
         name="check",
         description="Roll dice for your active character"
@@ -155,10 +221,66 @@ class RollCommands(commands.Cog):
         roll_parameters_dict = RollFormula.roll_parameters_to_dict(roll_parameters)
         roll_formula_obj = factories.get_specific_roll_formula(interaction.guild.id, system, roll_parameters_dict)
 
-        view = RequestRollView(users_requested=users_requested, roll_formula=roll_formula_obj, difficulty=difficulty)
-        await interaction.response.send_message(
-            content=f"{mention_str}\n{interaction.user.display_name} requests a roll: `{roll_parameters}`",
-            view=view
+        # NPCs can't press the button, so a GM's request rolls for all of them at once
+        npcs = [char for char in chars if char.is_npc]
+        embed = None
+        if npcs and await repositories.server.has_gm_permission(str(interaction.guild.id), interaction.user):
+            embed = self._batch_roll_characters(
+                factories.get_specific_roll_formula(interaction.guild.id, system, dict(roll_parameters_dict)),
+                npcs, difficulty, "🎲 NPC Rolls"
+            )
+
+        content = f"{mention_str}\n{interaction.user.display_name} requests a roll: `{roll_parameters}`"
+        if users_requested:
+            view = RequestRollView(users_requested=users_requested, roll_formula=roll_formula_obj, difficulty=difficulty)
+            await interaction.response.send_message(content=content, view=view, embed=embed)
+        else:
+            await interaction.response.send_message(content=content, embed=embed)
+
+    @roll_group.command(
+        name="group",
+        description="GM: Roll the same check for several characters at once"
+    )
+    @app_commands.describe(
+        chars_to_roll="Comma-separated character names to roll for",
+        roll_parameters="Roll parameters, e.g. skill:Athletics,attribute:END",
+        difficulty="Optional difficulty number to compare against (e.g. 15)"
+    )
+    @app_commands.autocomplete(chars_to_roll=multi_character_autocomplete)
+    @app_commands.autocomplete(roll_parameters=roll_parameters_autocomplete)
+    @gm_role_required()
+    @no_ic_channels()
+    async def roll_group_check(
+        self,
+        interaction: discord.Interaction,
+        chars_to_roll: str,
+        roll_parameters: str = None,
+        difficulty: int = None
+    ):
+        system = repositories.server.get_system(str(interaction.guild.id))
+        all_chars = repositories.character.get_all_pcs_and_npcs_by_guild(str(interaction.guild.id))
+        char_names = [name.strip() for name in chars_to_roll.split(",") if name.strip()]
+        chars = [c for c in all_chars if c.name in char_names]
+        if not chars:
+            await interaction.response.send_message("❌ No matching characters found.", ephemeral=True)
+            return
+
+        roll_parameters_dict = RollFormula.roll_parameters_to_dict(roll_parameters)
+        roll_formula_obj = factories.get_specific_roll_formula(interaction.guild.id, system, roll_parameters_dict)
+        title = f"🎲 Group Check: {roll_parameters}" if roll_parameters else "🎲 Group Check"
+        embed = self._batch_roll_characters(roll_formula_obj, chars, difficulty, title)
+        await interaction.response.send_message(embed=embed)
+
+    def _batch_roll_characters(self, roll_formula_obj: RollFormula, chars: list, difficulty: int, title: str) -> discord.Embed:
+        """Roll the same check for many characters in one batch and summarize it"""
+        if roll_formula_obj.roll_config is None:
+            roll_formula_obj.roll_config = RollMechanicConfig(CoreRollMechanicType.ROLL_AND_SUM, "1d20")
+        requests = [roll_formula_obj.to_batch_request(char, difficulty) for char in chars]
+        results = roll_batch(requests, roll_formula_obj.roll_config)
+        return build_batch_summary_embed(
+            title,
+            results,
+            counts_successes=roll_formula_obj.roll_config.mechanic_type == CoreRollMechanicType.DICE_POOL
         )
 
 async def setup_roll_commands(bot: commands.Bot):
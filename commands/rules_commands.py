@@ -1,11 +1,12 @@
 import discord
+from typing import AsyncIterator
 from discord.ext import commands
 from discord import app_commands
-import openai
 from commands.autocomplete import homebrew_rules_autocomplete
 from core import command_decorators
 from core.base_models import SystemType
 from core.command_decorators import gm_role_required, no_ic_channels, player_or_gm_role_required
+from core.llm_client import llm_client, stream_into_message
 from data.repositories.repository_factory import repositories
 
 class RulesCommands(commands.Cog):
@@ -56,18 +57,31 @@ class RulesCommands(commands.Cog):
             # Convert to dictionary for compatibility with existing code
             homebrew_rules = {rule.rule_name: rule.rule_text for rule in homebrew_rules_entities}
             
-            # Generate response using OpenAI
-            response = await self._generate_rules_response(prompt, system, homebrew_rules, api_key)
-            
-            # Create embed for the response
-            embed = discord.Embed(
-                title="📚 Rules Answer",
-                description=response,
-                color=discord.Color.blue()
+            # Stream the answer into one followup message as it's generated
+            footer = f"System: {system.value.upper()} | Asked by {interaction.user.display_name}"
+            answer_message = None
+
+            async def update(text: str, done: bool):
+                nonlocal answer_message
+                if not text:
+                    return
+                embed = discord.Embed(
+                    title="📚 Rules Answer",
+                    description=text[:4096] if done else text[:4000] + " ▌",
+                    color=discord.Color.blue()
+                )
+                embed.set_footer(text=footer if done else f"{footer} | Writing...")
+                if answer_message is None:
+                    answer_message = await interaction.followup.send(embed=embed, wait=True)
+                else:
+                    await answer_message.edit(embed=embed)
+
+            response = await stream_into_message(
+                self._generate_rules_response(prompt, system, homebrew_rules, api_key, str(interaction.guild.id)),
+                update
             )
-            embed.set_footer(text=f"System: {system.value.upper()} | Asked by {interaction.user.display_name}")
-            
-            await interaction.followup.send(embed=embed)
+            if not response:
+                await interaction.followup.send("❌ The rules response came back empty.", ephemeral=True)
             
         except Exception as e:
             await interaction.followup.send(
@@ -199,19 +213,21 @@ class RulesCommands(commands.Cog):
         prompt: str, 
         system: SystemType, 
         homebrew_rules: dict, 
-        api_key: str
-    ) -> str:
+        api_key: str,
+        guild_id: str
+    ) -> AsyncIterator[str]:
         """
-        Generate a rules response using OpenAI API with system and homebrew context.
+        Stream a rules response from the OpenAI API with system and homebrew context.
         
         Args:
             prompt: The user's rules question
             system: The RPG system being used
             homebrew_rules: Dictionary of homebrew rules for context
             api_key: OpenAI API key
+            guild_id: Guild the question was asked in, for concurrency limits
             
-        Returns:
-            str: The AI-generated response
+        Yields:
+            str: The AI-generated response so far
         """
         # Build system context
         system_context = self._get_system_context(system)
@@ -238,18 +254,18 @@ Question: {prompt}"""
 
         # Make API request
         try:
-            client = openai.OpenAI(api_key=api_key)
-            response = client.chat.completions.create(
-                model="gpt-4",
+            async for text in llm_client.stream(
+                guild_id,
+                api_key,
                 messages=[
                     {"role": "system", "content": "You are a helpful RPG rules expert."},
                     {"role": "user", "content": full_context}
                 ],
+                model="gpt-4",
                 max_tokens=1000,
                 temperature=0.3
-            )
-            
-            return response.choices[0].message.content.strip()
+            ):
+                yield text
             
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
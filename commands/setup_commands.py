@@ -2,8 +2,13 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from core.base_models import SystemType
+from core import dice_expression
+from core.dice_expression import compile_dice_expression
+from core.dm_dispatcher import dm_dispatcher
 from core.command_decorators import admin_required, gm_role_required, no_ic_channels, player_or_gm_role_required
 import core.factories as factories
+from data.database import db_manager
+from data.query_stats import query_stats
 from data.repositories.repository_factory import repositories
 
 class SetupCommands(commands.Cog):
@@ -178,7 +183,7 @@ class SetupCommands(commands.Cog):
     @no_ic_channels()
     async def openai_status(self, interaction: discord.Interaction):
         """Check the status of the OpenAI API key for this server"""
-        api_key_set = repositories.api_key.get_openai_key(str(interaction.guild.id)) is not None
+        api_key_set = repositories.api_key.has_openai_key(str(interaction.guild.id))
         
         embed = discord.Embed(
             title="🔑 OpenAI API Key Status",
@@ -327,8 +332,6 @@ class SetupCommands(commands.Cog):
     @no_ic_channels()
     async def setup_generic_dice(self, interaction: discord.Interaction, base_dice: str):
         """Set the base dice formula for the Generic system"""
-        import re
-        
         # Check if server is using generic system
         system = repositories.server.get_system(str(interaction.guild.id))
         if system != SystemType.GENERIC:
@@ -340,7 +343,8 @@ class SetupCommands(commands.Cog):
         
         # Validate dice format
         base_dice = base_dice.strip()
-        if not re.match(r'^\d*d\d+([+-]\d+)?$', base_dice.replace(' ', '').lower()):
+        expression = compile_dice_expression(base_dice)
+        if expression is None or not expression.is_simple:
             await interaction.response.send_message(
                 "❌ Invalid dice format. Use formats like: 1d20, 2d6, 3d6+1, 1d100, etc.",
                 ephemeral=True
@@ -439,7 +443,7 @@ class SetupCommands(commands.Cog):
         has_default_skills = repositories.default_skills.get_default_skills(guild_id, system) is not None
         
         # Check API key status (don't show the actual key)
-        api_key_set = repositories.api_key.get_openai_key(guild_id) is not None
+        api_key_set = repositories.api_key.has_openai_key(guild_id)
         
         # Get homebrew rules count
         homebrew_rules_entities = repositories.homebrew.get_all_homebrew_rules(guild_id)
@@ -620,5 +624,95 @@ class SetupCommands(commands.Cog):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @setup_group.command(name="diagnostics", description="Show database query timings, connection pool and cache stats. You must be an Admin.")
+    @app_commands.describe(
+        sort_by="Which metric to rank queries by",
+        reset="Clear the query timings after showing them"
+    )
+    @app_commands.choices(sort_by=[
+        app_commands.Choice(name="Total time", value="total_ms"),
+        app_commands.Choice(name="95th percentile", value="p95_ms"),
+        app_commands.Choice(name="Call count", value="calls"),
+        app_commands.Choice(name="Rows", value="rows"),
+    ])
+    @admin_required()
+    @no_ic_channels()
+    async def setup_diagnostics(self, interaction: discord.Interaction, sort_by: str = "total_ms", reset: bool = False):
+        """Dump process-wide query instrumentation for tuning"""
+        embed = discord.Embed(
+            title="🩺 Database Diagnostics",
+            color=discord.Color.blurple()
+        )
+        
+        top_queries = query_stats.get_top(limit=10, sort_by=sort_by)
+        if top_queries:
+            query_lines = []
+            for label, stats in top_queries:
+                query_lines.append(
+                    f"**{label}**\n"
+                    f"  {stats['calls']} calls • {stats['total_ms']:.0f}ms total • avg {stats['avg_ms']:.1f}ms • "
+                    f"p95 ≤{stats['p95_ms']:.0f}ms • max {stats['max_ms']:.0f}ms • {stats['rows']} rows"
+                    + (f" • {stats['errors']} errors" if stats['errors'] else "")
+                )
+            query_text = "\n".join(query_lines)
+        else:
+            query_text = "No queries recorded yet."
+        embed.add_field(name="Queries", value=query_text[:1024], inline=False)
+        
+        pool_stats = db_manager.get_pool_stats()
+        if pool_stats:
+            pool_text = (
+                f"**Size:** {pool_stats['size']}/{pool_stats['max_size']} ({pool_stats['in_use']} in use, peak {pool_stats['peak_in_use']})\n"
+                f"**Checkouts:** {pool_stats['checkouts']} • **Waits:** {pool_stats['waits']} • **Timeouts:** {pool_stats['timeouts']}\n"
+                f"**Wait:** avg {pool_stats['avg_wait_ms']:.1f}ms • max {pool_stats['max_wait_ms']:.1f}ms"
+            )
+        else:
+            pool_text = "Pooling disabled"
+        embed.add_field(name="Connection Pool", value=pool_text, inline=False)
+        
+        cache_lines = []
+        for name, stats in (
+            ("Server settings", repositories.server.get_cache_stats()),
+            ("Active characters", repositories.active_character.get_cache_stats()),
+            ("Dice formulas", dice_expression.get_cache_stats()),
+            ("Link graph (guilds)", repositories.link_graph.get_stats()),
+        ):
+            cache_lines.append(f"**{name}:** {stats['size']} entries • {stats['hit_rate']:.0%} hit rate ({stats['hits']}/{stats['hits'] + stats['misses']})")
+        embed.add_field(name="Caches", value="\n".join(cache_lines), inline=False)
+        
+        link_report = await repositories.run(repositories.link_graph.check_consistency, str(interaction.guild.id))
+        if not link_report['loaded']:
+            link_text = "Not loaded for this server"
+        elif link_report['error']:
+            link_text = "❌ Couldn't read the database to compare"
+        elif link_report['consistent']:
+            link_text = "✅ Matches the database"
+        else:
+            link_text = (
+                f"⚠️ {link_report['missing']} missing • {link_report['extra']} stale • "
+                f"{link_report['metadata_mismatches']} metadata and {link_report['entity_mismatches']} entity mismatches"
+                + (" • reloaded" if link_report['repaired'] else "")
+            )
+        embed.add_field(name="Link Graph", value=link_text, inline=False)
+        
+        dm_stats = dm_dispatcher.get_stats()
+        embed.add_field(
+            name="DM Queue",
+            value=(
+                f"**Depth:** {dm_stats['queued']} queued • {dm_stats['delayed']} waiting to retry\n"
+                f"**Sent:** {dm_stats['sent']} • **Failed:** {dm_stats['failed']} • **Retries:** {dm_stats['retries']} • **Duplicates dropped:** {dm_stats['duplicates_dropped']}\n"
+                f"**Latency:** avg {dm_stats['avg_latency_seconds']:.1f}s • max {dm_stats['max_latency_seconds']:.1f}s"
+            ),
+            inline=False
+        )
+        
+        threshold = query_stats.slow_query_threshold_ms
+        embed.set_footer(text=f"Slow query log threshold: {threshold:.0f}ms" if threshold else "Slow query log disabled")
+        
+        if reset:
+            query_stats.reset()
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 async def setup_setup_commands(bot: commands.Bot):
     await bot.add_cog(SetupCommands(bot))
\ No newline at end of file
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 import json
 from typing import Any, ClassVar, Dict, List, Optional
@@ -342,8 +342,8 @@ class EntityLinkType(Enum):
         from data.repositories.repository_factory import repositories
         links_dict = {}
         
-        # Use the new view to get aggregated link data
-        entity_details = repositories.vw_entity_details.get_by_id(entity.id)
+        # Aggregated link data, kept in memory as links change
+        entity_details = repositories.entity_details.get_link_summary(guild_id, entity.id)
 
         if entity_details:
             # Entities this entity owns
@@ -382,6 +382,25 @@ class EntityDefaults:
     def get_defaults(self, entity_type: EntityType) -> Dict[str, Any]:
         return self.defaults_by_type.get(entity_type, {})
 
+@dataclass
+class PossessionNode:
+    """An entity in a possession tree, with the quantity held by its possessor"""
+    entity: 'BaseEntity'
+    quantity: int = 1
+    depth: int = 0
+    link_metadata: Dict[str, Any] = field(default_factory=dict)
+    children: List['PossessionNode'] = field(default_factory=list)
+
+    def walk(self):
+        """Yield every node below this one, depth first"""
+        for child in self.children:
+            yield child
+            yield from child.walk()
+
+    @property
+    def descendant_count(self) -> int:
+        return sum(1 for _ in self.walk())
+
 class BaseEntity(BaseRpgObj):
     """
     Abstract base class for a "thing".
@@ -483,13 +502,8 @@ class BaseEntity(BaseRpgObj):
     
     def get_item_quantity(self, guild_id: str, item_name: str) -> int:
         """Get the total quantity of an item in the container"""
-        total_quantity = 0
-        for contained_item in self.get_contained_items(guild_id):
-            if contained_item.name == item_name:
-                links = self.get_links_to_entity(guild_id, contained_item.id, EntityLinkType.POSSESSES)
-                if links:
-                    total_quantity += links[0].metadata.get("quantity", 1)
-        return total_quantity
+        from data.repositories.repository_factory import repositories
+        return repositories.link.get_stack_quantity(guild_id, self.id, item_name)
     
     def can_take_item(self, guild_id: str, item_name: str, quantity: int = 1) -> bool:
         """Check if we can take the specified quantity of an item"""
@@ -498,23 +512,13 @@ class BaseEntity(BaseRpgObj):
     
     def take_item(self, guild_id: str, item_name: str, quantity: int = 1) -> 'BaseEntity':
         """Take items from container, returns the item entity for adding to inventory"""
-        if not self.can_take_item(guild_id, item_name, quantity):
-            return None
-        
-        # Find the item
-        target_item = None
-        for contained_item in self.get_contained_items(guild_id):
-            if contained_item.name == item_name:
-                target_item = contained_item
-                break
-        
-        if not target_item:
+        from data.repositories.repository_factory import repositories
+        # Only takes if the stack still holds enough when its row is locked
+        result = repositories.link.adjust_stack_quantity(guild_id, self.id, item_name, -quantity, require_available=True)
+        if not result:
             return None
-        
-        # Remove the quantity
-        self.remove_item(guild_id, target_item, quantity)
-        
-        return target_item
+        item_id, _ = result
+        return repositories.entity.get_by_id(item_id)
     
     def get_links_to_entity(self, guild_id: str, entity_id: str, link_type: EntityLinkType) -> List[EntityLink]:
         """Helper method to get links to a specific entity"""
@@ -531,35 +535,40 @@ class BaseEntity(BaseRpgObj):
     
     def get_contained_items(self, guild_id: str) -> List['BaseEntity']:
         """Get all items contained in this container"""
-        return [item for item in self.get_children(guild_id, EntityLinkType.POSSESSES) if item.entity_type == EntityType.ITEM]
+        return [node.entity for node in self.get_item_nodes(guild_id)]
+
+    def get_possession_tree(self, guild_id: str, max_depth: int = None) -> PossessionNode:
+        """Get everything this entity possesses, nested, with quantities, in one query"""
+        from data.repositories.repository_factory import repositories
+        return repositories.link.get_possession_tree(self, guild_id, max_depth)
+
+    def get_item_nodes(self, guild_id: str) -> List[PossessionNode]:
+        """Get the items this entity directly possesses, with their quantities"""
+        return [node for node in self.get_possession_tree(guild_id, max_depth=1).children if node.entity.entity_type == EntityType.ITEM]
 
     def get_parents(self, guild_id: str, link_type: EntityLinkType = None) -> List['BaseEntity']:
         """Get entities that have links to this entity"""
         from data.repositories.repository_factory import repositories
         return repositories.link.get_parents(guild_id, self.id, link_type.value if link_type else None)
     
-    def get_possesser(self) -> Optional['BaseEntity']:
+    def get_possesser(self, guild_id: str) -> Optional['BaseEntity']:
         """Get the entity that owns this entity (if any)"""
-        owners = self.get_parents(EntityLinkType.POSSESSES.value)
+        owners = self.get_parents(guild_id, EntityLinkType.POSSESSES)
         return owners[0] if owners else None
     
-    def get_controlled_entities(self) -> List['BaseEntity']:
+    def get_controlled_entities(self, guild_id: str) -> List['BaseEntity']:
         """Get entities that this entity controls"""
-        return self.get_children(EntityLinkType.CONTROLS.value)
+        return self.get_children(guild_id, EntityLinkType.CONTROLS)
     
-    def can_be_controlled_by(self, user_id: str) -> bool:
+    def can_be_controlled_by(self, guild_id: str, user_id: str) -> bool:
         """Check if a user can control this entity"""
         # User can control their own entities
         if self.owner_id == str(user_id):
             return True
         
         # Check if user owns any entities that control this entity
-        controlling_entities = self.get_parents(EntityLinkType.CONTROLS.value)
-        for entity in controlling_entities:
-            if entity.owner_id == str(user_id):
-                return True
-        
-        return False
+        from data.repositories.repository_factory import repositories
+        return repositories.link_graph.user_controls(guild_id, user_id, self.id)
 
     def add_link(self, guild_id: str, target_entity: 'BaseEntity', link_type: EntityLinkType, metadata: Dict[str, Any] = None) -> 'EntityLink':
         """Add a link to another entity"""
@@ -584,8 +593,7 @@ class BaseEntity(BaseRpgObj):
     
     def get_inventory(self, guild_id: str) -> List['BaseEntity']:
         """Get all items in this entity's inventory"""
-        possessed_entities = self.get_children(guild_id, EntityLinkType.POSSESSES)
-        return [entity for entity in possessed_entities if entity.entity_type == EntityType.ITEM]
+        return self.get_contained_items(guild_id)
     
     def add_to_inventory(self, guild_id: str, item: 'BaseEntity') -> 'EntityLink':
         """Add an item to this entity's inventory"""
@@ -598,28 +606,15 @@ class BaseEntity(BaseRpgObj):
         if item.entity_type != EntityType.ITEM:
             return False
         
-        # Check if we already have this item (by name for stacking)
-        existing_links = []
-        for contained_item in self.get_contained_items(guild_id):
-            if contained_item.name == item.name:
-                links = self.get_links_to_entity(guild_id, contained_item.id, EntityLinkType.POSSESSES)
-                if links:
-                    existing_links.extend(links)
-        
-        if existing_links:
-            # Stack with existing item
-            link = existing_links[0]
-            current_quantity = link.metadata.get("quantity", 1)
-            link.metadata["quantity"] = current_quantity + quantity
-            
-            from data.repositories.repository_factory import repositories
-            repositories.link.update_metadata(link)
+        from data.repositories.repository_factory import repositories
+        # Stack with an existing item of the same name if there is one
+        if repositories.link.adjust_stack_quantity(guild_id, self.id, item.name, quantity):
             return True
         else:
             # Check if container has space for new unique item
             max_items = self.data.get("max_items", 0)
             if max_items > 0:
-                unique_items = len(self.get_contained_items(guild_id))
+                unique_items = repositories.link.count_possessed_items(guild_id, self.id)
                 if unique_items >= max_items:
                     return False
             
@@ -643,23 +638,9 @@ class BaseEntity(BaseRpgObj):
         if quantity is None:
             return self.remove_link(guild_id, item, EntityLinkType.POSSESSES)
         
-        # Get current link to check quantity
-        links = self.get_links_to_entity(guild_id, item.id, EntityLinkType.POSSESSES)
-        if not links:
-            return False
-        
-        link = links[0]
-        current_quantity = link.metadata.get("quantity", 1)
-        
-        if quantity >= current_quantity:
-            # Remove completely
-            return self.remove_link(guild_id, item, EntityLinkType.POSSESSES)
-        else:
-            # Update quantity
-            from data.repositories.repository_factory import repositories
-            link.metadata["quantity"] = current_quantity - quantity
-            repositories.link.update_metadata(link)
-            return True
+        # Removing the whole stack or more deletes the link
+        from data.repositories.repository_factory import repositories
+        return repositories.link.adjust_item_quantity(guild_id, self.id, item.id, -quantity) is not None
 
 class BaseCharacter(BaseEntity):
     """
@@ -0,0 +1,144 @@
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import discord
+
+from core.dice_expression import MAX_EXPLOSIONS, DiceExpression, DiceTerm, RolledTerm, compile_dice_expression
+from core.generic_roll_mechanics import CoreRollMechanicType, RollMechanicConfig, check_success, configured_explode_threshold
+
+try:
+    import numpy as np
+    _numpy_rng = np.random.default_rng()
+except ImportError:  # Without NumPy each die size is still drawn in one random.choices call
+    np = None
+    _numpy_rng = None
+
+@dataclass
+class BatchRollRequest:
+    """One roll in a batch, e.g. a single NPC's check"""
+    label: str
+    formula: str
+    modifier: int = 0
+    difficulty: Optional[int] = None
+
+@dataclass
+class BatchRollResult:
+    request: BatchRollRequest
+    total: Optional[int] = None  # Sum for roll-and-sum, successes for dice pools
+    success: Optional[bool] = None
+    rolled_terms: Optional[List[RolledTerm]] = None
+    error: Optional[str] = None
+
+def _draw(sides: int, count: int) -> List[int]:
+    """count rolls of a die with the given number of sides, in one RNG call"""
+    if _numpy_rng is not None:
+        return _numpy_rng.integers(1, sides + 1, size=count).tolist()
+    return random.choices(range(1, sides + 1), k=count)
+
+def roll_batch(requests: List[BatchRollRequest], config: RollMechanicConfig) -> List[BatchRollResult]:
+    """
+    Roll many formulas under one roll mechanic at once. Every die of the same size across the
+    whole batch is drawn together, as are each round of explosions, instead of one call per die.
+    """
+    results = [BatchRollResult(request) for request in requests]
+    is_pool = config.mechanic_type == CoreRollMechanicType.DICE_POOL
+    sum_explode_at = configured_explode_threshold(config)
+    pool_explode_at = int(config.explode_threshold) if config.explode_threshold is not None else None
+
+    # Lay out every die in the batch, grouped by die size so each size is drawn in one call
+    expressions: Dict[int, DiceExpression] = {}
+    term_dice: Dict[Tuple[int, int], List[List[int]]] = {}
+    dice_by_size = defaultdict(list)
+    for index, request in enumerate(requests):
+        expression = compile_dice_expression(request.formula)
+        if expression is None:
+            results[index].error = f"Invalid dice formula: {request.formula}"
+            continue
+        if not expression.within_limits():
+            results[index].error = f"Too many dice in {request.formula}"
+            continue
+        expressions[index] = expression
+
+        for term_index, term in enumerate(expression.terms):
+            chains = term_dice[(index, term_index)] = []
+            if not isinstance(term, DiceTerm):
+                continue
+            if is_pool:
+                explode_at = (pool_explode_at if pool_explode_at is not None else term.sides) if config.exploding_dice else term.explode_at
+            else:
+                explode_at = sum_explode_at if sum_explode_at is not None else term.explode_at
+            # Fudge dice are drawn as d3 and shifted to -1..1
+            size = 3 if term.fudge else term.sides
+            for _ in range(term.count):
+                chain = []
+                chains.append(chain)
+                dice_by_size[size].append((chain, None if term.fudge else explode_at))
+
+    # Draw all dice of each size at once, then each round of explosions the same way
+    pending = dice_by_size
+    while pending:
+        exploding = defaultdict(list)
+        for size, dice in pending.items():
+            for (chain, explode_at), roll in zip(dice, _draw(size, len(dice))):
+                chain.append(roll)
+                if explode_at is not None and roll >= explode_at and len(chain) <= MAX_EXPLOSIONS:
+                    exploding[size].append((chain, explode_at))
+        pending = exploding
+
+    for index, expression in expressions.items():
+        request = requests[index]
+        rolled_terms = []
+        for term_index, term in enumerate(expression.terms):
+            dice = term_dice[(index, term_index)]
+            if isinstance(term, DiceTerm) and term.fudge:
+                dice = [[roll - 2 for roll in chain] for chain in dice]
+            rolled_terms.append(RolledTerm(term, dice, term.select_kept(dice) if isinstance(term, DiceTerm) else []))
+
+        result = results[index]
+        result.rolled_terms = rolled_terms
+        if is_pool:
+            # Count successes on every roll of added dice, like the pool roller
+            target_number = int(config.target_number) if config.target_number is not None else 8
+            result.total = sum(
+                1
+                for rolled in rolled_terms if rolled.is_dice and rolled.term.sign > 0 and not rolled.term.fudge
+                for chain, kept in zip(rolled.dice, rolled.kept) if kept
+                for roll in chain if check_success(config, roll, target_number)
+            )
+            if request.difficulty is not None:
+                result.success = result.total >= request.difficulty
+        else:
+            result.total = sum(rolled.total for rolled in rolled_terms) + request.modifier
+            if request.difficulty is not None:
+                result.success = check_success(config, result.total, request.difficulty)
+    return results
+
+def _compact_dice(rolled_terms: List[RolledTerm], max_length: int = 40) -> str:
+    text = " ".join(f"[{', '.join(rolled.describe_dice())}]" for rolled in rolled_terms if rolled.is_dice)
+    return text if len(text) <= max_length else text[:max_length - 1] + "…"
+
+def build_batch_summary_embed(title: str, results: List[BatchRollResult], counts_successes: bool = False, max_rows: int = 25) -> discord.Embed:
+    """Compact summary of a batch: one line per roll plus overall stats"""
+    rolled = [result for result in results if result.error is None]
+    unit = " successes" if counts_successes else ""
+
+    lines = []
+    for result in results[:max_rows]:
+        if result.error:
+            lines.append(f"**{result.request.label}:** ❌ {result.error}")
+            continue
+        mark = "" if result.success is None else (" ✅" if result.success else " ❌")
+        lines.append(f"**{result.request.label}:** {result.total}{unit}{mark} {_compact_dice(result.rolled_terms)}")
+    if len(results) > max_rows:
+        lines.append(f"...and {len(results) - max_rows} more")
+
+    embed = discord.Embed(title=title, description="\n".join(lines)[:4096], color=discord.Color.blue())
+    if rolled:
+        totals = [result.total for result in rolled]
+        stats = f"{len(rolled)} rolls • average {sum(totals) / len(totals):.1f}{unit} • range {min(totals)}–{max(totals)}"
+        judged = [result for result in rolled if result.success is not None]
+        if judged:
+            stats += f" • {sum(1 for result in judged if result.success)}/{len(judged)} succeeded"
+        embed.set_footer(text=stats)
+    return embed
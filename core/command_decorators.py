@@ -21,7 +21,7 @@ def channel_restricted(allowed_types: List[str]):
         @wraps(func)
         async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
             # Get the channel type for this channel
-            channel_type = repositories.channel_permissions.get_channel_type(
+            channel_type = await repositories.channel_permissions.get_channel_type_async(
                 str(interaction.guild.id), 
                 str(interaction.channel.id)
             )
@@ -157,7 +157,7 @@ def system_required(required_system: SystemType):
         @wraps(func)
         async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
             # Get the current system for this server
-            current_system = repositories.server.get_system(str(interaction.guild.id))
+            current_system = await repositories.run(repositories.server.get_system, str(interaction.guild.id))
             
             if current_system != required_system:
                 system_name = required_system.value.upper()
@@ -0,0 +1,232 @@
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+# Limits shared by every roll engine
+MAX_DICE = 100
+MAX_SIDES = 1000
+# A die never explodes more often than this, so a threshold of 1 can't loop forever
+MAX_EXPLOSIONS = 100
+
+FUDGE_FACES = (-1, 0, 1)
+FUDGE_SYMBOLS = {-1: '-', 0: '0', 1: '+'}
+
+# One signed term: NdM or NdF with optional keep (khN, klN, kN) and explode (!, !N) suffixes, or a number
+_TERM_PATTERN = re.compile(
+    r'(?P<sign>[+-]?)(?:'
+    r'(?P<count>\d*)d(?P<sides>\d+|f)(?:(?P<keep>kh|kl|k)(?P<keep_count>\d+))?(?P<explode>!(?P<explode_at>\d+)?)?'
+    r'|(?P<constant>\d+))'
+)
+
+@dataclass(frozen=True)
+class DiceTerm:
+    """A group of identical dice, e.g. 3d6, 4dF, 3d6kh2 or 1d10!"""
+    sign: int
+    count: int
+    sides: int  # 0 for fudge dice
+    keep_highest: Optional[int] = None
+    keep_lowest: Optional[int] = None
+    explode_at: Optional[int] = None
+
+    @property
+    def fudge(self) -> bool:
+        return self.sides == 0
+
+    @property
+    def notation(self) -> str:
+        notation = f"{self.count}d{'F' if self.fudge else self.sides}"
+        if self.keep_highest is not None:
+            notation += f"kh{self.keep_highest}"
+        elif self.keep_lowest is not None:
+            notation += f"kl{self.keep_lowest}"
+        if self.explode_at is not None:
+            notation += "!" if self.explode_at == self.sides else f"!{self.explode_at}"
+        return notation
+
+    def roll(self, explode_at: Optional[int] = None, rng=random) -> "RolledTerm":
+        """Roll the dice. explode_at overrides the term's own explosion threshold."""
+        threshold = explode_at if explode_at is not None else self.explode_at
+        dice = []
+        for _ in range(self.count):
+            if self.fudge:
+                dice.append([rng.choice(FUDGE_FACES)])
+                continue
+            roll = rng.randint(1, self.sides)
+            chain = [roll]
+            while threshold is not None and roll >= threshold and len(chain) <= MAX_EXPLOSIONS:
+                roll = rng.randint(1, self.sides)
+                chain.append(roll)
+            dice.append(chain)
+        return RolledTerm(self, dice, self.select_kept(dice))
+
+    def select_kept(self, dice: List[List[int]]) -> List[bool]:
+        """Which rolled dice count towards the total under the keep-highest/lowest rule"""
+        keep = self.keep_highest if self.keep_highest is not None else self.keep_lowest
+        if keep is None or keep >= len(dice):
+            return [True] * len(dice)
+        order = sorted(range(len(dice)), key=lambda i: sum(dice[i]), reverse=self.keep_highest is not None)
+        kept_indexes = set(order[:keep])
+        return [i in kept_indexes for i in range(len(dice))]
+
+@dataclass(frozen=True)
+class ConstantTerm:
+    """A flat number added to or subtracted from the total"""
+    sign: int
+    value: int
+
+    @property
+    def notation(self) -> str:
+        return str(self.value)
+
+    def roll(self, explode_at: Optional[int] = None, rng=random) -> "RolledTerm":
+        return RolledTerm(self, [], [])
+
+Term = Union[DiceTerm, ConstantTerm]
+
+@dataclass
+class RolledTerm:
+    """The outcome of one term: each die is the list of its rolls (more than one when it exploded)"""
+    term: Term
+    dice: List[List[int]]
+    kept: List[bool]
+
+    @property
+    def is_dice(self) -> bool:
+        return isinstance(self.term, DiceTerm)
+
+    @property
+    def total(self) -> int:
+        if not self.is_dice:
+            return self.term.sign * self.term.value
+        return self.term.sign * sum(sum(chain) for chain, kept in zip(self.dice, self.kept) if kept)
+
+    def describe_dice(self) -> List[str]:
+        """Each die as display text: fudge symbols, [a+b] for explosions, struck through when dropped"""
+        descriptions = []
+        for chain, kept in zip(self.dice, self.kept):
+            if self.term.fudge:
+                text = FUDGE_SYMBOLS[chain[0]]
+            elif len(chain) > 1:
+                text = f"[{'+'.join(map(str, chain))}]"
+            else:
+                text = str(chain[0])
+            descriptions.append(text if kept else f"~~{text}~~")
+        return descriptions
+
+@dataclass(frozen=True)
+class DiceExpression:
+    """A compiled dice formula: a sum of signed dice and constant terms"""
+    source: str
+    terms: Tuple[Term, ...]
+
+    @property
+    def dice_terms(self) -> List[DiceTerm]:
+        return [term for term in self.terms if isinstance(term, DiceTerm)]
+
+    @property
+    def has_dice(self) -> bool:
+        return any(isinstance(term, DiceTerm) for term in self.terms)
+
+    @property
+    def constant(self) -> int:
+        """Sum of the flat modifiers"""
+        return sum(term.sign * term.value for term in self.terms if isinstance(term, ConstantTerm))
+
+    @property
+    def is_simple(self) -> bool:
+        """One added group of dice up front followed only by flat modifiers, like 2d6+3-1"""
+        return (
+            isinstance(self.terms[0], DiceTerm) and self.terms[0].sign > 0 and
+            all(isinstance(term, ConstantTerm) for term in self.terms[1:])
+        )
+
+    def within_limits(self) -> bool:
+        return all(term.count <= MAX_DICE and term.sides <= MAX_SIDES for term in self.dice_terms)
+
+    def dice_counts(self) -> Dict[int, int]:
+        """Number of added dice per die size, ignoring fudge dice and subtracted terms"""
+        counts = {}
+        for term in self.dice_terms:
+            if term.sign > 0 and not term.fudge:
+                counts[term.sides] = counts.get(term.sides, 0) + term.count
+        return counts
+
+    def roll(self, explode_at: Optional[int] = None, rng=random) -> List[RolledTerm]:
+        return [term.roll(explode_at, rng) for term in self.terms]
+
+    def roll_total(self, explode_at: Optional[int] = None, rng=random) -> int:
+        return sum(rolled.total for rolled in self.roll(explode_at, rng))
+
+def _parse(formula: str) -> Optional[DiceExpression]:
+    terms = []
+    position = 0
+    while position < len(formula):
+        match = _TERM_PATTERN.match(formula, position)
+        # Every term after the first needs an operator
+        if not match or match.end() == position or (terms and not match.group('sign')):
+            return None
+        sign = -1 if match.group('sign') == '-' else 1
+
+        if match.group('constant') is not None:
+            terms.append(ConstantTerm(sign, int(match.group('constant'))))
+        else:
+            fudge = match.group('sides') == 'f'
+            # Fate rolls four fudge dice unless told otherwise
+            count = int(match.group('count')) if match.group('count') else (4 if fudge else 1)
+            sides = 0 if fudge else int(match.group('sides'))
+            if sides == 0 and not fudge:
+                return None
+            keep_highest = keep_lowest = explode_at = None
+            if match.group('keep'):
+                if match.group('keep') == 'kl':
+                    keep_lowest = int(match.group('keep_count'))
+                else:
+                    keep_highest = int(match.group('keep_count'))
+            if match.group('explode'):
+                if fudge:
+                    return None
+                explode_at = int(match.group('explode_at')) if match.group('explode_at') else sides
+            terms.append(DiceTerm(sign, count, sides, keep_highest, keep_lowest, explode_at))
+        position = match.end()
+
+    return DiceExpression(formula, tuple(terms)) if terms else None
+
+@lru_cache(maxsize=1024)
+def _compile(formula: str) -> Optional[DiceExpression]:
+    return _parse(formula)
+
+def compile_dice_expression(formula: str) -> Optional[DiceExpression]:
+    """Compile a dice formula such as '2d6+3', '4dF+1' or '3d6kh2+1d4-1', or None if it isn't valid"""
+    if not isinstance(formula, str):
+        return None
+    return _compile(formula.replace(" ", "").lower())
+
+def is_dice_expression(value) -> bool:
+    """Whether a modifier value is a dice formula rather than a flat number"""
+    expression = compile_dice_expression(value) if isinstance(value, str) else None
+    return expression is not None and expression.has_dice
+
+def format_rolled_terms(rolled_terms: List[RolledTerm]) -> List[str]:
+    """Display parts like '1d20[15]', '+2d6[3, 4]', '-2'"""
+    parts = []
+    for rolled in rolled_terms:
+        sign_str = '-' if rolled.term.sign < 0 else ('+' if parts else '')
+        if rolled.is_dice:
+            parts.append(f"{sign_str}{rolled.term.notation}[{', '.join(rolled.describe_dice())}]")
+        else:
+            parts.append(f"{sign_str}{rolled.term.value}")
+    return parts
+
+def get_cache_stats() -> dict:
+    """Hit rate of the compiled formula cache"""
+    info = _compile.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_rate': info.hits / lookups if lookups else 0.0,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+    }
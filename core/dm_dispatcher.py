@@ -0,0 +1,172 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+import discord
+
+class TokenBucket:
+    """Token bucket that refills at rate tokens per second up to capacity"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self) -> float:
+        """Take a token if one is available. Returns 0, or how many seconds until one will be."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+class _DMJob:
+    def __init__(self, user_id: int, content: str):
+        self.user_id = user_id
+        self.content = content
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        return (self.user_id, self.content)
+
+class DMDispatcher:
+    """
+    Queue for bot DMs that paces sends with a global and a per-user token bucket,
+    retries rate-limited sends with backoff and drops duplicates of messages still pending.
+    """
+    GLOBAL_RATE_PER_SECOND = 5
+    GLOBAL_BURST = 5
+    PER_USER_RATE_PER_SECOND = 0.2
+    PER_USER_BURST = 2
+    MAX_ATTEMPTS = 5
+    BASE_BACKOFF_SECONDS = 2
+
+    def __init__(self):
+        self.bot: Optional[discord.Client] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[Tuple[int, str], _DMJob] = {}
+        self._delayed = 0
+        self._global_bucket = TokenBucket(self.GLOBAL_RATE_PER_SECOND, self.GLOBAL_BURST)
+        self._user_buckets: Dict[int, TokenBucket] = {}
+
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.duplicates_dropped = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def start(self, bot: discord.Client) -> None:
+        """Start the send loop on the bot's event loop"""
+        self.bot = bot
+        self._queue = asyncio.Queue()
+        bot.loop.create_task(self._run())
+
+    def enqueue(self, user_id: int, content: str) -> bool:
+        """Queue a DM. Returns False if an identical DM to the same user is already pending."""
+        job = _DMJob(int(user_id), content)
+        if job.key in self._pending:
+            self.duplicates_dropped += 1
+            return False
+        self._pending[job.key] = job
+        self._queue.put_nowait(job)
+        return True
+
+    def _requeue_later(self, job: _DMJob, delay: float) -> None:
+        self._delayed += 1
+
+        def requeue():
+            self._delayed -= 1
+            self._queue.put_nowait(job)
+
+        self.bot.loop.call_later(delay, requeue)
+
+    def _user_bucket(self, user_id: int) -> TokenBucket:
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            bucket = self._user_buckets[user_id] = TokenBucket(self.PER_USER_RATE_PER_SECOND, self.PER_USER_BURST)
+        return bucket
+
+    async def _run(self) -> None:
+        while not self.bot.is_closed():
+            job = await self._queue.get()
+            try:
+                # Don't let one chatty recipient hold up the queue; park their DM until their bucket refills
+                user_wait = self._user_bucket(job.user_id).try_take()
+                if user_wait:
+                    self._requeue_later(job, user_wait)
+                    continue
+
+                global_wait = self._global_bucket.try_take()
+                while global_wait:
+                    await asyncio.sleep(global_wait)
+                    global_wait = self._global_bucket.try_take()
+
+                await self._send(job)
+            except Exception as e:
+                logging.error(f"Error in DM dispatcher: {e}")
+                self._finish(job, sent=False)
+            finally:
+                self._prune_user_buckets()
+
+    async def _send(self, job: _DMJob) -> None:
+        job.attempts += 1
+        try:
+            user = self.bot.get_user(job.user_id) or await self.bot.fetch_user(job.user_id)
+            await user.send(job.content)
+            self._finish(job, sent=True)
+        except discord.Forbidden:
+            # Can't DM user - they have DMs disabled
+            self._finish(job, sent=False)
+        except discord.HTTPException as e:
+            if e.status == 429 or e.status >= 500:
+                if job.attempts < self.MAX_ATTEMPTS:
+                    retry_after = getattr(e, 'retry_after', None) or self.BASE_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+                    self.retries += 1
+                    self._requeue_later(job, retry_after)
+                    return
+            print(f"Error sending DM to {job.user_id}: {e}")
+            self._finish(job, sent=False)
+
+    def _finish(self, job: _DMJob, sent: bool) -> None:
+        self._pending.pop(job.key, None)
+        if sent:
+            latency = time.monotonic() - job.enqueued_at
+            self.sent += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+        else:
+            self.failed += 1
+
+    def _prune_user_buckets(self) -> None:
+        """Forget buckets that have fully refilled so the map doesn't grow with every user ever messaged"""
+        if len(self._user_buckets) > 1000:
+            self._user_buckets = {user_id: bucket for user_id, bucket in self._user_buckets.items() if not bucket.is_full()}
+
+    def get_stats(self) -> dict:
+        """Queue depth and send latency metrics"""
+        return {
+            'queued': self._queue.qsize() if self._queue else 0,
+            'delayed': self._delayed,
+            'pending': len(self._pending),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'duplicates_dropped': self.duplicates_dropped,
+            'avg_latency_seconds': self._total_latency / self.sent if self.sent else 0.0,
+            'max_latency_seconds': self._max_latency,
+        }
+
+dm_dispatcher = DMDispatcher()
@@ -3,7 +3,7 @@ import discord
 from discord import ui
 
 from core.generic_roll_mechanics import execute_roll
-from .base_models import AccessType, BaseCharacter, BaseEntity, EntityDefaults, EntityType, EntityLinkType, SystemType
+from .base_models import AccessType, BaseCharacter, BaseEntity, EntityDefaults, EntityType, SystemType
 from .inventory_views import EditInventoryView
 from .shared_views import EditNameModal, EditNotesModal
 from .generic_roll_formulas import GenericRollFormula, RollFormula
@@ -116,7 +116,11 @@ class GenericCharacter(BaseCharacter):
         """
         Prints the roll result using configured roll mechanics
         """
-        result = execute_roll(roll_formula_obj, modifier=0, difficulty=difficulty)
+        try:
+            result = execute_roll(roll_formula_obj, modifier=0, difficulty=difficulty)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {str(e)}", ephemeral=True)
+            return
         await interaction.response.send_message(result['description'], ephemeral=False)
 
 class GenericCompanion(BaseCharacter):
@@ -185,7 +189,11 @@ class GenericCompanion(BaseCharacter):
         """
         Prints the roll result using configured roll mechanics
         """
-        result = execute_roll(roll_formula_obj, modifier=0, difficulty=difficulty)
+        try:
+            result = execute_roll(roll_formula_obj, modifier=0, difficulty=difficulty)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {str(e)}", ephemeral=True)
+            return
         await interaction.response.send_message(result['description'], ephemeral=False)
 
 class GenericSheetEditView(ui.View):
@@ -282,21 +290,19 @@ class GenericContainer(BaseEntity):
             )
         
         # Show contained items (visible to everyone who can access the container)
-        contained_items = self.get_contained_items(guild_id)
-        if contained_items:
+        # One query loads nested contents too (a pouch inside the chest, and so on)
+        tree = self.get_possession_tree(guild_id)
+        contained_nodes = [node for node in tree.children if node.entity.entity_type == EntityType.ITEM]
+        if contained_nodes:
             items_display = []
-            for item in contained_items:
-                # Get quantity from link metadata if available
-                links = self.get_links_to_entity(guild_id, item.id, EntityLinkType.POSSESSES)
-                quantity = 1
-                if links:
-                    quantity = links[0].metadata.get("quantity", 1)
-                
-                quantity_str = f" x{quantity}" if quantity > 1 else ""
-                items_display.append(f"• {item.name}{quantity_str}")
+            for node in contained_nodes:
+                quantity_str = f" x{node.quantity}" if node.quantity > 1 else ""
+                nested_count = node.descendant_count
+                nested_str = f" (holds {nested_count})" if nested_count else ""
+                items_display.append(f"• {node.entity.name}{quantity_str}{nested_str}")
             
             embed.add_field(
-                name=f"📦 Contents ({len(contained_items)})",
+                name=f"📦 Contents ({len(contained_nodes)})",
                 value="\n".join(items_display)[:1024],
                 inline=False
             )
@@ -610,13 +616,11 @@ class ContainerTakeView(ui.View):
         """Get items available in the container"""
         from data.repositories.repository_factory import repositories
         container = repositories.entity.get_by_id(self.container_id)
-        items = container.get_contained_items(self.guild_id)
+        item_nodes = container.get_item_nodes(self.guild_id)
         
         options = []
-        for item in items[:25]:
-            # Get quantity
-            links = container.get_links_to_entity(self.guild_id, item.id, EntityLinkType.POSSESSES)
-            quantity = links[0].metadata.get("quantity", 1) if links else 1
+        for node in item_nodes[:25]:
+            item, quantity = node.entity, node.quantity
             quantity_str = f" (x{quantity})" if quantity > 1 else ""
             
             options.append(discord.SelectOption(
@@ -652,16 +656,14 @@ class ContainerTakeView(ui.View):
         
         from data.repositories.repository_factory import repositories
         container = repositories.entity.get_by_id(self.container_id)
-        items = container.get_contained_items(self.guild_id)
-        selected_item_entity = next((item for item in items if item.id == selected_item_id), None)
+        selected_node = next((node for node in container.get_item_nodes(self.guild_id) if node.entity.id == selected_item_id), None)
         
-        if not selected_item_entity:
+        if not selected_node:
             await interaction.response.send_message("❌ Selected item not found.", ephemeral=True)
             return
         
-        # Get quantity
-        links = container.get_links_to_entity(self.guild_id, selected_item_id, EntityLinkType.POSSESSES)
-        quantity = links[0].metadata.get("quantity", 1) if links else 1
+        selected_item_entity = selected_node.entity
+        quantity = selected_node.quantity
         
         self.selected_item = {
             'id': selected_item_id,
@@ -825,13 +827,11 @@ class ContainerGiveView(ui.View):
             return []
         
         character = self.selected_character['entity']
-        items = character.get_inventory(self.guild_id)
+        item_nodes = character.get_item_nodes(self.guild_id)
         
         options = []
-        for item in items[:25]:
-            # Get quantity
-            links = character.get_links_to_entity(self.guild_id, item.id, EntityLinkType.POSSESSES)
-            quantity = links[0].metadata.get("quantity", 1) if links else 1
+        for node in item_nodes[:25]:
+            item, quantity = node.entity, node.quantity
             quantity_str = f" (x{quantity})" if quantity > 1 else ""
             
             options.append(discord.SelectOption(
@@ -883,16 +883,14 @@ class ContainerGiveView(ui.View):
         selected_item_id = interaction.data['values'][0]
         
         character = self.selected_character['entity']
-        items = character.get_inventory(self.guild_id)
-        selected_item_entity = next((item for item in items if item.id == selected_item_id), None)
+        selected_node = next((node for node in character.get_item_nodes(self.guild_id) if node.entity.id == selected_item_id), None)
         
-        if not selected_item_entity:
+        if not selected_node:
             await interaction.response.send_message("❌ Selected item not found.", ephemeral=True)
             return
         
-        # Get quantity
-        links = character.get_links_to_entity(self.guild_id, selected_item_id, EntityLinkType.POSSESSES)
-        quantity = links[0].metadata.get("quantity", 1) if links else 1
+        selected_item_entity = selected_node.entity
+        quantity = selected_node.quantity
         
         self.selected_item = {
             'id': selected_item_id,
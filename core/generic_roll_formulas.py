@@ -1,13 +1,18 @@
 from abc import ABC
-import random
-import re
 from typing import Dict, TYPE_CHECKING
 
+from core.batch_roll import BatchRollRequest
+from core.dice_expression import MAX_DICE, MAX_SIDES, compile_dice_expression, is_dice_expression
 from core.generic_roll_mechanics import RollMechanicConfig
 
 if TYPE_CHECKING:
     from core.base_models import BaseCharacter
 
+def signed_term(value) -> str:
+    """A modifier as a term to append to a formula; '-1d4' stays '-1d4' rather than becoming '+-1d4'"""
+    term = str(value).strip()
+    return term if term.startswith(("+", "-")) else f"+{term}"
+
 class RollFormula(ABC):
     """
     A flexible container for roll parameters (e.g., skill, attribute, modifiers).
@@ -52,8 +57,8 @@ class RollFormula(ABC):
         total_numeric_modifier = 0
         
         for key, value in self.modifiers.items():
-            if isinstance(value, str) and re.match(r'^\d*d\d+', value.replace(" ", "")):
-                dice_formulas.append(f"+{value}")
+            if is_dice_expression(value):
+                dice_formulas.append(signed_term(value))
             else:
                 try:
                     mod = int(value)
@@ -84,7 +89,7 @@ class RollFormula(ABC):
 
         # Gather all modifiers and their sources, supporting dice formulas
         for key, value in self.get_modifiers(character).items():
-            if isinstance(value, str) and re.match(r'^\d*d\d+', value.replace(" ", "")):
+            if is_dice_expression(value):
                 mod, desc = RollFormula.roll_dice_formula(value)
                 rolled_mods[key] = mod  # Store the rolled value for later use
                 total_mod += mod
@@ -108,65 +113,59 @@ class RollFormula(ABC):
             else:
                 formula += f"{mod}"
 
-        formula = formula.replace(" ", "").lower()
-        fudge_pattern = r'(\d*)d[fF]((?:[+-]\d+)*)'
-        fudge_match = re.fullmatch(fudge_pattern, formula)
-        if fudge_match:
-            num_dice = int(fudge_match.group(1)) if fudge_match.group(1) else 4
-            modifiers_str = fudge_match.group(2) or ""
-            modifiers_list = [int(m) for m in re.findall(r'[+-]\d+', modifiers_str)]
-            modifier = sum(modifiers_list)
-            rolls = [random.choice([-1, 0, 1]) for _ in range(num_dice)]
-            symbols = ['+' if r == 1 else '-' if r == -1 else '0' for r in rolls]
-            total = sum(rolls) + modifier
-            # Compose the detailed formula string
-            formula_str = f"{base_roll} `{' '.join(symbols)}`"
-            if modifier_descriptions:
-                formula_str += " + " + " + ".join(modifier_descriptions)
-            response = f'🎲 {formula_str}\n🧮 Total: {total}'
-            return response, total
+        expression = compile_dice_expression(formula)
+        if expression is None or not expression.has_dice:
+            return "❌ Invalid format. Use like `2d6+3-2`, `1d20+5-1`, `1d100`, or `4df+1`.", None
+        if not expression.within_limits():
+            return "😵 That's a lot of dice. Try fewer.", None
 
-        # Accepts 1d20+3-2, 2d6+1-1, etc.
-        pattern = r'(\d*)d(\d+)((?:[+-]\d+)*)'
-        match = re.fullmatch(pattern, formula)
-        if match:
-            num_dice = int(match.group(1)) if match.group(1) else 1
-            die_size = int(match.group(2))
-            modifiers_str = match.group(3) or ""
-            modifiers_list = [int(m) for m in re.findall(r'[+-]\d+', modifiers_str)]
-            modifier = sum(modifiers_list)
-            if num_dice > 100 or die_size > 1000:
-                return "😵 That's a lot of dice. Try fewer.", None
-            rolls = [random.randint(1, die_size) for _ in range(num_dice)]
-            total = sum(rolls) + modifier
-            # Compose the detailed formula string
-            formula_str = f"{base_roll} [{', '.join(str(r) for r in rolls)}]"
-            if modifier_descriptions:
-                formula_str += " + " + " + ".join(modifier_descriptions)
-            response = f'🎲 {formula_str}\n🧮 Total: {total}'
-            return response, total
+        rolled_terms = expression.roll()
+        total = sum(rolled.total for rolled in rolled_terms)
+        rolled_dice = [rolled for rolled in rolled_terms if rolled.is_dice]
+
+        # Compose the detailed formula string
+        if len(rolled_dice) == 1 and rolled_dice[0].term.fudge:
+            formula_str = f"{base_roll} `{' '.join(rolled_dice[0].describe_dice())}`"
+        elif len(rolled_dice) == 1:
+            formula_str = f"{base_roll} [{', '.join(rolled_dice[0].describe_dice())}]"
+        else:
+            formula_str = f"{base_roll} " + " ".join(
+                f"{rolled.term.notation}[{', '.join(rolled.describe_dice())}]" for rolled in rolled_dice
+            )
+        if modifier_descriptions:
+            formula_str += " + " + " + ".join(modifier_descriptions)
+        response = f'🎲 {formula_str}\n🧮 Total: {total}'
+        return response, total
 
-        return "❌ Invalid format. Use like `2d6+3-2`, `1d20+5-1`, `1d100`, or `4df+1`.", None
+    def to_batch_request(self, character: "BaseCharacter", difficulty: int = None) -> BatchRollRequest:
+        """This roll for one character as an entry in a batch roll"""
+        return self._batch_request(character, self.roll_config.dice_formula or "1d20", self.get_modifiers(character), difficulty)
+
+    @staticmethod
+    def _batch_request(character: "BaseCharacter", formula: str, modifiers: dict, difficulty: int = None) -> BatchRollRequest:
+        modifier = 0
+        for value in modifiers.values():
+            if isinstance(value, bool):
+                continue
+            if is_dice_expression(value):
+                formula += signed_term(value)
+            else:
+                try:
+                    modifier += int(value)
+                except (ValueError, TypeError):
+                    continue
+        return BatchRollRequest(character.name, formula, modifier, difficulty)
 
     @staticmethod
     def roll_dice_formula(formula: str):
-        formula = formula.replace(" ", "").lower()
-        pattern = r'(\d*)d(\d+)((?:[+-]\d+)*)'
-        match = re.fullmatch(pattern, formula)
-        if match:
-            num_dice = int(match.group(1)) if match.group(1) else 1
-            die_size = int(match.group(2))
-            modifiers_str = match.group(3) or ""
-            modifiers_list = [int(m) for m in re.findall(r'[+-]\d+', modifiers_str)]
-            modifier = sum(modifiers_list)
-            rolls = [random.randint(1, die_size) for _ in range(num_dice)]
-            subtotal = sum(rolls) + modifier
-            return subtotal, f"{formula} [{subtotal}]"
-        # Try to parse as a simple integer
-        try:
-            return int(formula), str(formula)
-        except Exception:
-            return 0, formula
+        expression = compile_dice_expression(formula)
+        if expression is None:
+            return 0, formula.replace(" ", "").lower()
+        subtotal = expression.roll_total()
+        if expression.has_dice:
+            return subtotal, f"{expression.source} [{subtotal}]"
+        # Plain number
+        return subtotal, expression.source
         
     @staticmethod
     def roll_parameters_to_dict(roll_parameters: str) -> dict:
@@ -306,20 +305,15 @@ class DicePoolRollFormula(RollFormula):
     
     def _add_dice_to_count(self, dice_expr: str, dice_counts: dict):
         """Parse a dice expression and add to the count dictionary"""
-        # Handle expressions like "3d20", "d12", "2d6", "1d10"
-        dice_expr = dice_expr.strip().lower()
-        
-        # Match patterns like "3d20" or "d12"
-        match = re.match(r'^(\d*)d(\d+)$', dice_expr)
-        if match:
-            count = int(match.group(1)) if match.group(1) else 1
-            die_size = int(match.group(2))
-            
+        # Handle expressions like "3d20", "d12", "2d6", "1d10" or "2d6+1d4"
+        expression = compile_dice_expression(dice_expr)
+        if expression is None:
+            return
+
+        for die_size, count in expression.dice_counts().items():
             # Validate reasonable limits
-            if count > 100:
-                count = 100  # Cap at 100 dice
-            if die_size > 1000:
-                die_size = 1000  # Cap at d1000
+            count = min(count, MAX_DICE)  # Cap at 100 dice
+            die_size = min(die_size, MAX_SIDES)  # Cap at d1000
             
             dice_counts[die_size] = dice_counts.get(die_size, 0) + count
 
@@ -3,8 +3,7 @@ from enum import Enum
 from typing import TYPE_CHECKING, Optional, Dict, Any
 import discord
 from discord import ui
-import re
-import random
+from core.dice_expression import MAX_DICE, MAX_SIDES, DiceExpression, DiceTerm, compile_dice_expression, format_rolled_terms
 
 if TYPE_CHECKING:
     from core.generic_roll_formulas import RollFormula
@@ -81,166 +80,61 @@ def execute_roll(roll_formula_obj: 'RollFormula', modifier: int = 0, difficulty:
     else:
         return {"total": 0, "rolls": [], "description": "Unknown mechanic", "success": False}
 
+def configured_explode_threshold(config: RollMechanicConfig) -> Optional[int]:
+    """Threshold at which summed dice explode, if the server turned exploding dice on"""
+    if config.exploding_dice and config.explode_threshold:
+        return int(config.explode_threshold)
+    return None
+
+def compile_roll_formula(roll_formula_obj: 'RollFormula') -> DiceExpression:
+    """Compile the formula's total dice formula, raising ValueError if it's invalid or too big"""
+    formula = roll_formula_obj.get_total_dice_formula()
+    expression = compile_dice_expression(formula)
+    if expression is None:
+        raise ValueError(f"Invalid dice formula: {formula}")
+    if not expression.within_limits():
+        raise ValueError(f"Too many dice in {formula} (max {MAX_DICE} dice of up to {MAX_SIDES} sides)")
+    return expression
+
+def check_success(config: RollMechanicConfig, value: int, target: int) -> bool:
+    """Whether a result meets the target under the configured success criteria"""
+    if config.success_criteria == SuccessCriteria.GREATER_EQUAL:
+        return value >= target
+    elif config.success_criteria == SuccessCriteria.LESS_EQUAL:
+        return value <= target
+    elif config.success_criteria == SuccessCriteria.EQUAL:
+        return value == target
+    return False
+
 def _execute_roll_and_sum(roll_formula_obj: 'RollFormula', modifier: int, difficulty: Optional[int]) -> Dict[str, Any]:
     """Execute roll-and-sum mechanic with support for complex dice formulas"""
-    formula = roll_formula_obj.get_total_dice_formula().replace(' ', '').lower()
-    
-    # Check if this is a simple formula (single dice type with numeric modifiers only)
-    simple_pattern = r'^(\d*)d(\d+)([+-]\d+)*$'
-    simple_match = re.match(simple_pattern, formula)
-    
-    if simple_match:
-        # Handle simple formula efficiently
-        num_dice = int(simple_match.group(1)) if simple_match.group(1) else 1
-        die_size = int(simple_match.group(2))
-        modifiers_str = simple_match.group(3) or ""
-        modifiers_list = [int(m) for m in re.findall(r'[+-]\d+', modifiers_str)]
-        formula_modifier = sum(modifiers_list)
-        
-        # Roll dice
-        rolls = []
-        for _ in range(num_dice):
-            roll = random.randint(1, die_size)
-            # Handle exploding dice
-            if roll_formula_obj.roll_config.exploding_dice and roll_formula_obj.roll_config.explode_threshold and roll >= roll_formula_obj.roll_config.explode_threshold:
-                explosion_rolls = [roll]
-                while roll >= roll_formula_obj.roll_config.explode_threshold:
-                    roll = random.randint(1, die_size)
-                    explosion_rolls.append(roll)
-                rolls.append(explosion_rolls)
-            else:
-                rolls.append(roll)
-        
-        # Calculate total
-        total = 0
-        for roll_result in rolls:
-            if isinstance(roll_result, list):  # Exploding dice
-                total += sum(roll_result)
-            else:
-                total += roll_result
-        
-        total += formula_modifier + modifier
-        
-        # Format description
-        roll_desc = []
-        for roll_result in rolls:
-            if isinstance(roll_result, list):  # Exploding dice
-                roll_desc.append(f"[{'+'.join(map(str, roll_result))}]")
-            else:
-                roll_desc.append(str(roll_result))
-        
-        description = f"{roll_formula_obj.roll_config.dice_formula}: [{', '.join(roll_desc)}]"
+    config = roll_formula_obj.roll_config
+    expression = compile_roll_formula(roll_formula_obj)
+    rolled_terms = expression.roll(configured_explode_threshold(config))
+    total = sum(rolled.total for rolled in rolled_terms) + modifier
+
+    if expression.is_simple:
+        # Single dice type with numeric modifiers only
+        dice = rolled_terms[0]
+        formula_modifier = expression.constant
+        rolls = [chain if len(chain) > 1 else chain[0] for chain in dice.dice]
+
+        description = f"{config.dice_formula}: [{', '.join(dice.describe_dice())}]"
         if formula_modifier != 0:
             description += f" {'+' if formula_modifier >= 0 else ''}{formula_modifier}"
-        if modifier != 0:
-            description += f" {'+' if modifier >= 0 else ''}{modifier}"
-        description += f" = {total}"
-        
     else:
-        # Handle complex formula with mixed dice types
-        total_value = 0
-        roll_parts = []
-        
-        # Split formula into parts while preserving operators
-        parts = re.split(r'([+-])', formula)
-        current_sign = 1  # Start positive
-        
-        for i, part in enumerate(parts):
-            if part == '+':
-                current_sign = 1
-                continue
-            elif part == '-':
-                current_sign = -1
-                continue
-            
-            if 'd' in part:
-                # This is a dice expression
-                dice_match = re.match(r'^(\d*)d(\d+)$', part)
-                if not dice_match:
-                    continue
-                
-                num_dice = int(dice_match.group(1)) if dice_match.group(1) else 1
-                die_size = int(dice_match.group(2))
-                
-                # Roll the dice
-                dice_rolls = []
-                for _ in range(num_dice):
-                    roll = random.randint(1, die_size)
-                    
-                    # Handle exploding dice
-                    if roll_formula_obj.roll_config.exploding_dice and roll_formula_obj.roll_config.explode_threshold and roll >= roll_formula_obj.roll_config.explode_threshold:
-                        explosion_rolls = [roll]
-                        while roll >= roll_formula_obj.roll_config.explode_threshold:
-                            roll = random.randint(1, die_size)
-                            explosion_rolls.append(roll)
-                        dice_rolls.append(explosion_rolls)
-                    else:
-                        dice_rolls.append(roll)
-                
-                # Calculate subtotal for this dice group
-                subtotal = 0
-                roll_desc_parts = []
-                for roll_result in dice_rolls:
-                    if isinstance(roll_result, list):  # Exploding dice
-                        subtotal += sum(roll_result)
-                        roll_desc_parts.append(f"[{'+'.join(map(str, roll_result))}]")
-                    else:
-                        subtotal += roll_result
-                        roll_desc_parts.append(str(roll_result))
-                
-                # Apply sign and add to total
-                signed_subtotal = current_sign * subtotal
-                total_value += signed_subtotal
-                
-                # Format description part
-                sign_str = '+' if current_sign > 0 and roll_parts else ''
-                if current_sign < 0:
-                    sign_str = '-'
-                
-                if num_dice == 1:
-                    roll_parts.append(f"{sign_str}{part}[{roll_desc_parts[0]}]")
-                else:
-                    roll_parts.append(f"{sign_str}{part}[{', '.join(roll_desc_parts)}]")
-            
-            else:
-                # This is a numeric modifier
-                try:
-                    numeric_value = int(part)
-                    signed_value = current_sign * numeric_value
-                    total_value += signed_value
-                    
-                    sign_str = '+' if current_sign > 0 and roll_parts else ''
-                    if current_sign < 0:
-                        sign_str = '-'
-                    
-                    roll_parts.append(f"{sign_str}{abs(numeric_value)}")
-                except ValueError:
-                    continue
-        
-        # Add the character modifier
-        total_value += modifier
-        total = total_value
-        
-        # Format description for complex formula
-        description = ''.join(roll_parts)
-        if modifier != 0:
-            description += f" {'+' if modifier >= 0 else ''}{modifier}"
-        description += f" = {total}"
-        
-        # Set rolls to the formatted parts for complex formulas
-        rolls = roll_parts
-    
+        # Mixed dice types: describe each term, and keep the formatted parts as the rolls
+        rolls = format_rolled_terms(rolled_terms)
+        description = ''.join(rolls)
+
+    if modifier != 0:
+        description += f" {'+' if modifier >= 0 else ''}{modifier}"
+    description += f" = {total}"
+
     # Check success if target provided
     success = None
     if difficulty is not None:
-        if roll_formula_obj.roll_config.success_criteria == SuccessCriteria.GREATER_EQUAL:
-            success = total >= difficulty
-        elif roll_formula_obj.roll_config.success_criteria == SuccessCriteria.LESS_EQUAL:
-            success = total <= difficulty
-        elif roll_formula_obj.roll_config.success_criteria == SuccessCriteria.EQUAL:
-            success = total == difficulty
-    
-    if difficulty is not None:
+        success = check_success(config, total, difficulty)
         description += f" vs {difficulty} ({'✅' if success else '❌'})"
     
     return {
@@ -254,13 +148,8 @@ def _execute_roll_and_sum(roll_formula_obj: 'RollFormula', modifier: int, diffic
 
 def _execute_dice_pool(roll_formula_obj: 'RollFormula', difficulty: Optional[int]) -> Dict[str, Any]:
     """Execute dice pool mechanic - supports mixed die types"""
-    import re
-
-    formula = roll_formula_obj.get_total_dice_formula().replace(' ', '').lower()
-
-    # Parse complex dice formulas (e.g., "1d20+2d6+1d4" or "3d10-1d8")
-    # Split formula into parts while preserving operators
-    parts = re.split(r'([+-])', formula)
+    config = roll_formula_obj.roll_config
+    expression = compile_roll_formula(roll_formula_obj)
     
     # Roll dice pool with mixed die types
     all_rolls = []
@@ -268,74 +157,34 @@ def _execute_dice_pool(roll_formula_obj: 'RollFormula', difficulty: Optional[int
     total_dice_count = 0
     
     # Ensure target_number and explode_threshold are integers
-    target_number = int(roll_formula_obj.roll_config.target_number) if roll_formula_obj.roll_config.target_number is not None else 8
-    explode_threshold = int(roll_formula_obj.roll_config.explode_threshold) if roll_formula_obj.roll_config.explode_threshold is not None else None
+    target_number = int(config.target_number) if config.target_number is not None else 8
+    explode_threshold = int(config.explode_threshold) if config.explode_threshold is not None else None
 
-    current_sign = 1  # Start positive
-    
-    for i, part in enumerate(parts):
-        if part == '+':
-            current_sign = 1
-            continue
-        elif part == '-':
-            current_sign = -1
-            continue
-        
-        # Skip numeric modifiers in dice pools - only process dice expressions
-        if 'd' not in part:
+    for term in expression.dice_terms:
+        # Numeric modifiers don't matter in dice pools, and only added dice count
+        if term.sign < 0 or term.fudge:
             continue
-            
-        # Parse dice expression (e.g., "2d10", "1d6", "3d8")
-        dice_match = re.match(r'^(\d*)d(\d+)$', part)
-        if not dice_match:
-            continue
-        
-        num_dice = int(dice_match.group(1)) if dice_match.group(1) else 1
-        die_size = int(dice_match.group(2))
-        
-        # Only count dice if they're being added (positive sign)
-        if current_sign < 0:
-            continue
-            
-        total_dice_count += num_dice
-        
-        # Roll each die of this type
-        for _ in range(num_dice):
-            roll = random.randint(1, die_size)
-            original_roll = roll
-            
-            # Handle exploding dice - use die-specific threshold if not set globally
-            explosion_rolls = [roll]
-            effective_explode_threshold = explode_threshold if explode_threshold is not None else die_size
 
-            if roll_formula_obj.roll_config.exploding_dice and roll >= effective_explode_threshold:
-                while roll >= effective_explode_threshold:
-                    roll = random.randint(1, die_size)
-                    explosion_rolls.append(roll)
-            
+        # Use die-specific explosion threshold if not set globally
+        explode_at = None
+        if config.exploding_dice:
+            explode_at = explode_threshold if explode_threshold is not None else term.sides
+        rolled = term.roll(explode_at)
+
+        for explosion_rolls, kept in zip(rolled.dice, rolled.kept):
+            if not kept:
+                continue
+            total_dice_count += 1
+
             # Count successes for each exploding die individually
-            die_successes = 0
-            for explosion_roll in explosion_rolls:
-                roll_success = False
-                if roll_formula_obj.roll_config.success_criteria == SuccessCriteria.GREATER_EQUAL:
-                    roll_success = explosion_roll >= target_number
-                elif roll_formula_obj.roll_config.success_criteria == SuccessCriteria.LESS_EQUAL:
-                    roll_success = explosion_roll <= target_number
-                elif roll_formula_obj.roll_config.success_criteria == SuccessCriteria.EQUAL:
-                    roll_success = explosion_roll == target_number
-                
-                if roll_success:
-                    die_successes += 1
-            
+            die_successes = sum(1 for explosion_roll in explosion_rolls if check_success(config, explosion_roll, target_number))
             successes += die_successes
             
-            # Final value is still the sum for display purposes
-            final_value = sum(explosion_rolls) if len(explosion_rolls) > 1 else original_roll
-            
             all_rolls.append({
-                'value': final_value,
-                'original': original_roll,
-                'die_type': f"d{die_size}",
+                # Final value is still the sum for display purposes
+                'value': sum(explosion_rolls),
+                'original': explosion_rolls[0],
+                'die_type': f"d{term.sides}",
                 'exploded': len(explosion_rolls) > 1,
                 'explosion_rolls': explosion_rolls if len(explosion_rolls) > 1 else None,
                 'success': die_successes > 0,
@@ -354,10 +203,7 @@ def _execute_dice_pool(roll_formula_obj: 'RollFormula', difficulty: Optional[int
     # Format description grouped by die type
     die_groups = {}
     for roll_info in all_rolls:
-        die_type = roll_info['die_type']
-        if die_type not in die_groups:
-            die_groups[die_type] = []
-        die_groups[die_type].append(roll_info)
+        die_groups.setdefault(roll_info['die_type'], []).append(roll_info)
     
     # Create grouped roll descriptions
     group_descriptions = []
@@ -379,7 +225,7 @@ def _execute_dice_pool(roll_formula_obj: 'RollFormula', difficulty: Optional[int
         group_descriptions.append(f"{len(group_rolls)}{die_type}: [{', '.join(roll_descs)}]")
     
     # Create a more readable description
-    description = f"{formula}: {' + '.join(group_descriptions)}"
+    description = f"{expression.source}: {' + '.join(group_descriptions)}"
     description += f" = {successes} successes"
     
     if difficulty is not None:
@@ -396,126 +242,8 @@ def _execute_dice_pool(roll_formula_obj: 'RollFormula', difficulty: Optional[int
 
 def _execute_custom_roll(roll_formula_obj: 'RollFormula', modifier: int, difficulty: Optional[int]) -> Dict[str, Any]:
     """Execute custom roll mechanic with support for complex dice formulas"""
-    import re
-
-    formula = roll_formula_obj.get_total_dice_formula().replace(' ', '').lower()
-
-    # Check if this is a simple formula that can use roll-and-sum
-    simple_pattern = r'^\d*d\d+([+-]\d+)*$'
-    if re.match(simple_pattern, formula):
-        # Simple formula with only numeric modifiers - use roll-and-sum
-        return _execute_roll_and_sum(roll_formula_obj, modifier, difficulty)
-    
-    # Complex formula with dice modifiers - need custom parsing
-    total_value = 0
-    roll_parts = []
-    
-    # Split formula into parts while preserving operators
-    parts = re.split(r'([+-])', formula)
-    current_sign = 1  # Start positive
-    
-    for i, part in enumerate(parts):
-        if part == '+':
-            current_sign = 1
-            continue
-        elif part == '-':
-            current_sign = -1
-            continue
-        
-        if 'd' in part:
-            # This is a dice expression
-            dice_match = re.match(r'^(\d*)d(\d+)$', part)
-            if not dice_match:
-                continue
-            
-            num_dice = int(dice_match.group(1)) if dice_match.group(1) else 1
-            die_size = int(dice_match.group(2))
-            
-            # Roll the dice
-            dice_rolls = []
-            for _ in range(num_dice):
-                roll = random.randint(1, die_size)
-                
-                # Handle exploding dice
-                if roll_formula_obj.roll_config.exploding_dice and roll_formula_obj.roll_config.explode_threshold and roll >= roll_formula_obj.roll_config.explode_threshold:
-                    explosion_rolls = [roll]
-                    while roll >= roll_formula_obj.roll_config.explode_threshold:
-                        roll = random.randint(1, die_size)
-                        explosion_rolls.append(roll)
-                    dice_rolls.append(explosion_rolls)
-                else:
-                    dice_rolls.append(roll)
-            
-            # Calculate subtotal for this dice group
-            subtotal = 0
-            roll_desc_parts = []
-            for roll_result in dice_rolls:
-                if isinstance(roll_result, list):  # Exploding dice
-                    subtotal += sum(roll_result)
-                    roll_desc_parts.append(f"[{'+'.join(map(str, roll_result))}]")
-                else:
-                    subtotal += roll_result
-                    roll_desc_parts.append(str(roll_result))
-            
-            # Apply sign and add to total
-            signed_subtotal = current_sign * subtotal
-            total_value += signed_subtotal
-            
-            # Format description part
-            sign_str = '+' if current_sign > 0 and roll_parts else ''
-            if current_sign < 0:
-                sign_str = '-'
-            
-            if num_dice == 1:
-                roll_parts.append(f"{sign_str}{part}[{roll_desc_parts[0]}]")
-            else:
-                roll_parts.append(f"{sign_str}{part}[{', '.join(roll_desc_parts)}]")
-        
-        else:
-            # This is a numeric modifier
-            try:
-                numeric_value = int(part)
-                signed_value = current_sign * numeric_value
-                total_value += signed_value
-                
-                sign_str = '+' if current_sign > 0 and roll_parts else ''
-                if current_sign < 0:
-                    sign_str = '-'
-                
-                roll_parts.append(f"{sign_str}{abs(numeric_value)}")
-            except ValueError:
-                continue
-    
-    # Add the character modifier
-    total_value += modifier
-    
-    # Check success if target provided
-    success = None
-    if difficulty is not None:
-        if roll_formula_obj.roll_config.success_criteria == SuccessCriteria.GREATER_EQUAL:
-            success = total_value >= difficulty
-        elif roll_formula_obj.roll_config.success_criteria == SuccessCriteria.LESS_EQUAL:
-            success = total_value <= difficulty
-        elif roll_formula_obj.roll_config.success_criteria == SuccessCriteria.EQUAL:
-            success = total_value == difficulty
-    
-    # Format description
-    description = ''.join(roll_parts)
-    if modifier != 0:
-        description += f" {'+' if modifier >= 0 else ''}{modifier}"
-    description += f" = {total_value}"
-    
-    if difficulty is not None:
-        description += f" vs {difficulty} ({'✅' if success else '❌'})"
-    
-    return {
-        "total": total_value,
-        "rolls": roll_parts,  # Store the formatted parts
-        "description": description,
-        "success": success,
-        "modifier": modifier,
-        "target": difficulty
-    }
+    # Custom formulas compile to the same expressions as roll-and-sum, so they share its evaluator
+    return _execute_roll_and_sum(roll_formula_obj, modifier, difficulty)
 
 class CoreRollMechanicSelectView(ui.View):
     """Main view for selecting core roll mechanic type"""
@@ -944,49 +672,14 @@ class CustomFormulaModal(ui.Modal, title="Custom Dice Formula"):
         await interaction.response.send_message("✅ Custom formula set!", ephemeral=True)
     
     def _validate_formula(self, formula: str) -> bool:
-        """Validate dice formula format - now supports dice in modifiers"""
-        import re
-        
-        # Remove spaces and convert to lowercase
-        clean_formula = formula.replace(' ', '').lower()
-        
-        # Pattern to match dice expressions with optional dice/numeric modifiers
-        # Examples: 1d20, 2d6+3, 3d8-2, 1d20+1d4, 2d6+1d6-1, 1d10+2d4-3
-        base_pattern = r'^\d*d\d+'  # Base dice (e.g., 1d20, 2d6)
-        modifier_pattern = r'([+-](?:\d*d\d+|\d+))*'  # Optional modifiers (dice or numbers)
-        full_pattern = base_pattern + modifier_pattern + '$'
-        
-        if not re.match(full_pattern, clean_formula):
-            return False
-        
-        # Additional validation: ensure each dice expression is valid
-        # Split by + and - while keeping the operators
-        parts = re.split(r'([+-])', clean_formula)
-        
-        for i, part in enumerate(parts):
-            if part in ['+', '-']:
-                continue
-            
-            # Check if it's a dice expression
-            if 'd' in part:
-                dice_match = re.match(r'^(\d*)d(\d+)$', part)
-                if not dice_match:
-                    return False
-                
-                # Validate numbers are reasonable
-                num_dice = int(dice_match.group(1)) if dice_match.group(1) else 1
-                die_size = int(dice_match.group(2))
-                
-                if num_dice > 100 or die_size > 1000:
-                    return False
-            else:
-                # Check if it's a valid number
-                try:
-                    int(part)
-                except ValueError:
-                    return False
-        
-        return True
+        """Validate dice formula format - supports dice in modifiers"""
+        expression = compile_dice_expression(formula)
+        # Must start with dice, e.g. 1d20, 2d6+3, 1d20+1d4, 2d6+1d6-1
+        return (
+            expression is not None and
+            isinstance(expression.terms[0], DiceTerm) and
+            expression.within_limits()
+        )
 
 class ExplodeThresholdModal(ui.Modal, title="Set Explosion Threshold"):
     """Modal for setting explosion threshold"""
@@ -1,6 +1,6 @@
 import discord
 from discord import ui
-from core.base_models import BaseEntity, EntityLinkType, EntityType
+from core.base_models import BaseEntity, EntityType
 from data.repositories.repository_factory import repositories
 
 class EditInventoryView(ui.View):
@@ -29,8 +29,12 @@ class EditInventoryView(ui.View):
         self.entity = repositories.entity.get_by_id(self.parent_id)
         if not self.entity:
             self.inventory = []
+            self.quantities = {}
         else:
-            self.inventory = self.entity.get_inventory(str(self.guild_id))
+            # One query for the items and their quantities, rather than a link lookup per item on every render
+            item_nodes = self.entity.get_item_nodes(str(self.guild_id))
+            self.inventory = [node.entity for node in item_nodes]
+            self.quantities = {node.entity.id: node.quantity for node in item_nodes}
         self.max_page = max(0, (len(self.inventory) - 1) // self.items_per_page)
 
     def render(self):
@@ -49,13 +53,9 @@ class EditInventoryView(ui.View):
             for i, item in enumerate(page_items):
                 # Show quantity if available
                 quantity_info = ""
-                links = self.entity.get_links_to_entity(
-                    str(self.guild_id), item.id, EntityLinkType.POSSESSES
-                )
-                if links:
-                    quantity = links[0].metadata.get("quantity", 1) if hasattr(links[0], 'metadata') else 1
-                    if quantity > 1:
-                        quantity_info = f" (x{quantity})"
+                quantity = self.quantities.get(item.id, 1)
+                if quantity > 1:
+                    quantity_info = f" (x{quantity})"
                 
                 options.append(discord.SelectOption(
                     label=f"{item.name}{quantity_info}",
@@ -246,8 +246,7 @@ class EditItemQuantityModal(ui.Modal, title="Edit Item Quantity"):
         
         # Get current quantity for default value
         char = repositories.entity.get_by_id(parent_id)
-        links = char.get_links_to_entity(guild_id, item.id, EntityLinkType.POSSESSES)
-        self.current_quantity = links[0].metadata.get("quantity", 1) if links and hasattr(links[0], 'metadata') else 1
+        self.current_quantity = next((node.quantity for node in char.get_item_nodes(guild_id) if node.entity.id == item.id), 1)
         
         self.quantity_field = ui.TextInput(
             label="New Quantity",
@@ -528,16 +527,14 @@ class TransferItemView(ui.View):
         
         # Find the selected item
         source = repositories.entity.get_by_id(self.parent_id)
-        items = source.get_inventory(self.guild_id)
-        selected_item_entity = next((item for item in items if item.id == selected_item_id), None)
+        selected_node = next((node for node in source.get_item_nodes(self.guild_id) if node.entity.id == selected_item_id), None)
         
-        if not selected_item_entity:
+        if not selected_node:
             await interaction.response.send_message("❌ Selected item not found.", ephemeral=True)
             return
         
-        # Get quantity info
-        links = source.get_links_to_entity(self.guild_id, selected_item_id, EntityLinkType.POSSESSES)
-        quantity = links[0].metadata.get("quantity", 1) if links else 1
+        selected_item_entity = selected_node.entity
+        quantity = selected_node.quantity
         
         # Store selection
         self.selected_item = selected_item_entity
@@ -607,13 +604,11 @@ class TransferItemView(ui.View):
     def _get_available_items(self):
         """Get items available for transfer from source entity"""
         source = repositories.entity.get_by_id(self.parent_id)
-        items = source.get_inventory(self.guild_id)
+        item_nodes = source.get_item_nodes(self.guild_id)
         
         options = []
-        for item in items[:25]:  # Discord limit
-            # Get quantity info
-            links = source.get_links_to_entity(self.guild_id, item.id, EntityLinkType.POSSESSES)
-            quantity = links[0].metadata.get("quantity", 1) if links else 1
+        for node in item_nodes[:25]:  # Discord limit
+            item, quantity = node.entity, node.quantity
             quantity_str = f" (x{quantity})" if quantity > 1 else ""
             
             options.append(discord.SelectOption(
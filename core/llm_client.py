@@ -0,0 +1,95 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import openai
+
+class LLMClient:
+    """
+    Shared async access to the OpenAI chat API.
+
+    Keeps one AsyncOpenAI client per API key, applies a request timeout, and limits how many
+    requests run at once per guild and across the bot. OPENAI_BASE_URL points it at any
+    OpenAI-compatible endpoint, such as a local stand-in for tests.
+    """
+    MAX_CLIENTS = 100
+
+    def __init__(self):
+        self.timeout_seconds = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+        self.max_concurrent = int(os.getenv('LLM_MAX_CONCURRENT', '8'))
+        self.max_concurrent_per_guild = int(os.getenv('LLM_MAX_CONCURRENT_PER_GUILD', '2'))
+        self.base_url = os.getenv('OPENAI_BASE_URL') or None
+        self._clients: "OrderedDict[str, openai.AsyncOpenAI]" = OrderedDict()
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._guild_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_client(self, api_key: str) -> openai.AsyncOpenAI:
+        """Reuse a client (and its connection pool) per API key"""
+        client = self._clients.get(api_key)
+        if client is None:
+            client = openai.AsyncOpenAI(api_key=api_key, base_url=self.base_url, timeout=self.timeout_seconds)
+            self._clients[api_key] = client
+            if len(self._clients) > self.MAX_CLIENTS:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(api_key)
+        return client
+
+    @asynccontextmanager
+    async def _limit(self, guild_id: str):
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_concurrent)
+        guild_semaphore = self._guild_semaphores.setdefault(str(guild_id), asyncio.Semaphore(self.max_concurrent_per_guild))
+        async with guild_semaphore:
+            async with self._global_semaphore:
+                yield
+
+    async def complete(self, guild_id: str, api_key: str, messages: List[dict], model: str,
+                       max_tokens: int, temperature: float = 0.7) -> str:
+        """Run a chat completion and return the reply text"""
+        async with self._limit(guild_id):
+            response = await self._get_client(api_key).chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        return response.choices[0].message.content.strip()
+
+    async def stream(self, guild_id: str, api_key: str, messages: List[dict], model: str,
+                     max_tokens: int, temperature: float = 0.7) -> AsyncIterator[str]:
+        """Run a chat completion, yielding the reply text accumulated so far as it arrives"""
+        async with self._limit(guild_id):
+            response = await self._get_client(api_key).chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            text = ""
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text += chunk.choices[0].delta.content
+                    yield text
+
+async def stream_into_message(text_stream: AsyncIterator[str], update: Callable[[str, bool], Awaitable[None]],
+                              min_interval_seconds: float = 1.5) -> str:
+    """
+    Feed streamed text to update(text, done), at most once every min_interval_seconds so
+    message edits stay under Discord's rate limits. Returns the final text.
+    """
+    text = ""
+    last_update = 0.0
+    async for text in text_stream:
+        now = time.monotonic()
+        if now - last_update >= min_interval_seconds:
+            await update(text, False)
+            last_update = now
+    text = text.strip()
+    await update(text, True)
+    return text
+
+llm_client = LLMClient()
@@ -0,0 +1,143 @@
+import asyncio
+import datetime
+import hashlib
+from typing import Awaitable, Callable, Dict, List
+
+from data.repositories.repository_factory import repositories
+
+# Sends chat messages to the model and returns the reply text
+CompleteFunc = Callable[[List[dict], int], Awaitable[str]]
+
+STORY_SYSTEM_PROMPT = "You are a skilled storyteller tasked with creating concise summaries of tabletop RPG play-by-post games. Focus on the narrative, character development, and key plot points. Ignore out-of-character discussions, dice rolls, and game mechanics. Your summary should read like a story recap that helps players remember what happened."
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+def _format_message(message: dict) -> str:
+    return f"{message['author']}: {message['content']}"
+
+class RecapSummarizer:
+    """
+    Summarizes story messages with a map-reduce pipeline.
+
+    Messages are grouped by day and split into token-bounded chunks, the chunks are summarized
+    concurrently, and the partial summaries are combined (in rounds if they don't fit in one prompt).
+    Summaries of chunks from finished days are cached, so overlapping recaps reuse earlier work.
+    """
+    MODEL = "gpt-3.5-turbo"
+    CHUNK_TOKEN_BUDGET = 3000
+    REDUCE_TOKEN_BUDGET = 3000
+    CHUNK_SUMMARY_MAX_TOKENS = 300
+    FINAL_SUMMARY_MAX_TOKENS = 1000
+    MAX_CONCURRENT_CALLS = 4
+
+    def __init__(self, complete: CompleteFunc):
+        self._complete = complete
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CALLS)
+
+    async def summarize(self, guild_id: str, messages: List[dict]) -> str:
+        messages = sorted(messages, key=lambda m: m['timestamp'])
+        messages_text = "\n\n".join(_format_message(m) for m in messages)
+
+        # Small windows go straight to a single call
+        if estimate_tokens(messages_text) <= self.CHUNK_TOKEN_BUDGET:
+            return await self._final_summary(
+                f"Here are the recent posts from our play-by-post RPG game. Please provide a coherent, well-structured summary of the main story events:\n\n{messages_text}"
+            )
+
+        chunks = self._chunk_by_day(messages)
+        partials = await self._summarize_chunks(guild_id, chunks)
+        return await self._reduce(partials)
+
+    def _chunk_by_day(self, messages: List[dict]) -> List[tuple]:
+        """Split messages into (day, text) chunks that each fit the chunk budget and never span days"""
+        chunks = []
+        current_day = None
+        current_lines = []
+        current_tokens = 0
+        # Leave room for the instructions wrapped around each chunk
+        budget = self.CHUNK_TOKEN_BUDGET - 200
+
+        for message in messages:
+            day = message['timestamp'][:10]
+            line = _format_message(message)
+            line_tokens = estimate_tokens(line)
+            if line_tokens > budget:
+                # One enormous post: keep its start rather than blowing the budget
+                line = line[:budget * 4]
+                line_tokens = budget
+
+            if current_lines and (day != current_day or current_tokens + line_tokens > budget):
+                chunks.append((current_day, "\n\n".join(current_lines)))
+                current_lines = []
+                current_tokens = 0
+            current_day = day
+            current_lines.append(line)
+            current_tokens += line_tokens
+
+        if current_lines:
+            chunks.append((current_day, "\n\n".join(current_lines)))
+        return chunks
+
+    def _chunk_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.MODEL}\n{self.CHUNK_SUMMARY_MAX_TOKENS}\n{text}".encode()).hexdigest()
+
+    async def _summarize_chunks(self, guild_id: str, chunks: List[tuple]) -> List[str]:
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        hashes = [self._chunk_hash(text) for _, text in chunks]
+        cached: Dict[str, str] = await repositories.run(repositories.recap_chunk_summary.get_summaries, hashes)
+
+        async def summarize_chunk(day: str, text: str, chunk_hash: str) -> str:
+            if chunk_hash in cached:
+                return cached[chunk_hash]
+            summary = await self._call([
+                {"role": "system", "content": STORY_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Here are posts from {day} in our play-by-post RPG game. Summarize the story events in a short paragraph, keeping character names and important details:\n\n{text}"}
+            ], self.CHUNK_SUMMARY_MAX_TOKENS)
+            # Today's posts are still coming in, so only finished days are worth caching
+            if day < today:
+                await repositories.run(repositories.recap_chunk_summary.save_summary, guild_id, chunk_hash, day, summary)
+            return summary
+
+        partial_summaries = await asyncio.gather(*(
+            summarize_chunk(day, text, chunk_hash) for (day, text), chunk_hash in zip(chunks, hashes)
+        ))
+        return [f"[{day}] {summary}" for (day, _), summary in zip(chunks, partial_summaries)]
+
+    async def _reduce(self, partials: List[str]) -> str:
+        """Combine partial summaries, in several rounds if they don't fit in one prompt"""
+        while estimate_tokens("\n\n".join(partials)) > self.REDUCE_TOKEN_BUDGET and len(partials) > 1:
+            groups = []
+            current = []
+            for partial in partials:
+                if current and estimate_tokens("\n\n".join(current + [partial])) > self.REDUCE_TOKEN_BUDGET:
+                    groups.append(current)
+                    current = []
+                current.append(partial)
+            groups.append(current)
+
+            if len(groups) == len(partials):
+                # Nothing pairs up, so another round wouldn't shrink the input
+                break
+            partials = await asyncio.gather(*(
+                self._call([
+                    {"role": "system", "content": STORY_SYSTEM_PROMPT},
+                    {"role": "user", "content": "Here are summaries of consecutive parts of our play-by-post RPG game. Merge them into one short summary, in order:\n\n" + "\n\n".join(group)}
+                ], self.CHUNK_SUMMARY_MAX_TOKENS)
+                for group in groups
+            ))
+
+        return await self._final_summary(
+            "Here are summaries of consecutive parts of our play-by-post RPG game, in order. Please provide a coherent, well-structured summary of the main story events:\n\n" + "\n\n".join(partials)
+        )
+
+    async def _final_summary(self, user_prompt: str) -> str:
+        return await self._call([
+            {"role": "system", "content": STORY_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ], self.FINAL_SUMMARY_MAX_TOKENS)
+
+    async def _call(self, prompt: List[dict], max_tokens: int) -> str:
+        async with self._semaphore:
+            return (await self._complete(prompt, max_tokens)).strip()
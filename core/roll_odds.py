@@ -0,0 +1,248 @@
+import itertools
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from core.dice_expression import FUDGE_FACES, MAX_EXPLOSIONS, DiceTerm
+from core.generic_roll_mechanics import CoreRollMechanicType, check_success, compile_roll_formula, configured_explode_threshold
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up convolution; pure Python handles table-sized formulas fine
+    np = None
+
+if TYPE_CHECKING:
+    from core.generic_roll_formulas import RollFormula
+
+# Explosions are followed until the chance of going deeper drops below this
+EXPLOSION_EPSILON = 1e-9
+# Outcomes less likely than this are dropped from the tails as distributions grow
+TRIM_EPSILON = 1e-15
+# Largest number of distinct totals we'll compute, to keep /roll odds responsive
+MAX_OUTCOMES = 10000
+# Largest number of dice combinations enumerated for keep-highest/lowest terms
+MAX_KEEP_COMBINATIONS = 200000
+
+def _convolve(a: List[float], b: List[float]) -> List[float]:
+    if np is not None:
+        return np.convolve(a, b).tolist()
+    result = [0.0] * (len(a) + len(b) - 1)
+    for i, pa in enumerate(a):
+        if pa:
+            for j, pb in enumerate(b):
+                result[i + j] += pa * pb
+    return result
+
+class Distribution:
+    """Probabilities of integer outcomes, stored densely from offset upward"""
+    def __init__(self, offset: int, probabilities: List[float]):
+        self.offset = offset
+        self.probabilities = probabilities
+
+    @classmethod
+    def constant(cls, value: int) -> "Distribution":
+        return cls(value, [1.0])
+
+    @classmethod
+    def from_weights(cls, weights: Iterable[Tuple[int, float]]) -> "Distribution":
+        totals = Counter()
+        for value, weight in weights:
+            totals[value] += weight
+        if not totals:
+            return cls(0, [])
+        offset = min(totals)
+        return cls(offset, [totals.get(value, 0.0) for value in range(offset, max(totals) + 1)])
+
+    @property
+    def max_value(self) -> int:
+        return self.offset + len(self.probabilities) - 1
+
+    def items(self) -> Iterable[Tuple[int, float]]:
+        return ((self.offset + i, p) for i, p in enumerate(self.probabilities) if p)
+
+    def total_probability(self) -> float:
+        return sum(self.probabilities)
+
+    def shift(self, amount: int) -> "Distribution":
+        return Distribution(self.offset + amount, self.probabilities)
+
+    def negate(self) -> "Distribution":
+        return Distribution(-self.max_value, self.probabilities[::-1])
+
+    def plus(self, other: "Distribution") -> "Distribution":
+        """Pointwise sum, for mixing weighted (unnormalized) distributions"""
+        if not self.probabilities:
+            return other
+        if not other.probabilities:
+            return self
+        offset = min(self.offset, other.offset)
+        probabilities = [0.0] * (max(self.max_value, other.max_value) - offset + 1)
+        for source in (self, other):
+            for i, p in enumerate(source.probabilities):
+                probabilities[source.offset - offset + i] += p
+        return Distribution(offset, probabilities)
+
+    def add(self, other: "Distribution") -> "Distribution":
+        """Distribution of the sum of two independent outcomes"""
+        if not self.probabilities or not other.probabilities:
+            return Distribution(0, [])
+        return Distribution(self.offset + other.offset, _convolve(self.probabilities, other.probabilities)).trim()
+
+    def repeat(self, count: int) -> "Distribution":
+        """Distribution of the sum of count independent copies, by repeated squaring"""
+        result = Distribution.constant(0)
+        base = self
+        while count:
+            if count & 1:
+                result = result.add(base)
+            count >>= 1
+            if count:
+                base = base.add(base)
+        return result
+
+    def trim(self) -> "Distribution":
+        probabilities = self.probabilities
+        start, end = 0, len(probabilities)
+        while start < end - 1 and probabilities[start] < TRIM_EPSILON:
+            start += 1
+        while end - 1 > start and probabilities[end - 1] < TRIM_EPSILON:
+            end -= 1
+        if len(probabilities) > MAX_OUTCOMES and end - start > MAX_OUTCOMES:
+            raise ValueError(f"That formula has too many possible results to work out (over {MAX_OUTCOMES:,})")
+        return Distribution(self.offset + start, probabilities[start:end])
+
+    def mean(self) -> float:
+        return sum(value * p for value, p in self.items())
+
+    def probability(self, predicate) -> float:
+        return min(1.0, sum(p for value, p in self.items() if predicate(value)))
+
+    def percentile(self, fraction: float) -> int:
+        """Smallest outcome with at least fraction of results at or below it"""
+        cumulative = 0.0
+        for value, p in self.items():
+            cumulative += p
+            if cumulative >= fraction - 1e-12:
+                return value
+        return self.max_value
+
+def _die(faces: List[int], explode_at: Optional[int] = None) -> Distribution:
+    """
+    Distribution of one die whose face i+1 contributes faces[i]. An exploding die rerolls
+    on explode_at or higher and adds the reroll's contribution, followed until that's negligible.
+    """
+    weight = 1 / len(faces)
+    terminal = Distribution.from_weights((value, weight) for value in faces)
+    if explode_at is None or explode_at > len(faces):
+        return terminal
+
+    stop = Distribution.from_weights((value, weight) for roll, value in enumerate(faces, 1) if roll < explode_at)
+    explode = Distribution.from_weights((value, weight) for roll, value in enumerate(faces, 1) if roll >= explode_at)
+    continue_probability = explode.total_probability()
+
+    # Build from the deepest reroll outward; the engine stops exploding after MAX_EXPLOSIONS too
+    depth = 0
+    reach = 1.0
+    while depth < MAX_EXPLOSIONS and reach * continue_probability > EXPLOSION_EPSILON:
+        reach *= continue_probability
+        depth += 1
+    die = terminal
+    for _ in range(depth):
+        die = stop.plus(explode.add(die))
+    return die
+
+def _keep_term(term: DiceTerm, faces: List[int], explode_at: Optional[int]) -> Distribution:
+    """Distribution of a keep-highest/lowest term, by enumerating every combination of dice"""
+    if explode_at is not None:
+        raise ValueError("Odds for exploding dice with keep-highest/lowest aren't supported")
+    if len(faces) ** term.count > MAX_KEEP_COMBINATIONS:
+        raise ValueError(f"Too many dice combinations in {term.notation} to work out exactly")
+    keep = term.keep_highest if term.keep_highest is not None else term.keep_lowest
+    totals = Counter()
+    for combination in itertools.product(faces, repeat=term.count):
+        ordered = sorted(combination, reverse=term.keep_highest is not None)
+        totals[sum(ordered[:keep])] += 1
+    combinations = len(faces) ** term.count
+    return Distribution.from_weights((value, count / combinations) for value, count in totals.items())
+
+def _sum_term(term: DiceTerm, explode_at: Optional[int]) -> Distribution:
+    faces = list(FUDGE_FACES) if term.fudge else list(range(1, term.sides + 1))
+    threshold = None if term.fudge else (explode_at if explode_at is not None else term.explode_at)
+    if term.keep_highest is not None or term.keep_lowest is not None:
+        distribution = _keep_term(term, faces, threshold)
+    else:
+        die = _die(faces, threshold)
+        if term.count * (len(die.probabilities) - 1) + 1 > MAX_OUTCOMES:
+            raise ValueError(f"That formula has too many possible results to work out (over {MAX_OUTCOMES:,})")
+        distribution = die.repeat(term.count)
+    return distribution.negate() if term.sign < 0 else distribution
+
+@dataclass
+class RollOdds:
+    """Exact outcome distribution of a roll: totals for roll-and-sum, success counts for dice pools"""
+    formula: str
+    distribution: Distribution
+    counts_successes: bool
+    difficulty: Optional[int] = None
+    success_chance: Optional[float] = None
+
+    def percentiles(self, fractions: Iterable[float] = (0.1, 0.25, 0.5, 0.75, 0.9)) -> Dict[float, int]:
+        return {fraction: self.distribution.percentile(fraction) for fraction in fractions}
+
+    def likely_outcomes(self, min_probability: float = 0.0005) -> List[Tuple[int, float]]:
+        """Outcomes worth showing in a chart"""
+        return [(value, p) for value, p in self.distribution.items() if p >= min_probability]
+
+def _roll_and_sum_odds(roll_formula_obj: 'RollFormula', modifier: int, difficulty: Optional[int]) -> RollOdds:
+    config = roll_formula_obj.roll_config
+    expression = compile_roll_formula(roll_formula_obj)
+    explode_at = configured_explode_threshold(config)
+
+    distribution = Distribution.constant(expression.constant + modifier)
+    for term in expression.dice_terms:
+        distribution = distribution.add(_sum_term(term, explode_at))
+
+    success_chance = None
+    if difficulty is not None:
+        success_chance = distribution.probability(lambda total: check_success(config, total, difficulty))
+    return RollOdds(expression.source, distribution, False, difficulty, success_chance)
+
+def _dice_pool_odds(roll_formula_obj: 'RollFormula', difficulty: Optional[int]) -> RollOdds:
+    config = roll_formula_obj.roll_config
+    expression = compile_roll_formula(roll_formula_obj)
+    target_number = int(config.target_number) if config.target_number is not None else 8
+    explode_threshold = int(config.explode_threshold) if config.explode_threshold is not None else None
+
+    # Each die is a polynomial in its number of successes; the pool is their product
+    distribution = Distribution.constant(0)
+    pool_size = 0
+    for term in expression.dice_terms:
+        if term.sign < 0 or term.fudge:
+            continue
+        if term.keep_highest is not None or term.keep_lowest is not None:
+            raise ValueError("Odds for dice pools with keep-highest/lowest aren't supported")
+        # Same threshold execute_roll uses: the server's setting, otherwise the term's own '!'
+        explode_at = term.explode_at
+        if config.exploding_dice:
+            explode_at = explode_threshold if explode_threshold is not None else term.sides
+        faces = [1 if check_success(config, roll, target_number) else 0 for roll in range(1, term.sides + 1)]
+        distribution = distribution.add(_die(faces, explode_at).repeat(term.count))
+        pool_size += term.count
+
+    if pool_size == 0:
+        raise ValueError("No valid dice found in formula")
+
+    success_chance = None
+    if difficulty is not None:
+        success_chance = distribution.probability(lambda successes: successes >= difficulty)
+    return RollOdds(expression.source, distribution, True, difficulty, success_chance)
+
+def compute_odds(roll_formula_obj: 'RollFormula', modifier: int = 0, difficulty: Optional[int] = None) -> RollOdds:
+    """
+    Exact odds for what execute_roll would produce with the same arguments.
+    Raises ValueError for formulas that are invalid or too big to work out.
+    """
+    if roll_formula_obj.roll_config.mechanic_type == CoreRollMechanicType.DICE_POOL:
+        return _dice_pool_odds(roll_formula_obj, difficulty)
+    # Custom rolls are evaluated like roll-and-sum
+    return _roll_and_sum_odds(roll_formula_obj, modifier, difficulty)
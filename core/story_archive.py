@@ -0,0 +1,176 @@
+import time
+import datetime
+from typing import List, Optional
+import discord
+from data.models import StoryMessage
+from data.repositories.repository_factory import repositories
+
+# When this process started seeing messages live. IC channel posts after this are archived by on_message,
+# so recaps only need to backfill history from before it.
+_live_capture_since: Optional[float] = None
+
+def mark_live_capture_started() -> None:
+    """Record that the gateway is connected and new posts are being archived"""
+    global _live_capture_since
+    _live_capture_since = time.time()
+
+def extract_story_entries(message: discord.Message, bot_user_id: int) -> List[StoryMessage]:
+    """Turn a message into archive rows, or none if it isn't story content"""
+    # Skip bot messages that aren't narration
+    if message.author.bot and not (
+        # Include webhook messages (narrations)
+        message.webhook_id or
+        # Include embeds with narration/story content
+        (message.embeds and message.author.id == bot_user_id and
+         any(e.description for e in message.embeds))
+    ):
+        return []
+
+    # Skip command messages
+    if message.content and message.content.startswith('/'):
+        return []
+
+    # Skip system messages
+    if not message.content and not message.embeds:
+        return []
+
+    guild_id = str(message.guild.id) if message.guild else ""
+    created_at = message.created_at.timestamp()
+    entries = []
+
+    # Narration is posted as embeds, by the bot itself or through a narration webhook
+    if message.embeds and (message.author.id == bot_user_id or message.webhook_id):
+        for part, embed in enumerate(message.embeds):
+            if embed.description:
+                if embed.author and embed.author.name:
+                    author_name = embed.author.name
+                elif message.webhook_id:
+                    author_name = message.author.display_name
+                else:
+                    author_name = "Narrator"
+                entries.append(StoryMessage(
+                    channel_id=str(message.channel.id),
+                    message_id=str(message.id),
+                    part=part,
+                    guild_id=guild_id,
+                    created_at=created_at,
+                    author=author_name,
+                    content=embed.description
+                ))
+    # Regular user message
+    elif message.content:
+        entries.append(StoryMessage(
+            channel_id=str(message.channel.id),
+            message_id=str(message.id),
+            guild_id=guild_id,
+            created_at=created_at,
+            author=message.author.display_name,
+            content=message.content
+        ))
+
+    return entries
+
+async def _is_archived_channel(channel) -> bool:
+    """Only IC channels (and their threads) are archived as posts arrive"""
+    channel_to_check = channel.parent if isinstance(channel, discord.Thread) else channel
+    channel_type = await repositories.channel_permissions.get_channel_type_async(str(channel.guild.id), str(channel_to_check.id))
+    return channel_type == 'ic'
+
+async def archive_story_message(message: discord.Message, bot_user_id: int) -> None:
+    """Archive a new post if it's story content in an IC channel"""
+    if not message.guild or not await _is_archived_channel(message.channel):
+        return
+    entries = extract_story_entries(message, bot_user_id)
+    if entries:
+        await repositories.run(repositories.story_message.add_messages, entries)
+
+async def is_archived_post(message: discord.Message) -> bool:
+    """
+    Whether edits to a post should reach the archive: IC channels archive every post,
+    elsewhere only posts a recap has already backfilled are in it.
+    """
+    if not message.guild:
+        return False
+    if await _is_archived_channel(message.channel):
+        return True
+    return await repositories.run(repositories.story_message.is_archived, str(message.channel.id), str(message.id))
+
+async def refresh_archived_story_message(message: discord.Message, bot_user_id: int) -> None:
+    """Re-archive an edited post"""
+    if not await is_archived_post(message):
+        return
+    # An edit can drop embeds or turn a post into a command, so the old parts are replaced outright
+    entries = extract_story_entries(message, bot_user_id)
+    await repositories.run(repositories.story_message.replace_message, str(message.channel.id), str(message.id), entries)
+
+async def remove_archived_story_messages(channel_id: int, message_ids) -> None:
+    """Drop deleted posts from the archive"""
+    await repositories.run(repositories.story_message.delete_messages, str(channel_id), [str(message_id) for message_id in message_ids])
+
+async def prune_story_archive(retention_days: int) -> None:
+    """Drop archived posts older than retention_days; recaps reaching further back read channel history again"""
+    cutoff = time.time() - retention_days * 86400
+    # Shrink coverage first so a recap running meanwhile never trusts a range that's being emptied
+    await repositories.run(repositories.story_archive_coverage.trim_before, cutoff)
+    await repositories.run(repositories.story_message.delete_before, cutoff)
+
+async def forget_guild_story(guild_id: int) -> None:
+    """Drop everything archived for recaps in a guild the bot has left"""
+    await repositories.run(repositories.story_archive_coverage.delete_guild, str(guild_id))
+    await repositories.run(repositories.story_message.delete_guild, str(guild_id))
+    await repositories.run(repositories.recap_chunk_summary.delete_guild, str(guild_id))
+
+async def _backfill(channel, bot_user_id: int, start: float, end: float) -> None:
+    """Archive story content from channel history between two timestamps"""
+    entries = []
+    async for message in channel.history(
+        limit=None,
+        after=datetime.datetime.fromtimestamp(start, datetime.timezone.utc),
+        before=datetime.datetime.fromtimestamp(end, datetime.timezone.utc),
+        oldest_first=True
+    ):
+        entries.extend(extract_story_entries(message, bot_user_id))
+    if entries:
+        await repositories.run(repositories.story_message.add_messages, entries)
+
+async def get_story_messages(channel, bot_user_id: int, days: int) -> List[dict]:
+    """
+    Get story messages from the last X days out of the archive, first backfilling from
+    channel history any part of the window the archive doesn't cover yet.
+    """
+    now = time.time()
+    cutoff = now - days * 86400
+    coverage = await repositories.run(repositories.story_archive_coverage.get_coverage, str(channel.id))
+    if coverage and coverage.covered_until < cutoff:
+        # The archived range ends before this window starts, so it can't be extended without a hole
+        coverage = None
+
+    # Everything since live capture started is already archived for IC channels
+    archived_until = now
+    if _live_capture_since is not None and await _is_archived_channel(channel):
+        archived_until = _live_capture_since
+
+    gaps = []
+    if coverage is None:
+        gaps.append((cutoff, archived_until))
+    else:
+        if cutoff < coverage.covered_from:
+            gaps.append((cutoff, coverage.covered_from))
+        gaps.append((max(cutoff, coverage.covered_until), archived_until))
+
+    for start, end in gaps:
+        if start < end:
+            await _backfill(channel, bot_user_id, start, end)
+
+    covered_from = min(cutoff, coverage.covered_from) if coverage else cutoff
+    await repositories.run(repositories.story_archive_coverage.set_coverage, str(channel.guild.id), str(channel.id), covered_from, now)
+
+    archived = await repositories.run(repositories.story_message.get_window, str(channel.id), cutoff, now)
+    return [
+        {
+            'author': message.author,
+            'content': message.content,
+            'timestamp': datetime.datetime.fromtimestamp(message.created_at, datetime.timezone.utc).isoformat()
+        }
+        for message in archived
+    ]
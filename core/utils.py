@@ -1,8 +1,15 @@
-from typing import List
+import time
+import asyncio
+import logging
+from typing import List, Set, Tuple
 import discord
 from core.base_models import BaseCharacter, BaseEntity, EntityLinkType, EntityType
+from data.cache import TTLCache
 from data.repositories.repository_factory import repositories
 
+# Role memberships fetched over REST, for guilds whose member cache can't be filled from the gateway
+_role_members_cache = TTLCache(300, max_size=100)
+
 async def _get_gm_mention(interaction: discord.Interaction) -> str:
     """Get mentions for GMs in the server"""
     mentions = ""
@@ -40,26 +47,56 @@ async def _can_user_edit_character(guild_id: str, user: discord.User, character:
     
 async def _user_controls_companion(guild_id: str, user_id: str, companion: BaseCharacter) -> bool:
     """Check if user owns any characters that control this companion"""
-    controlling_chars = repositories.link.get_parents(
-        guild_id,
-        companion.id,
-        EntityLinkType.CONTROLS.value
+    return await repositories.run(
+        repositories.link_graph.user_controls,
+        str(guild_id),
+        str(user_id),
+        companion.id
     )
+
+async def get_controlled_companion_ids(interaction: discord.Interaction) -> Set[str]:
+    """Get ids of companions the interaction's user controls through their characters, looked up once per interaction"""
+    if 'controlled_companion_ids' not in interaction.extras:
+        interaction.extras['controlled_companion_ids'] = await repositories.run(
+            repositories.link.get_companion_ids_controlled_by_user,
+            str(interaction.guild.id),
+            str(interaction.user.id)
+        )
+    return interaction.extras['controlled_companion_ids']
+
+async def get_role_members(guild: discord.Guild, role: discord.Role) -> Tuple[List[discord.Member], str, float]:
+    """
+    Resolve a role's members from the cheapest available source: the gateway member cache,
+    then a gateway chunk request (which fills that cache), then a cached REST scan.
+    Returns (members, source, seconds taken).
+    """
+    start = time.perf_counter()
+    if guild.chunked:
+        return role.members, "member cache", time.perf_counter() - start
     
-    return any(
-        str(controller.owner_id) == str(user_id) 
-        for controller in controlling_chars
-    )
+    found, members = _role_members_cache.get((guild.id, role.id))
+    if found:
+        return members, "cached member fetch", time.perf_counter() - start
+    
+    try:
+        await guild.chunk(cache=True)
+        return role.members, "gateway member request", time.perf_counter() - start
+    except (discord.ClientException, discord.HTTPException, asyncio.TimeoutError) as e:
+        logging.warning(f"Could not chunk members for guild {guild.id}, falling back to REST: {e}")
+    
+    members = [member async for member in guild.fetch_members(limit=None) if role in member.roles]
+    _role_members_cache.set((guild.id, role.id), members)
+    return members, "REST member fetch", time.perf_counter() - start
 
 async def _resolve_character(guild_id: str, user_id: str, char_name: str = None) -> BaseCharacter:
     """Resolve character from name or get active character if no name provided"""
     if char_name:
-        character = repositories.character.get_character_by_name(guild_id, char_name)
+        character = await repositories.run(repositories.character.get_by_name_or_nickname, guild_id, char_name)
         if not character:
             raise ValueError(f"Character '{char_name}' not found.")
         return character
     else:
-        character = repositories.active_character.get_active_character(guild_id, user_id)
+        character = await repositories.run(repositories.active_character.get_active_character, guild_id, user_id)
         if not character:
             raise ValueError("No active character set. Use `/char switch` to choose one.")
         return character
@@ -86,14 +123,7 @@ async def _get_owner_character(guild_id: str, user_id: str, owner_character: str
 
 async def _get_character_by_name_or_nickname(guild_id: str, char_name: str) -> BaseCharacter:
     """Get character by name or nickname"""
-    character = repositories.character.get_character_by_name(guild_id, char_name)
-    if not character:
-        character = repositories.character_nickname.get_character_by_nickname(guild_id, char_name)
-    
-    if not character:
-        return None
-    
-    return character
+    return await repositories.run(repositories.character.get_by_name_or_nickname, guild_id, char_name)
     
 async def _set_character_avatar(character: BaseCharacter, avatar_url: str, guild_id: str) -> discord.Embed:
     """Set character avatar and return preview embed"""
@@ -128,33 +158,33 @@ def _check_character_possessions(guild_id: str, character: BaseCharacter, transf
 
 def _release_possessed_entities(guild_id: str, character: BaseCharacter) -> None:
     """Remove all POSSESSES links for a character"""
-    possessed_entities = repositories.link.get_children(
+    possessed_ids = repositories.link_graph.get_child_ids(
         guild_id,
         character.id,
         EntityLinkType.POSSESSES.value
     )
     
-    for entity in possessed_entities:
+    for entity_id in possessed_ids:
         repositories.link.delete_links_by_entities(
             guild_id,
             character.id,
-            entity.id,
+            entity_id,
             EntityLinkType.POSSESSES.value
         )
 
 def _transfer_companion_control(guild_id: str, companion: BaseCharacter, new_controller: BaseCharacter, user_id: str) -> None:
     """Transfer control of companion to new character"""
     # Remove existing control links
-    existing_controllers = repositories.link.get_parents(
+    existing_controller_ids = repositories.link_graph.get_parent_ids(
         guild_id,
         companion.id,
         EntityLinkType.CONTROLS.value
     )
     
-    for controller in existing_controllers:
+    for controller_id in existing_controller_ids:
         repositories.link.delete_links_by_entities(
             guild_id,
-            controller.id,
+            controller_id,
             companion.id,
             EntityLinkType.CONTROLS.value
         )
@@ -1,19 +1,271 @@
 import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 from contextlib import contextmanager
 import logging
 
+class PooledConnection:
+    """A connection held by the pool along with its bookkeeping timestamps"""
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+    pass
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool.
+
+    Keeps between min_size and max_size open connections, closes connections that sit
+    idle for longer than max_idle_seconds (down to min_size) or that are older than
+    max_lifetime_seconds, and checks a connection's health before handing it out.
+    """
+    def __init__(self, connect, min_size: int = 1, max_size: int = 10, max_idle_seconds: float = 300,
+                 max_lifetime_seconds: float = 3600, checkout_timeout: float = 30,
+                 health_check_after_seconds: float = 30):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after_seconds = health_check_after_seconds
+
+        self._idle = []  # LIFO stack of PooledConnection so warm connections get reused first
+        self._in_use = 0
+        self._opened = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._peak_in_use = 0
+        self._health_check_failures = 0
+        self._connections_created = 0
+        self._connections_closed = 0
+
+    @property
+    def size(self) -> int:
+        return self._opened
+
+    def _open(self) -> PooledConnection:
+        pooled = PooledConnection(self._connect())
+        self._connections_created += 1
+        return pooled
+
+    def _close(self, pooled: PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        self._connections_closed += 1
+
+    def _is_expired(self, pooled: PooledConnection, now: float) -> bool:
+        return self.max_lifetime_seconds and now - pooled.created_at > self.max_lifetime_seconds
+
+    def _is_healthy(self, pooled: PooledConnection, now: float) -> bool:
+        """Cheap checks always, a round trip only when the connection has been idle for a while"""
+        conn = pooled.conn
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if now - pooled.last_used_at < self.health_check_after_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _reap_idle_locked(self, now: float) -> list:
+        """Remove idle connections that are expired or idle too long. Caller holds the lock."""
+        reaped = []
+        keep = []
+        # Oldest-used connections sit at the bottom of the stack
+        for pooled in self._idle:
+            idle_too_long = self.max_idle_seconds and now - pooled.last_used_at > self.max_idle_seconds
+            if self._is_expired(pooled, now) or (idle_too_long and self._opened - len(reaped) > self.min_size):
+                reaped.append(pooled)
+            else:
+                keep.append(pooled)
+        self._idle = keep
+        self._opened -= len(reaped)
+        return reaped
+
+    def reap_idle(self) -> int:
+        """Close idle connections past their idle timeout or max lifetime. Returns how many were closed."""
+        with self._condition:
+            reaped = self._reap_idle_locked(time.monotonic())
+        for pooled in reaped:
+            self._close(pooled)
+        return len(reaped)
+
+    def acquire(self) -> PooledConnection:
+        """Check out a connection, waiting up to checkout_timeout if the pool is saturated"""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        waited = False
+
+        while True:
+            to_close = []
+            pooled = None
+            should_open = False
+
+            with self._condition:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+
+                to_close.extend(self._reap_idle_locked(time.monotonic()))
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._in_use += 1
+                elif self._opened < self.max_size:
+                    # Reserve a slot before opening outside the lock
+                    self._opened += 1
+                    self._in_use += 1
+                    should_open = True
+                else:
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.checkout_timeout}s waiting for a database connection "
+                            f"({self._in_use}/{self.max_size} in use)"
+                        )
+                    self._condition.wait(remaining)
+                    continue
+
+            for stale in to_close:
+                self._close(stale)
+
+            if should_open:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    with self._condition:
+                        self._opened -= 1
+                        self._in_use -= 1
+                        self._condition.notify()
+                    raise
+            elif not self._is_healthy(pooled, time.monotonic()):
+                with self._condition:
+                    self._health_check_failures += 1
+                self._close(pooled)
+                try:
+                    pooled = self._open()
+                except Exception:
+                    with self._condition:
+                        self._opened -= 1
+                        self._in_use -= 1
+                        self._condition.notify()
+                    raise
+
+            wait_seconds = time.monotonic() - start
+            with self._condition:
+                self._checkouts += 1
+                self._total_wait_seconds += wait_seconds
+                self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+            return pooled
+
+    def release(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """Return a connection to the pool, closing it if it is broken, expired or the pool is closed"""
+        now = time.monotonic()
+        if not discard:
+            discard = pooled.conn.closed or self._is_expired(pooled, now)
+        with self._condition:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._opened -= 1
+            else:
+                pooled.last_used_at = now
+                self._idle.append(pooled)
+            self._condition.notify()
+        if discard or self._closed:
+            self._close(pooled)
+
+    def fill(self) -> None:
+        """Open connections up to min_size"""
+        while True:
+            with self._condition:
+                if self._closed or self._opened >= self.min_size:
+                    return
+                self._opened += 1
+            try:
+                pooled = self._open()
+            except Exception:
+                with self._condition:
+                    self._opened -= 1
+                raise
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def close_all(self) -> None:
+        """Close every idle connection and stop handing out new ones"""
+        with self._condition:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._opened -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def get_stats(self) -> dict:
+        """Snapshot of pool size, saturation and checkout wait metrics"""
+        with self._condition:
+            return {
+                'size': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'saturation': self._in_use / self.max_size,
+                'peak_in_use': self._peak_in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'avg_wait_ms': (self._total_wait_seconds / self._checkouts * 1000) if self._checkouts else 0.0,
+                'max_wait_ms': self._max_wait_seconds * 1000,
+                'health_check_failures': self._health_check_failures,
+                'connections_created': self._connections_created,
+                'connections_closed': self._connections_closed,
+            }
+
 class DatabaseConnection:
     def __init__(self):
         self.connection_params = self._get_connection_params()
-    
+        self.pool = self._create_pool() if self._pooling_enabled() else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
     def _get_connection_params(self):
         # Railway provides DATABASE_URL automatically
         database_url = os.getenv('DATABASE_URL')
         if database_url:
             return {'dsn': database_url}
-        
+
         # Fallback for local development
         return {
             'host': os.getenv('DB_HOST', 'localhost'),
@@ -22,15 +274,36 @@ class DatabaseConnection:
             'user': os.getenv('DB_USER', 'postgres'),
             'password': os.getenv('DB_PASSWORD', 'password')
         }
-    
+
+    def _pooling_enabled(self) -> bool:
+        return os.getenv('DB_POOL_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+    def _create_pool(self) -> ConnectionPool:
+        return ConnectionPool(
+            self._connect,
+            min_size=int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            max_size=int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            max_idle_seconds=float(os.getenv('DB_POOL_MAX_IDLE_SECONDS', '300')),
+            max_lifetime_seconds=float(os.getenv('DB_POOL_MAX_LIFETIME_SECONDS', '3600')),
+            checkout_timeout=float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', '30')),
+            health_check_after_seconds=float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER_SECONDS', '30'))
+        )
+
+    def _connect(self):
+        if 'dsn' in self.connection_params:
+            return psycopg2.connect(self.connection_params['dsn'], cursor_factory=RealDictCursor)
+        return psycopg2.connect(**self.connection_params, cursor_factory=RealDictCursor)
+
     @contextmanager
     def get_connection(self):
+        if self.pool:
+            with self._get_pooled_connection() as conn:
+                yield conn
+            return
+
         conn = None
         try:
-            if 'dsn' in self.connection_params:
-                conn = psycopg2.connect(self.connection_params['dsn'], cursor_factory=RealDictCursor)
-            else:
-                conn = psycopg2.connect(**self.connection_params, cursor_factory=RealDictCursor)
+            conn = self._connect()
             yield conn
             conn.commit()
         except Exception as e:
@@ -42,4 +315,55 @@ class DatabaseConnection:
             if conn:
                 conn.close()
 
-db_manager = DatabaseConnection()
\ No newline at end of file
+    @contextmanager
+    def _get_pooled_connection(self):
+        pooled = self.pool.acquire()
+        discard = False
+        try:
+            yield pooled.conn
+            pooled.conn.commit()
+        except Exception as e:
+            try:
+                pooled.conn.rollback()
+            except Exception:
+                # The connection itself is broken, don't hand it out again
+                discard = True
+            if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                discard = True
+            logging.error(f"Database error: {e}")
+            raise
+        finally:
+            self.pool.release(pooled, discard=discard)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # Never run more blocking calls at once than the pool can serve
+                    default_workers = self.pool.max_size if self.pool else 10
+                    max_workers = int(os.getenv('DB_EXECUTOR_MAX_WORKERS', str(default_workers)))
+                    self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking database call on the bounded database executor.
+
+        Use this from coroutines so psycopg2 round trips don't stall the Discord event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+
+    def get_pool_stats(self) -> dict:
+        """Return pool metrics, or None when pooling is disabled"""
+        return self.pool.get_stats() if self.pool else None
+
+    def close(self) -> None:
+        """Close all pooled connections (used on shutdown)"""
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.pool:
+            self.pool.close_all()
+
+db_manager = DatabaseConnection()
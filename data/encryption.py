@@ -1,13 +1,16 @@
 import os
 import base64
-from cryptography.fernet import Fernet
+import functools
+from typing import List, Optional, Tuple
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
-def get_encryption_key():
+@functools.lru_cache(maxsize=1)
+def _get_master_keys() -> Tuple[str, ...]:
     """
-    Generate or retrieve the encryption key for API keys.
-    Uses environment variable for the master key.
+    The current master key followed by any retired ones still needed to read old values.
+    Retired keys come from ENCRYPTION_KEY_PREVIOUS as a comma-separated list.
     """
     master_key = os.getenv('ENCRYPTION_KEY')
     if not master_key:
@@ -16,54 +19,92 @@ def get_encryption_key():
         master_key = base64.urlsafe_b64encode(os.urandom(32)).decode()
         print(f"Generated new encryption key: {master_key}")
         print("Set this as ENCRYPTION_KEY environment variable!")
-    
-    # Derive a consistent key from the master key
+
+    previous_keys = [key.strip() for key in os.getenv('ENCRYPTION_KEY_PREVIOUS', '').split(',') if key.strip()]
+    return (master_key, *previous_keys)
+
+@functools.lru_cache(maxsize=None)
+def _derive_key(master_key: str) -> bytes:
+    """Derive a Fernet key from a master key. PBKDF2 is deliberately slow, so each key is derived once per process."""
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=b'pbp_bot_salt',  # Fixed salt for consistency
         iterations=100000,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
-    return key
+    return base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
+
+def get_encryption_key():
+    """
+    Generate or retrieve the encryption key for API keys.
+    Uses environment variable for the master key.
+    """
+    return _derive_key(_get_master_keys()[0])
+
+def _get_previous_encryption_keys() -> List[bytes]:
+    return [_derive_key(master_key) for master_key in _get_master_keys()[1:]]
+
+@functools.lru_cache(maxsize=1)
+def _get_fernet() -> MultiFernet:
+    """Encrypts with the current key and decrypts with the current or any previous key"""
+    return MultiFernet([Fernet(get_encryption_key())] + [Fernet(key) for key in _get_previous_encryption_keys()])
+
+@functools.lru_cache(maxsize=1)
+def _get_current_fernet() -> Fernet:
+    return Fernet(get_encryption_key())
 
 def encrypt_api_key(api_key: str) -> str:
     """
     Encrypt an API key for storage.
-    
+
     Args:
         api_key: The plaintext API key
-        
+
     Returns:
         str: Base64 encoded encrypted API key
     """
     if not api_key:
         return ""
-    
-    key = get_encryption_key()
-    f = Fernet(key)
-    encrypted_key = f.encrypt(api_key.encode())
+
+    encrypted_key = _get_fernet().encrypt(api_key.encode())
     return base64.urlsafe_b64encode(encrypted_key).decode()
 
 def decrypt_api_key(encrypted_key: str) -> str:
     """
     Decrypt an API key from storage.
-    
+
     Args:
         encrypted_key: Base64 encoded encrypted API key
-        
+
     Returns:
         str: Plaintext API key
     """
+    decrypted_key, _ = decrypt_and_rotate_api_key(encrypted_key)
+    return decrypted_key
+
+def decrypt_and_rotate_api_key(encrypted_key: str) -> Tuple[str, Optional[str]]:
+    """
+    Decrypt an API key from storage, re-encrypting it if it was stored under a previous master key.
+
+    Args:
+        encrypted_key: Base64 encoded encrypted API key
+
+    Returns:
+        tuple: (plaintext API key, re-encrypted value to store or None if it is already current)
+    """
     if not encrypted_key:
-        return ""
-    
+        return "", None
+
     try:
-        key = get_encryption_key()
-        f = Fernet(key)
         encrypted_bytes = base64.urlsafe_b64decode(encrypted_key.encode())
-        decrypted_key = f.decrypt(encrypted_bytes)
-        return decrypted_key.decode()
+        try:
+            return _get_current_fernet().decrypt(encrypted_bytes).decode(), None
+        except InvalidToken:
+            if not _get_previous_encryption_keys():
+                raise
+
+        decrypted_key = _get_fernet().decrypt(encrypted_bytes).decode()
+        return decrypted_key, encrypt_api_key(decrypted_key)
     except Exception as e:
         print(f"Error decrypting API key: {e}")
-        return ""
\ No newline at end of file
+        return "", None
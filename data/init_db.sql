@@ -80,7 +80,7 @@ CREATE TABLE IF NOT EXISTS scene_npcs (
     PRIMARY KEY (guild_id, scene_id, npc_id)
 );
 
--- Reminders
+-- Reminders (no longer written; scheduled_reminders replaced it. Kept until a migration retires it)
 CREATE TABLE IF NOT EXISTS reminders (
     guild_id TEXT NOT NULL,
     user_id TEXT NOT NULL,
@@ -88,6 +88,19 @@ CREATE TABLE IF NOT EXISTS reminders (
     PRIMARY KEY (guild_id, user_id)
 );
 
+-- Reminders waiting to be sent. kind is 'dm' (set by a command) or 'mention' (automatic).
+-- A reminder is only sent if the user hasn't posted since reminder_time.
+CREATE TABLE IF NOT EXISTS scheduled_reminders (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    message TEXT,
+    reminder_time DOUBLE PRECISION NOT NULL,
+    due_at DOUBLE PRECISION NOT NULL,
+    claimed_at DOUBLE PRECISION
+);
+
 -- Auto reminder settings
 CREATE TABLE IF NOT EXISTS auto_reminder_settings (
     guild_id TEXT PRIMARY KEY,
@@ -115,6 +128,34 @@ CREATE TABLE IF NOT EXISTS auto_recaps (
     check_activity BOOLEAN NOT NULL DEFAULT TRUE
 );
 
+-- Append-only archive of story posts used by recaps. part numbers the embeds of one message.
+CREATE TABLE IF NOT EXISTS story_messages (
+    channel_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    part INTEGER NOT NULL DEFAULT 0,
+    guild_id TEXT NOT NULL,
+    created_at DOUBLE PRECISION NOT NULL,
+    author TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (channel_id, message_id, part)
+);
+
+-- Time range of each channel's history known to be fully archived
+CREATE TABLE IF NOT EXISTS story_archive_coverage (
+    channel_id TEXT PRIMARY KEY,
+    guild_id TEXT NOT NULL,
+    covered_from DOUBLE PRECISION NOT NULL,
+    covered_until DOUBLE PRECISION NOT NULL
+);
+
+-- Cached summaries of recap chunks from finished days, keyed by a hash of the chunk text
+CREATE TABLE IF NOT EXISTS recap_chunk_summaries (
+    chunk_hash TEXT PRIMARY KEY,
+    guild_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+
 -- API keys
 CREATE TABLE IF NOT EXISTS api_keys (
     guild_id TEXT PRIMARY KEY,
@@ -247,6 +288,11 @@ CREATE INDEX IF NOT EXISTS idx_server_settings_core_roll_mechanic ON server_sett
 CREATE INDEX IF NOT EXISTS idx_scenes_guild_active ON scenes(guild_id, is_active);
 
 CREATE INDEX IF NOT EXISTS idx_reminders_timestamp ON reminders(timestamp);
+CREATE INDEX IF NOT EXISTS idx_story_messages_channel_time ON story_messages(channel_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_recap_chunk_summaries_day ON recap_chunk_summaries(day);
+CREATE INDEX IF NOT EXISTS idx_scheduled_reminders_due ON scheduled_reminders(due_at) WHERE claimed_at IS NULL;
+-- One pending mention reminder per user; a claimed one being sent doesn't hold the slot
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scheduled_reminders_pending_mention ON scheduled_reminders(guild_id, user_id) WHERE kind = 'mention' AND claimed_at IS NULL;
 
 CREATE INDEX IF NOT EXISTS idx_initiative_active ON initiative(guild_id, is_active);
 
@@ -267,6 +313,8 @@ CREATE INDEX IF NOT EXISTS idx_entity_links_to ON entity_links(to_entity_id);
 CREATE INDEX IF NOT EXISTS idx_entity_links_link_type ON entity_links(link_type);
 CREATE INDEX IF NOT EXISTS idx_entity_links_guild_from ON entity_links(guild_id, from_entity_id);
 CREATE INDEX IF NOT EXISTS idx_entity_links_guild_to ON entity_links(guild_id, to_entity_id);
+-- Possession lookups: a container's stacks, quantity changes and possession trees
+CREATE INDEX IF NOT EXISTS idx_entity_links_possesses ON entity_links(guild_id, from_entity_id, to_entity_id) WHERE link_type = 'possesses';
 
 CREATE INDEX IF NOT EXISTS idx_character_nicknames_character_id ON character_nicknames(guild_id, character_id);
 
@@ -0,0 +1,396 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from data.database import db_manager
+from data.query_stats import query_stats
+
+# Guilds whose link graph is kept in memory; the least recently used guild is dropped past this
+LINK_GRAPH_MAX_GUILDS = int(os.getenv("LINK_GRAPH_MAX_GUILDS", "500"))
+
+Edge = Tuple[str, str, str]  # (from entity id, to entity id, link type)
+
+# Links that pass visibility from one entity to the entities it links to
+ACCESS_LINK_TYPES = ('possesses', 'controls')
+
+class EntityAccess(NamedTuple):
+    """The entity columns that decide who can see it"""
+    owner_id: str
+    entity_type: str
+    access_type: str
+
+class _GuildLinks:
+    """
+    Adjacency of one guild's entity links in both directions, plus what access checks need
+    about each entity. Also keeps who can see which entities, updated as links and entities change.
+    """
+    def __init__(self):
+        self.children: Dict[str, Dict[str, Set[str]]] = {}  # link type -> from id -> to ids
+        self.parents: Dict[str, Dict[str, Set[str]]] = {}  # link type -> to id -> from ids
+        self.metadata: Dict[Edge, dict] = {}
+        self.entities: Dict[str, EntityAccess] = {}
+        self.owned_pcs: Dict[str, Set[str]] = {}  # owner user id -> their PC ids
+        # Built on first use, then kept up to date
+        self.public_visible: Optional[Set[str]] = None  # entities every player can see
+        self.user_visible: Dict[str, Set[str]] = {}  # user id -> entities visible through their PCs
+
+    def add_link(self, from_id: str, to_id: str, link_type: str, metadata: dict) -> None:
+        self.children.setdefault(link_type, {}).setdefault(from_id, set()).add(to_id)
+        self.parents.setdefault(link_type, {}).setdefault(to_id, set()).add(from_id)
+        self.metadata[(from_id, to_id, link_type)] = dict(metadata or {})
+        if link_type in ACCESS_LINK_TYPES:
+            self._link_access_changed(from_id, to_id)
+
+    def remove_link(self, from_id: str, to_id: str, link_type: str) -> None:
+        for index, key, value in ((self.children, from_id, to_id), (self.parents, to_id, from_id)):
+            ids = index.get(link_type, {}).get(key)
+            if ids is not None:
+                ids.discard(value)
+                if not ids:
+                    del index[link_type][key]
+        if self.metadata.pop((from_id, to_id, link_type), None) is not None and link_type in ACCESS_LINK_TYPES:
+            self._link_access_changed(from_id, to_id)
+
+    def update_metadata(self, from_id: str, to_id: str, link_type: str, metadata: dict, replace: bool) -> None:
+        edge = (from_id, to_id, link_type)
+        if edge in self.metadata:
+            if replace:
+                self.metadata[edge] = dict(metadata or {})
+            else:
+                self.metadata[edge].update(metadata or {})
+
+    def set_entity(self, entity_id: str, access: EntityAccess) -> None:
+        old = self.entities.get(entity_id)
+        if old == access:
+            return
+        self.entities[entity_id] = access
+        if old is not None and old.entity_type == 'pc':
+            self.owned_pcs.get(old.owner_id, set()).discard(entity_id)
+        if access.entity_type == 'pc':
+            self.owned_pcs.setdefault(access.owner_id, set()).add(entity_id)
+
+        # A possessor or controller going private hides what it holds, so recheck those too
+        self._refresh_public({entity_id} | self._access_children(entity_id))
+        for owner_id in {old.owner_id if old else None, access.owner_id} - {None}:
+            self.user_visible.pop(owner_id, None)
+
+    def remove_entity(self, entity_id: str) -> None:
+        for from_id, to_id, link_type in [edge for edge in self.metadata if entity_id in edge[:2]]:
+            self.remove_link(from_id, to_id, link_type)
+        old = self.entities.pop(entity_id, None)
+        if old is not None:
+            self.owned_pcs.get(old.owner_id, set()).discard(entity_id)
+            self.user_visible.pop(old.owner_id, None)
+        if self.public_visible is not None:
+            self.public_visible.discard(entity_id)
+
+    # Visibility: the same rules as the player branch of EntityRepository.get_all_accessible used to query
+
+    def _access_children(self, entity_id: str) -> Set[str]:
+        return {child for link_type in ACCESS_LINK_TYPES for child in self.children.get(link_type, {}).get(entity_id, ())}
+
+    def _access_parents(self, entity_id: str) -> Set[str]:
+        return {parent for link_type in ACCESS_LINK_TYPES for parent in self.parents.get(link_type, {}).get(entity_id, ())}
+
+    def _is_public_visible(self, entity_id: str) -> bool:
+        """Public, and not possessed or controlled by anything that isn't"""
+        access = self.entities.get(entity_id)
+        if access is None or access.access_type != 'public':
+            return False
+        return all(
+            parent not in self.entities or self.entities[parent].access_type == 'public'
+            for parent in self._access_parents(entity_id)
+        )
+
+    def _refresh_public(self, entity_ids: Iterable[str]) -> None:
+        if self.public_visible is None:
+            return
+        for entity_id in entity_ids:
+            if self._is_public_visible(entity_id):
+                self.public_visible.add(entity_id)
+            else:
+                self.public_visible.discard(entity_id)
+
+    def _link_access_changed(self, from_id: str, to_id: str) -> None:
+        self._refresh_public((to_id,))
+        from_access = self.entities.get(from_id)
+        if from_access is not None and from_access.entity_type == 'pc':
+            self.user_visible.pop(from_access.owner_id, None)
+
+    def visible_ids(self, user_id: str) -> Set[str]:
+        """Ids of the entities a non-GM user can see"""
+        if self.public_visible is None:
+            self.public_visible = {entity_id for entity_id in self.entities if self._is_public_visible(entity_id)}
+        user_ids = self.user_visible.get(user_id)
+        if user_ids is None:
+            # Their own PCs, and whatever those possess or control
+            pcs = self.owned_pcs.get(user_id, set())
+            user_ids = set(pcs)
+            for pc_id in pcs:
+                user_ids |= self._access_children(pc_id)
+            self.user_visible[user_id] = user_ids
+        return self.public_visible | user_ids
+
+    @staticmethod
+    def _neighbours(index: Dict[str, Dict[str, Set[str]]], entity_id: str, link_type: Optional[str]) -> Set[str]:
+        if link_type:
+            return set(index.get(link_type, {}).get(entity_id, ()))
+        return {other for by_entity in index.values() for other in by_entity.get(entity_id, ())}
+
+    def reachable(self, index: Dict[str, Dict[str, Set[str]]], entity_id: str, link_type: Optional[str]) -> Set[str]:
+        """Every entity reachable by repeatedly following links in one direction, excluding the start"""
+        seen = set()
+        queue = deque([entity_id])
+        while queue:
+            for other in self._neighbours(index, queue.popleft(), link_type):
+                if other not in seen and other != entity_id:
+                    seen.add(other)
+                    queue.append(other)
+        return seen
+
+class EntityLinkGraph:
+    """
+    Per-guild in-memory graph of entity links, for parent/child/ancestor lookups and
+    control checks without a query each time.
+
+    A guild is loaded with one query per table on first use and kept coherent by the
+    link and entity repositories, which write through every change. Changes made while a
+    guild is being loaded are replayed onto the fresh copy before it's kept. Only the most
+    recently used LINK_GRAPH_MAX_GUILDS guilds are kept.
+    """
+    def __init__(self, max_guilds: int = LINK_GRAPH_MAX_GUILDS):
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[str, _GuildLinks]" = OrderedDict()
+        self._lock = threading.RLock()
+        # guild id -> one list per load in progress of the changes written since it started;
+        # None in a list means the guild was invalidated and that load shouldn't be kept
+        self._loading: Dict[str, List[List[Optional[Callable[[_GuildLinks], None]]]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _fetch_guild(guild_id: str) -> _GuildLinks:
+        guild = _GuildLinks()
+        with query_stats.track('EntityLinkGraph._fetch_guild') as timer:
+            with db_manager.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT from_entity_id, to_entity_id, link_type, metadata FROM entity_links WHERE guild_id = %s",
+                        (guild_id,)
+                    )
+                    links = cur.fetchall()
+                    for row in links:
+                        metadata = row['metadata']
+                        if isinstance(metadata, str):
+                            metadata = json.loads(metadata)
+                        guild.add_link(row['from_entity_id'], row['to_entity_id'], row['link_type'], metadata)
+                    cur.execute("SELECT id, owner_id, entity_type, access_type FROM entities WHERE guild_id = %s", (guild_id,))
+                    entities = cur.fetchall()
+                    for row in entities:
+                        guild.set_entity(row['id'], EntityAccess(str(row['owner_id']), row['entity_type'], row['access_type'] or 'public'))
+                    timer.rows = len(links) + len(entities)
+        return guild
+
+    def _fetch_current(self, guild_id: str) -> Tuple[Optional[_GuildLinks], bool]:
+        """
+        Fetch a guild and replay onto it whatever was written while the queries ran, so it's
+        as current as a loaded copy. Returns (graph or None if the database failed, whether it can be kept).
+        """
+        changes = []
+        with self._lock:
+            self._loading.setdefault(guild_id, []).append(changes)
+        try:
+            guild = self._fetch_guild(guild_id)
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            guild = None
+        with self._lock:
+            in_progress = self._loading[guild_id]
+            in_progress.remove(changes)
+            if not in_progress:
+                del self._loading[guild_id]
+            if guild is None or None in changes:
+                return guild, False
+            for change in changes:
+                change(guild)
+            return guild, True
+
+    def _load_guild(self, guild_id: str) -> _GuildLinks:
+        guild_id = str(guild_id)
+        with self._lock:
+            guild = self._guilds.get(guild_id)
+            if guild is not None:
+                self._guilds.move_to_end(guild_id)
+                self.hits += 1
+                return guild
+            self.misses += 1
+
+        guild, keep = self._fetch_current(guild_id)
+        if guild is None:
+            # Answer as if the guild had no links or entities, and try the database again next time
+            return _GuildLinks()
+        if not keep:
+            return guild
+
+        with self._lock:
+            guild = self._guilds.setdefault(guild_id, guild)
+            self._guilds.move_to_end(guild_id)
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+                self.evictions += 1
+            return guild
+
+    def _loaded_guild(self, guild_id: str) -> Optional[_GuildLinks]:
+        """Return the guild's graph only if it's already loaded; unloaded guilds pick up changes on load"""
+        return self._guilds.get(str(guild_id))
+
+    def is_loaded(self, guild_id: str) -> bool:
+        with self._lock:
+            return str(guild_id) in self._guilds
+
+    # Lookups
+
+    def get_child_ids(self, guild_id: str, entity_id: str, link_type: str = None) -> Set[str]:
+        """Ids of entities this entity links to"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return guild._neighbours(guild.children, str(entity_id), link_type)
+
+    def get_parent_ids(self, guild_id: str, entity_id: str, link_type: str = None) -> Set[str]:
+        """Ids of entities that link to this entity"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return guild._neighbours(guild.parents, str(entity_id), link_type)
+
+    def get_ancestor_ids(self, guild_id: str, entity_id: str, link_type: str = None) -> Set[str]:
+        """Ids of parents, their parents and so on; safe against cycles"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return guild.reachable(guild.parents, str(entity_id), link_type)
+
+    def get_descendant_ids(self, guild_id: str, entity_id: str, link_type: str = None) -> Set[str]:
+        """Ids of children, their children and so on; safe against cycles"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return guild.reachable(guild.children, str(entity_id), link_type)
+
+    def has_link(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str = None) -> bool:
+        return str(to_entity_id) in self.get_child_ids(guild_id, from_entity_id, link_type)
+
+    def get_metadata(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str) -> Optional[dict]:
+        """A copy of the link's metadata, or None if there's no such link"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            metadata = guild.metadata.get((str(from_entity_id), str(to_entity_id), link_type))
+            return dict(metadata) if metadata is not None else None
+
+    def user_controls(self, guild_id: str, user_id: str, entity_id: str) -> bool:
+        """Whether the user owns any entity with a controls link to this entity"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return any(
+                controller_id in guild.entities and guild.entities[controller_id].owner_id == str(user_id)
+                for controller_id in guild.parents.get('controls', {}).get(str(entity_id), ())
+            )
+
+    def get_entity_types(self, guild_id: str, entity_ids) -> Dict[str, str]:
+        """Entity type values for the given ids; unknown ids are left out"""
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return {entity_id: guild.entities[entity_id].entity_type for entity_id in entity_ids if entity_id in guild.entities}
+
+    def get_visible_entity_ids(self, guild_id: str, user_id: str) -> Set[str]:
+        """
+        Ids of the entities a non-GM user can see: their own PCs, what those possess or control,
+        and public entities not held by anything private.
+        """
+        guild = self._load_guild(guild_id)
+        with self._lock:
+            return guild.visible_ids(str(user_id))
+
+    # Write-through hooks used by the repositories
+
+    def _write(self, guild_id: str, change: Callable[[_GuildLinks], None]) -> None:
+        """Apply a change to the guild's graph if it's loaded, and to any copy still being loaded"""
+        guild_id = str(guild_id)
+        with self._lock:
+            guild = self._loaded_guild(guild_id)
+            if guild is not None:
+                change(guild)
+            for changes in self._loading.get(guild_id, ()):
+                changes.append(change)
+
+    def add_link(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str, metadata: dict = None) -> None:
+        metadata = dict(metadata or {})
+        self._write(guild_id, lambda guild: guild.add_link(str(from_entity_id), str(to_entity_id), link_type, metadata))
+
+    def remove_link(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str) -> None:
+        self._write(guild_id, lambda guild: guild.remove_link(str(from_entity_id), str(to_entity_id), link_type))
+
+    def update_metadata(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str,
+                        metadata: dict, replace: bool = True) -> None:
+        """Replace a link's metadata, or merge keys into it with replace=False"""
+        metadata = dict(metadata or {})
+        self._write(guild_id, lambda guild: guild.update_metadata(str(from_entity_id), str(to_entity_id), link_type, metadata, replace))
+
+    def set_entity(self, guild_id: str, entity_id: str, owner_id: str, entity_type: str, access_type: str) -> None:
+        """Record an entity's owner, type and access level after it's saved"""
+        access = EntityAccess(str(owner_id), entity_type, access_type or 'public')
+        self._write(guild_id, lambda guild: guild.set_entity(str(entity_id), access))
+
+    def remove_entity(self, guild_id: str, entity_id: str) -> None:
+        """Forget an entity and every link touching it (links cascade on delete)"""
+        self._write(guild_id, lambda guild: guild.remove_entity(str(entity_id)))
+
+    def invalidate_guild(self, guild_id: str) -> None:
+        guild_id = str(guild_id)
+        with self._lock:
+            self._guilds.pop(guild_id, None)
+            for changes in self._loading.get(guild_id, ()):
+                changes.append(None)
+
+    # Diagnostics
+
+    def check_consistency(self, guild_id: str, repair: bool = True) -> dict:
+        """
+        Compare a loaded guild's graph with the database. Counts links missing from memory,
+        links in memory that no longer exist, and differing metadata or entity access details.
+        With repair, an inconsistent graph is replaced by the fresh copy.
+        """
+        guild_id = str(guild_id)
+        with self._lock:
+            loaded = self._loaded_guild(guild_id)
+        report = {'loaded': loaded is not None, 'consistent': None, 'missing': 0, 'extra': 0, 'metadata_mismatches': 0, 'entity_mismatches': 0, 'repaired': False, 'error': False}
+        if loaded is None:
+            return report
+
+        fresh, keep = self._fetch_current(guild_id)
+        if fresh is None:
+            report['error'] = True
+            return report
+        with self._lock:
+            memory_edges, db_edges = set(loaded.metadata), set(fresh.metadata)
+            report['missing'] = len(db_edges - memory_edges)
+            report['extra'] = len(memory_edges - db_edges)
+            report['metadata_mismatches'] = sum(1 for edge in memory_edges & db_edges if loaded.metadata[edge] != fresh.metadata[edge])
+            report['entity_mismatches'] = len(set(loaded.entities.items()) ^ set(fresh.entities.items()))
+            report['consistent'] = not any(report[key] for key in ('missing', 'extra', 'metadata_mismatches', 'entity_mismatches'))
+            if repair and keep and not report['consistent'] and self._guilds.get(guild_id) is loaded:
+                self._guilds[guild_id] = fresh
+                report['repaired'] = True
+        return report
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._guilds),
+                'max_size': self.max_guilds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -88,10 +88,15 @@ class SceneNotes:
     notes: str
 
 @dataclass
-class Reminder:
+class ScheduledReminder:
     guild_id: str
     user_id: str
-    timestamp: float
+    kind: str
+    reminder_time: float
+    due_at: float
+    message: Optional[str] = None
+    claimed_at: Optional[float] = None
+    id: Optional[int] = None
 
 @dataclass
 class AutoReminderSettings:
@@ -116,6 +121,30 @@ class AutoRecapSettings:
     paused: bool = False
     check_activity: bool = True
 
+@dataclass
+class StoryMessage:
+    channel_id: str
+    message_id: str
+    guild_id: str
+    created_at: float
+    author: str
+    content: str
+    part: int = 0
+
+@dataclass
+class StoryArchiveCoverage:
+    channel_id: str
+    guild_id: str
+    covered_from: float
+    covered_until: float
+
+@dataclass
+class RecapChunkSummary:
+    chunk_hash: str
+    guild_id: str
+    day: str
+    summary: str
+
 @dataclass
 class ApiKey:
     guild_id: str
@@ -232,6 +261,15 @@ class EntityDetails:
     controls: Optional[List[Dict[str, Any]]]
     controlled_by: Optional[List[Dict[str, Any]]]
 
+@dataclass
+class EntityLinkSummary:
+    """An entity's possession and control links, as {'id', 'name', 'entity_type'} entries like vw_entity_details"""
+    entity_id: str
+    possessed_items: List[Dict[str, Any]] = field(default_factory=list)
+    possessed_by: List[Dict[str, Any]] = field(default_factory=list)
+    controls: List[Dict[str, Any]] = field(default_factory=list)
+    controlled_by: List[Dict[str, Any]] = field(default_factory=list)
+
 @dataclass
 class CharacterNickname:
     """Represents a single nickname entry in the database."""
@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+from data.database import db_manager
+from data.query_stats import query_stats
+
+# Guilds whose names are kept in memory; the least recently used guild is dropped past this
+NAME_INDEX_MAX_GUILDS = int(os.getenv("NAME_INDEX_MAX_GUILDS", "500"))
+
+class _GuildNames:
+    """Name and nickname lookups for one guild, keyed by case-folded text"""
+    def __init__(self):
+        self.names: Dict[str, Dict[str, str]] = {}  # folded name -> {exact name: entity id}
+        self.entity_names: Dict[str, str] = {}  # entity id -> exact name
+        self.nicknames: Dict[str, Dict[str, str]] = {}  # folded nickname -> {exact nickname: character id}
+
+    def add_name(self, entity_id: str, name: str) -> None:
+        self.remove_name(entity_id)
+        self.names.setdefault(name.casefold(), {})[name] = entity_id
+        self.entity_names[entity_id] = name
+
+    def remove_name(self, entity_id: str) -> None:
+        old_name = self.entity_names.pop(entity_id, None)
+        if old_name is None:
+            return
+        bucket = self.names.get(old_name.casefold())
+        if bucket and bucket.get(old_name) == entity_id:
+            del bucket[old_name]
+            if not bucket:
+                del self.names[old_name.casefold()]
+
+    def add_nickname(self, character_id: str, nickname: str) -> None:
+        self.nicknames.setdefault(nickname.casefold(), {})[nickname] = character_id
+
+    def remove_nickname(self, nickname: str) -> None:
+        bucket = self.nicknames.get(nickname.casefold())
+        if bucket is not None:
+            bucket.pop(nickname, None)
+            if not bucket:
+                del self.nicknames[nickname.casefold()]
+
+    def remove_nicknames_for(self, character_id: str) -> None:
+        for folded in list(self.nicknames):
+            bucket = self.nicknames[folded]
+            for nickname in [n for n, cid in bucket.items() if cid == character_id]:
+                del bucket[nickname]
+            if not bucket:
+                del self.nicknames[folded]
+
+    @staticmethod
+    def _lookup(index: Dict[str, Dict[str, str]], text: str) -> Optional[str]:
+        bucket = index.get(text.casefold())
+        if not bucket:
+            return None
+        # Prefer an exact-case match when several names differ only by case
+        if text in bucket:
+            return bucket[text]
+        return next(iter(bucket.values()))
+
+    @staticmethod
+    def _lookup_all(index: Dict[str, Dict[str, str]], text: str) -> List[str]:
+        bucket = index.get(text.casefold(), {})
+        exact = bucket.get(text)
+        return ([exact] if exact is not None else []) + [entity_id for entity_id in bucket.values() if entity_id != exact]
+
+class EntityNameIndex:
+    """
+    Per-guild in-memory index from case-folded entity names and character nicknames
+    to entity ids.
+
+    A guild is loaded with one query per table on first use. The entity and nickname
+    repositories keep loaded guilds coherent on create, rename and delete; changes made
+    while a guild is being loaded are replayed onto it before it's kept. Only the most
+    recently used NAME_INDEX_MAX_GUILDS guilds are kept.
+    """
+    def __init__(self, max_guilds: int = NAME_INDEX_MAX_GUILDS):
+        self.max_guilds = max_guilds
+        self._guilds: "OrderedDict[str, _GuildNames]" = OrderedDict()
+        self._lock = threading.RLock()
+        # guild id -> one list per load in progress of the changes written since it started;
+        # None in a list means the guild was invalidated and that load shouldn't be kept
+        self._loading: Dict[str, List[List[Optional[Callable[[_GuildNames], None]]]]] = {}
+
+    @staticmethod
+    def _fetch_guild(guild_id: str) -> _GuildNames:
+        guild = _GuildNames()
+        with query_stats.track('EntityNameIndex._load_guild') as timer:
+            with db_manager.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT id, name FROM entities WHERE guild_id = %s", (guild_id,))
+                    names = cur.fetchall()
+                    for row in names:
+                        guild.add_name(row['id'], row['name'])
+                    cur.execute("SELECT nickname, character_id FROM character_nicknames WHERE guild_id = %s", (guild_id,))
+                    nicknames = cur.fetchall()
+                    for row in nicknames:
+                        guild.add_nickname(row['character_id'], row['nickname'])
+                    timer.rows = len(names) + len(nicknames)
+        return guild
+
+    def _load_guild(self, guild_id: str) -> _GuildNames:
+        with self._lock:
+            guild = self._guilds.get(guild_id)
+            if guild is not None:
+                self._guilds.move_to_end(guild_id)
+                return guild
+            changes = []
+            self._loading.setdefault(guild_id, []).append(changes)
+
+        try:
+            guild = self._fetch_guild(guild_id)
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            guild = None
+
+        with self._lock:
+            in_progress = self._loading[guild_id]
+            in_progress.remove(changes)
+            if not in_progress:
+                del self._loading[guild_id]
+            if guild is None:
+                # Answer as if the guild had no names, and try the database again next time
+                return _GuildNames()
+            # Apply what was written while the queries ran, which they may not have seen
+            for change in changes:
+                if change is not None:
+                    change(guild)
+            if None in changes:
+                return guild
+            guild = self._guilds.setdefault(guild_id, guild)
+            self._guilds.move_to_end(guild_id)
+            while len(self._guilds) > self.max_guilds:
+                self._guilds.popitem(last=False)
+            return guild
+
+    def _loaded_guild(self, guild_id: str) -> Optional[_GuildNames]:
+        """Return the guild's index only if it's already loaded; unloaded guilds pick up changes on load"""
+        return self._guilds.get(str(guild_id))
+
+    def is_loaded(self, guild_id: str) -> bool:
+        with self._lock:
+            return str(guild_id) in self._guilds
+
+    def get_entity_id_by_name(self, guild_id: str, name: str) -> Optional[str]:
+        """Resolve an entity name (case-insensitive) to its id"""
+        guild = self._load_guild(str(guild_id))
+        with self._lock:
+            return guild._lookup(guild.names, name.strip())
+
+    def get_entity_ids_by_name(self, guild_id: str, name: str) -> List[str]:
+        """Every entity whose name matches case-insensitively, an exact-case match first"""
+        guild = self._load_guild(str(guild_id))
+        with self._lock:
+            return guild._lookup_all(guild.names, name.strip())
+
+    def get_character_id_by_nickname(self, guild_id: str, nickname: str) -> Optional[str]:
+        """Resolve a character nickname (case-insensitive) to the character's id"""
+        guild = self._load_guild(str(guild_id))
+        with self._lock:
+            return guild._lookup(guild.nicknames, nickname.strip())
+
+    def get_entity_names(self, guild_id: str, entity_ids: Iterable[str]) -> Dict[str, str]:
+        """Exact names for the given entity ids; unknown ids are left out"""
+        guild = self._load_guild(str(guild_id))
+        with self._lock:
+            return {entity_id: guild.entity_names[entity_id] for entity_id in entity_ids if entity_id in guild.entity_names}
+
+    def resolve(self, guild_id: str, name_or_nickname: str) -> Optional[str]:
+        """Resolve a name first, then a nickname, to an entity id"""
+        return self.get_entity_id_by_name(guild_id, name_or_nickname) or self.get_character_id_by_nickname(guild_id, name_or_nickname)
+
+    # Write-through hooks used by the repositories
+
+    def _write(self, guild_id: str, change: Callable[[_GuildNames], None]) -> None:
+        """Apply a change to the guild's index if it's loaded, and to any copy still being loaded"""
+        guild_id = str(guild_id)
+        with self._lock:
+            guild = self._loaded_guild(guild_id)
+            if guild is not None:
+                change(guild)
+            for changes in self._loading.get(guild_id, ()):
+                changes.append(change)
+
+    def set_entity_name(self, guild_id: str, entity_id: str, name: str) -> None:
+        self._write(guild_id, lambda guild: guild.add_name(str(entity_id), name))
+
+    def rename_entity(self, entity_id: str, new_name: str) -> None:
+        """Rename an entity in whichever loaded (or loading) guild holds it"""
+        def rename(guild: _GuildNames) -> None:
+            if str(entity_id) in guild.entity_names:
+                guild.add_name(str(entity_id), new_name)
+        with self._lock:
+            for guild in self._guilds.values():
+                rename(guild)
+            for loads in self._loading.values():
+                for changes in loads:
+                    changes.append(rename)
+
+    def remove_entity(self, guild_id: str, entity_id: str) -> None:
+        """Forget an entity's name and nicknames (nicknames cascade on delete)"""
+        def remove(guild: _GuildNames) -> None:
+            guild.remove_name(str(entity_id))
+            guild.remove_nicknames_for(str(entity_id))
+        self._write(guild_id, remove)
+
+    def add_nickname(self, guild_id: str, character_id: str, nickname: str) -> None:
+        self._write(guild_id, lambda guild: guild.add_nickname(str(character_id), nickname))
+
+    def remove_nickname(self, guild_id: str, nickname: str) -> None:
+        self._write(guild_id, lambda guild: guild.remove_nickname(nickname))
+
+    def remove_nicknames_for_character(self, guild_id: str, character_id: str) -> None:
+        self._write(guild_id, lambda guild: guild.remove_nicknames_for(str(character_id)))
+
+    def invalidate_guild(self, guild_id: str) -> None:
+        guild_id = str(guild_id)
+        with self._lock:
+            self._guilds.pop(guild_id, None)
+            for changes in self._loading.get(guild_id, ()):
+                changes.append(None)
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Upper bounds (ms) of the latency histogram buckets; anything slower lands in the overflow bucket
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+class QueryMetrics:
+    """Aggregated timings for one query label (usually Repository.method)"""
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def record(self, duration_ms: float, rows: Optional[int], failed: bool) -> None:
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        if rows:
+            self.rows += rows
+        if failed:
+            self.errors += 1
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Approximate a percentile from the histogram, as the upper bound of the bucket it falls in"""
+        if not self.calls:
+            return 0.0
+        target = self.calls * fraction
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(float(HISTOGRAM_BUCKETS_MS[i]), self.max_ms) if i < len(HISTOGRAM_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': self.total_ms,
+            'avg_ms': self.total_ms / self.calls if self.calls else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+            'buckets': dict(zip([f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + ['>2500ms'], self.buckets)),
+        }
+
+class QueryTimer:
+    """Handle yielded by QueryStats.track so the caller can report how many rows the query touched"""
+    def __init__(self):
+        self.rows: Optional[int] = None
+
+class QueryStats:
+    """
+    Process-wide query timings keyed by the repository method that issued them.
+
+    Queries slower than SLOW_QUERY_THRESHOLD_MS (default 250, 0 disables) are logged as warnings.
+    """
+    def __init__(self):
+        self.slow_query_threshold_ms = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '250'))
+        self._metrics: Dict[str, QueryMetrics] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, label: str, duration_ms: float, rows: Optional[int] = None, failed: bool = False, query: str = None) -> None:
+        with self._lock:
+            metrics = self._metrics.get(label)
+            if metrics is None:
+                metrics = self._metrics[label] = QueryMetrics()
+            metrics.record(duration_ms, rows, failed)
+
+        if self.slow_query_threshold_ms and duration_ms >= self.slow_query_threshold_ms:
+            statement = " ".join(query.split())[:200] if query else ""
+            logging.warning(f"Slow query in {label}: {duration_ms:.1f}ms, rows={rows} {statement}")
+
+    @contextmanager
+    def track(self, label: str, query: str = None):
+        """Time a block of raw cursor work under the given label"""
+        timer = QueryTimer()
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield timer
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record(label, (time.perf_counter() - start) * 1000, timer.rows, failed, query)
+
+    def get_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {label: metrics.to_dict() for label, metrics in self._metrics.items()}
+
+    def get_top(self, limit: int = 10, sort_by: str = 'total_ms') -> List[tuple]:
+        """Return (label, stats) pairs for the labels with the highest value of sort_by"""
+        stats = self.get_stats()
+        return sorted(stats.items(), key=lambda item: item[1][sort_by], reverse=True)[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self.started_at = time.time()
+
+def caller_label(instance, depth: int = 2) -> str:
+    """Label a query with the class and method that issued it, e.g. ServerRepository.get_by_guild_id"""
+    frame = sys._getframe(depth)
+    # Skip the repository's own generic helpers so the label names the real caller
+    while frame.f_back and frame.f_code.co_name in ('execute_query', 'find_by_id', 'find_all_by_column', 'save', 'delete'):
+        frame = frame.f_back
+    owner = frame.f_locals.get('self', instance)
+    return f"{type(owner).__name__}.{frame.f_code.co_name}"
+
+query_stats = QueryStats()
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 from typing import TypeVar, Generic, List, Optional
 from data.database import db_manager
+from data.query_stats import caller_label, query_stats
 import psycopg2.extras
 import logging
+import time
 
 T = TypeVar('T')
 
@@ -22,6 +24,9 @@ class BaseRepository(Generic[T], ABC):
     
     def execute_query(self, query: str, params: tuple = None, fetch_one: bool = False, select_override: bool = False):
         """Execute a query and return results"""
+        start = time.perf_counter()
+        rows = None
+        failed = False
         try:
             with db_manager.get_connection() as conn:
                 cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
@@ -31,36 +36,50 @@ class BaseRepository(Generic[T], ABC):
                 if query.strip().upper().startswith('SELECT') or select_override:
                     if fetch_one:
                         result = cur.fetchone()
+                        rows = 1 if result else 0
                         return self.from_dict(dict(result)) if result else None
                     else:
                         results = cur.fetchall()
+                        rows = len(results)
                         if results:
                             return [self.from_dict(dict(row)) for row in results]
                         else:
                             return []
                 else:
                     # For INSERT, UPDATE, DELETE queries, just return success
-                    return cur.rowcount if hasattr(cur, 'rowcount') else None
+                    rows = cur.rowcount if hasattr(cur, 'rowcount') else None
+                    return rows
                         
         except Exception as e:
+            failed = True
             logging.error(f"Database error: {e}")
             if query.strip().upper().startswith('SELECT'):
                 return [] if not fetch_one else None
             else:
                 return None
+        finally:
+            query_stats.record(caller_label(self), (time.perf_counter() - start) * 1000, rows, failed, query)
+    
+    async def execute_query_async(self, query: str, params: tuple = None, fetch_one: bool = False, select_override: bool = False):
+        """Awaitable execute_query that runs on the database executor instead of the event loop"""
+        return await db_manager.run(self.execute_query, query, params, fetch_one, select_override)
     
     def find_by_id(self, id_column: str, id_value: str) -> Optional[T]:
         """Find entity by ID"""
         query = f"SELECT * FROM {self.table_name} WHERE {id_column} = %s"
         return self.execute_query(query, (id_value,), fetch_one=True)
     
+    async def find_by_id_async(self, id_column: str, id_value: str) -> Optional[T]:
+        """Awaitable find_by_id"""
+        return await db_manager.run(self.find_by_id, id_column, id_value)
+    
     def find_all_by_column(self, column: str, value: str) -> List[T]:
         """Find all entities by column value"""
         query = f"SELECT * FROM {self.table_name} WHERE {column} = %s"
         return self.execute_query(query, (value,))
     
-    def save(self, entity: T, conflict_columns: List[str] = None) -> None:
-        """Save entity with upsert logic"""
+    def save(self, entity: T, conflict_columns: List[str] = None) -> Optional[int]:
+        """Save entity with upsert logic. Returns the affected row count, or None if the write failed"""
         data = self.to_dict(entity)
         columns = list(data.keys())
         placeholders = ['%s'] * len(columns)
@@ -86,7 +105,11 @@ class BaseRepository(Generic[T], ABC):
                 # All columns are part of the primary key/conflict, so just ignore duplicates
                 query += f" ON CONFLICT ({conflict_cols}) DO NOTHING"
         
-        self.execute_query(query, tuple(values))
+        return self.execute_query(query, tuple(values))
+    
+    async def save_async(self, entity: T, conflict_columns: List[str] = None) -> None:
+        """Awaitable save"""
+        await db_manager.run(self.save, entity, conflict_columns)
     
     def delete(self, where_clause: str, params: tuple = None) -> int:
         """Delete entities matching where clause"""
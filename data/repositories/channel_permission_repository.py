@@ -1,10 +1,25 @@
-from typing import Optional
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
 from .base_repository import BaseRepository
 from data.models import ChannelPermission
+from data.database import db_manager
+from data.query_stats import query_stats
 
 class ChannelPermissionRepository(BaseRepository[ChannelPermission]):
+    """
+    Channel types are read on every message and most commands, so each guild's
+    channel -> type map is loaded once in a single query and kept in memory.
+    Writes through this repository update the map (and are replayed onto a map
+    still being loaded), so lookups need no database round trip once a guild is loaded.
+    """
     def __init__(self):
         super().__init__("channel_permissions")
+        self._channel_types: Dict[str, Dict[str, str]] = {}
+        # guild id -> one list per load in progress of (channel id, new type or None if removed)
+        # written since it started; None in a list means the guild was invalidated mid-load
+        self._loading: Dict[str, List[List[Optional[Tuple[str, Optional[str]]]]]] = {}
+        self._lock = threading.Lock()
     
     def to_dict(self, entity: ChannelPermission) -> dict:
         return {
@@ -20,6 +35,67 @@ class ChannelPermissionRepository(BaseRepository[ChannelPermission]):
             channel_type=data["channel_type"]
         )
     
+    def _load_guild(self, guild_id: str) -> Dict[str, str]:
+        """Load every channel type for a guild in one query"""
+        with self._lock:
+            channel_types = self._channel_types.get(guild_id)
+        if channel_types is not None:
+            return channel_types
+        
+        changes = []
+        with self._lock:
+            self._loading.setdefault(guild_id, []).append(changes)
+        query = f"SELECT channel_id, channel_type FROM {self.table_name} WHERE guild_id = %s"
+        try:
+            with query_stats.track('ChannelPermissionRepository._load_guild', query) as timer:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, (guild_id,))
+                        channel_types = {row['channel_id']: row['channel_type'] for row in cur.fetchall()}
+                        timer.rows = len(channel_types)
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            channel_types = None
+        
+        with self._lock:
+            in_progress = self._loading[guild_id]
+            in_progress.remove(changes)
+            if not in_progress:
+                del self._loading[guild_id]
+            if channel_types is None:
+                # Treat the guild as unrestricted for now and try the database again next time
+                return {}
+            if None in changes:
+                return channel_types
+            # Apply what was written while the query ran, which it may not have seen
+            for channel_id, channel_type in changes:
+                self._apply(channel_types, channel_id, channel_type)
+            # Another thread may have loaded (and then written to) the map in the meantime
+            return self._channel_types.setdefault(guild_id, channel_types)
+    
+    @staticmethod
+    def _apply(channel_types: Dict[str, str], channel_id: str, channel_type: Optional[str]) -> None:
+        if channel_type is None:
+            channel_types.pop(channel_id, None)
+        else:
+            channel_types[channel_id] = channel_type
+    
+    def _write(self, guild_id: str, channel_id: str, channel_type: Optional[str]) -> None:
+        """Update a loaded guild's map, and any map still being loaded, after a write"""
+        with self._lock:
+            channel_types = self._channel_types.get(guild_id)
+            if channel_types is not None:
+                self._apply(channel_types, channel_id, channel_type)
+            for changes in self._loading.get(guild_id, ()):
+                changes.append((channel_id, channel_type))
+    
+    def invalidate_guild(self, guild_id: str) -> None:
+        """Forget a guild's channel types so they are reloaded on next use"""
+        with self._lock:
+            self._channel_types.pop(str(guild_id), None)
+            for changes in self._loading.get(str(guild_id), ()):
+                changes.append(None)
+    
     def set_channel_type(self, guild_id: str, channel_id: str, channel_type: str) -> None:
         """Set the channel type for a specific channel"""
         permission = ChannelPermission(
@@ -27,20 +103,36 @@ class ChannelPermissionRepository(BaseRepository[ChannelPermission]):
             channel_id=str(channel_id),
             channel_type=channel_type
         )
-        self.save(permission, conflict_columns=['guild_id', 'channel_id'])
+        # Only cache what the database actually stored
+        if self.save(permission, conflict_columns=['guild_id', 'channel_id']) is None:
+            return
+        self._write(str(guild_id), str(channel_id), channel_type)
     
     def get_channel_type(self, guild_id: str, channel_id: str) -> Optional[str]:
         """Get the channel type for a specific channel"""
-        query = f"SELECT * FROM {self.table_name} WHERE guild_id = %s AND channel_id = %s"
-        result = self.execute_query(query, (str(guild_id), str(channel_id)), fetch_one=True)
-        return result.channel_type if result else None
+        return self._load_guild(str(guild_id)).get(str(channel_id))
+    
+    async def get_channel_type_async(self, guild_id: str, channel_id: str) -> Optional[str]:
+        """Get the channel type, only leaving the event loop if the guild hasn't been loaded yet"""
+        with self._lock:
+            channel_types = self._channel_types.get(str(guild_id))
+        if channel_types is None:
+            channel_types = await db_manager.run(self._load_guild, str(guild_id))
+        return channel_types.get(str(channel_id))
 
     def remove_channel_permission(self, guild_id: str, channel_id: str) -> None:
         """Remove channel permission (set to unrestricted)"""
         query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND channel_id = %s"
-        self.execute_query(query, (str(guild_id), str(channel_id)))
+        if self.execute_query(query, (str(guild_id), str(channel_id))) is None:
+            return
+        self._write(str(guild_id), str(channel_id), None)
     
     def get_all_channel_permissions(self, guild_id: str) -> list[ChannelPermission]:
         """Get all channel permissions for a guild"""
-        query = f"SELECT * FROM {self.table_name} WHERE guild_id = %s"
-        return self.execute_query(query, (str(guild_id),))
\ No newline at end of file
+        channel_types = self._load_guild(str(guild_id))
+        with self._lock:
+            items = list(channel_types.items())
+        return [
+            ChannelPermission(guild_id=str(guild_id), channel_id=channel_id, channel_type=channel_type)
+            for channel_id, channel_type in items
+        ]
@@ -1,5 +1,7 @@
+import copy
 from typing import List, Optional
 from .base_repository import BaseRepository
+from data.cache import TTLCache
 from data.models import Character, ActiveCharacter, CharacterNickname
 from core.base_models import AccessType, BaseCharacter, BaseEntity, EntityJSONEncoder, EntityType, SystemType
 import json
@@ -149,23 +151,37 @@ class CharacterRepository(BaseRepository[Character]):
     def delete_character(self, guild_id: str, character_id: str) -> None:
         """Delete a character and all its links"""
         # Get the character to find its guild_id
+        from .repository_factory import repositories
         character = self.get_by_id(character_id)
         if character:
             # Delete all links involving this character
-            from .repository_factory import repositories
             repositories.link.delete_all_links_for_entity(str(guild_id), character_id)
             
         # Delete the character itself
         query = f"DELETE FROM {self.table_name} WHERE id = %s"
         self.execute_query(query, (character_id,))
+        repositories.name_index.remove_entity(guild_id, character_id)
+        repositories.link_graph.remove_entity(guild_id, character_id)
+        repositories.active_character.invalidate_character(character_id)
 
     def get_character_by_name(self, guild_id: int, name: str) -> Optional[BaseCharacter]:
         """Alias for get_by_name for backward compatibility"""
         return self.get_by_name(str(guild_id), name)
 
+    def get_by_name_or_nickname(self, guild_id: str, name: str) -> Optional[BaseCharacter]:
+        """Resolve a name or nickname (case-insensitive) through the name index, then fetch by id"""
+        from .repository_factory import repositories
+        character_id = repositories.name_index.resolve(str(guild_id), name)
+        return self.get_by_id(character_id) if character_id else None
+
 class ActiveCharacterRepository(BaseRepository[ActiveCharacter]):
+    # Active characters are looked up on most rolls and pc:: posts, so the joined entity row is
+    # cached briefly per (guild, user). Set to 0 to disable.
+    ACTIVE_CACHE_TTL_SECONDS = 15
+
     def __init__(self):
         super().__init__('active_characters')
+        self._active_cache = TTLCache(self.ACTIVE_CACHE_TTL_SECONDS)
     
     def to_dict(self, entity: ActiveCharacter) -> dict:
         return {
@@ -213,26 +229,46 @@ class ActiveCharacterRepository(BaseRepository[ActiveCharacter]):
         """Get user's active character object as BaseCharacter"""
         from .repository_factory import repositories
         
-        active_record = self.get_active_character_record(guild_id, user_id)
-        if active_record:
-            # Use find_all_by_column to get Character, then convert
-            return repositories.entity.get_by_id(active_record.char_id)
-        return None
+        key = (str(guild_id), str(user_id))
+        found, entity_row = self._active_cache.get(key)
+        if not found:
+            query = f"""
+                SELECT e.*
+                FROM {self.table_name} ac
+                JOIN entities e ON e.id = ac.char_id
+                WHERE ac.guild_id = %s AND ac.user_id = %s
+            """
+            entity_row = repositories.entity.execute_query(query, key, fetch_one=True, select_override=True)
+            self._active_cache.set(key, entity_row)
+        
+        if not entity_row:
+            return None
+        # Convert from a copy so callers can't mutate the cached row
+        return repositories.entity._convert_to_base_entity(copy.deepcopy(entity_row))
     
     def get_all_active_characters(self, guild_id: int) -> List[BaseCharacter]:
         """Get all active characters in a guild"""
         from .repository_factory import repositories
         
-        query = f"SELECT * FROM {self.table_name} WHERE guild_id = %s"
-        active_records = self.execute_query(query, (str(guild_id),))
-        
-        active_characters = []
-        for record in active_records:
-            character = repositories.entity.get_by_id(record.char_id)
-            if character:
-                active_characters.append(character)
-        
-        return active_characters
+        query = f"""
+            SELECT e.*
+            FROM {self.table_name} ac
+            JOIN entities e ON e.id = ac.char_id
+            WHERE ac.guild_id = %s
+            ORDER BY e.name
+        """
+        entity_rows = repositories.entity.execute_query(query, (str(guild_id),), select_override=True)
+        return repositories.entity._convert_list_to_base_entities(entity_rows)
+    
+    def invalidate_character(self, character_id: str) -> None:
+        """Drop cached active character rows for a character that changed or was deleted"""
+        self._active_cache.invalidate_where(
+            lambda key, entity_row: entity_row is not None and entity_row.id == str(character_id)
+        )
+    
+    def get_cache_stats(self) -> dict:
+        """Hit/miss counters for the active character cache"""
+        return self._active_cache.get_stats()
     
     def set_active_character(self, guild_id: str, user_id: str, character_id: str) -> None:
         """Set a user's active character"""
@@ -242,11 +278,13 @@ class ActiveCharacterRepository(BaseRepository[ActiveCharacter]):
             char_id=character_id
         )
         self.save(active_char, conflict_columns=['guild_id', 'user_id'])
+        self._active_cache.invalidate((str(guild_id), str(user_id)))
     
     def clear_active_character(self, guild_id: int, user_id: int) -> None:
         """Clear a user's active character"""
         query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND user_id = %s"
         self.execute_query(query, (str(guild_id), str(user_id)))
+        self._active_cache.invalidate((str(guild_id), str(user_id)))
 
 class CharacterNicknameRepository(BaseRepository[CharacterNickname]):
     def __init__(self):
@@ -287,15 +325,21 @@ class CharacterNicknameRepository(BaseRepository[CharacterNickname]):
 
     def add_nickname(self, guild_id: str, character_id: str, nickname: str):
         """Add a new nickname for a character."""
+        from .repository_factory import repositories
         record = CharacterNickname(guild_id, character_id, nickname)
         self.save(record, conflict_columns=['guild_id', 'nickname'])
+        repositories.name_index.add_nickname(guild_id, character_id, nickname)
 
     def remove_nickname(self, guild_id: str, nickname: str):
         """Remove a specific nickname."""
+        from .repository_factory import repositories
         query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND nickname = %s"
         self.execute_query(query, (str(guild_id), nickname))
+        repositories.name_index.remove_nickname(guild_id, nickname)
 
     def remove_all_for_character(self, guild_id: str, character_id: str):
         """Remove all nicknames for a character."""
+        from .repository_factory import repositories
         query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND character_id = %s"
-        self.execute_query(query, (str(guild_id), str(character_id)))
\ No newline at end of file
+        self.execute_query(query, (str(guild_id), str(character_id)))
+        repositories.name_index.remove_nicknames_for_character(guild_id, character_id)
\ No newline at end of file
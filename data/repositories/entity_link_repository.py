@@ -1,12 +1,18 @@
-from typing import List, Optional, Dict, Any
+import logging
+from typing import List, Optional, Dict, Any, Set, Tuple
 from .base_repository import BaseRepository
+from data.database import db_manager
+from data.query_stats import query_stats
 from data.models import EntityLink
-from core.base_models import BaseEntity
+from core.base_models import BaseEntity, PossessionNode
 import json
 import uuid
 from datetime import datetime
 
 class EntityLinkRepository(BaseRepository[EntityLink]):
+    # How deep possession trees are followed (bag in chest in ship in fleet...)
+    POSSESSION_TREE_MAX_DEPTH = 10
+
     def __init__(self):
         super().__init__('entity_links')
     
@@ -47,46 +53,117 @@ class EntityLinkRepository(BaseRepository[EntityLink]):
     def get_children(self, guild_id: str, entity_id: str, link_type: str = None) -> List[BaseEntity]:
         """Get entities that this entity has links TO (children)"""
         from data.repositories.repository_factory import repositories
-        
-        params = [str(guild_id), str(entity_id)]
-        link_type_clause = ""
-        if link_type:
-            link_type_clause = "AND el.link_type = %s"
-            params.append(link_type)
+        return self._get_entities_by_ids(repositories.link_graph.get_child_ids(guild_id, entity_id, link_type))
+
+    def get_parents(self, guild_id: str, entity_id: str, link_type: str = None) -> List[BaseEntity]:
+        """Get entities that have links TO this entity (parents)"""
+        from data.repositories.repository_factory import repositories
+        return self._get_entities_by_ids(repositories.link_graph.get_parent_ids(guild_id, entity_id, link_type))
+
+    def get_descendants(self, guild_id: str, entity_id: str, link_type: str = None) -> List[BaseEntity]:
+        """Get children, their children and so on at any depth, each once, without the entity itself"""
+        from data.repositories.repository_factory import repositories
+        return self._get_entities_by_ids(repositories.link_graph.get_descendant_ids(guild_id, entity_id, link_type))
+
+    def _get_entities_by_ids(self, entity_ids: Set[str]) -> List[BaseEntity]:
+        """Load linked entities found in the link graph, skipping the query when there are none"""
+        from data.repositories.repository_factory import repositories
+        if not entity_ids:
+            return []
+        query = "SELECT * FROM entities WHERE id = ANY(%s) ORDER BY name"
+        # Use the entity repository's methods to handle conversion from dict to BaseEntity
+        entity_dicts = repositories.entity.execute_query(query, (list(entity_ids),))
+        return repositories.entity._convert_list_to_base_entities(entity_dicts)
 
+    def get_companion_ids_controlled_by_user(self, guild_id: str, user_id: str) -> Set[str]:
+        """Get ids of companions controlled by any character the user owns, in one query"""
         query = f"""
-            SELECT e.* 
-            FROM entities e
-            JOIN entity_links el ON e.id = el.to_entity_id
-            WHERE el.guild_id = %s AND el.from_entity_id = %s {link_type_clause}
-            ORDER BY e.name
+            SELECT DISTINCT el.to_entity_id
+            FROM {self.table_name} el
+            JOIN entities controller ON controller.id = el.from_entity_id
+            JOIN entities companion ON companion.id = el.to_entity_id
+            WHERE el.guild_id = %s
+              AND el.link_type = 'controls'
+              AND controller.owner_id = %s
+              AND companion.entity_type = 'companion'
         """
-        
-        # Use the entity repository's methods to handle conversion from dict to BaseEntity
-        child_entity_dicts = repositories.entity.execute_query(query, tuple(params))
-        return repositories.entity._convert_list_to_base_entities(child_entity_dicts)
+        try:
+            with query_stats.track('EntityLinkRepository.get_companion_ids_controlled_by_user', query) as timer:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, (str(guild_id), str(user_id)))
+                        companion_ids = {row['to_entity_id'] for row in cur.fetchall()}
+                        timer.rows = len(companion_ids)
+                        return companion_ids
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            return set()
 
-    def get_parents(self, guild_id: str, entity_id: str, link_type: str = None) -> List[BaseEntity]:
-        """Get entities that have links TO this entity (parents)"""
+    def get_possession_tree(self, root: BaseEntity, guild_id: str, max_depth: int = None) -> PossessionNode:
+        """
+        Load everything an entity possesses, and everything those possess in turn, in one recursive query.
+        Each node carries the quantity from its possession link. Links that would revisit an entity
+        already on the path are skipped, so cycles can't recurse forever.
+        """
         from data.repositories.repository_factory import repositories
-        
-        params = [str(guild_id), str(entity_id)]
-        link_type_clause = ""
-        if link_type:
-            link_type_clause = "AND el.link_type = %s"
-            params.append(link_type)
 
+        max_depth = max_depth or self.POSSESSION_TREE_MAX_DEPTH
         query = f"""
-            SELECT e.* 
-            FROM entities e
-            JOIN entity_links el ON e.id = el.from_entity_id
-            WHERE el.guild_id = %s AND el.to_entity_id = %s {link_type_clause}
-            ORDER BY e.name
+            WITH RECURSIVE tree AS (
+                SELECT el.from_entity_id, el.to_entity_id, el.metadata, 1 AS depth,
+                       ARRAY[el.from_entity_id, el.to_entity_id] AS path
+                FROM {self.table_name} el
+                WHERE el.guild_id = %s AND el.from_entity_id = %s AND el.link_type = 'possesses'
+                UNION ALL
+                SELECT el.from_entity_id, el.to_entity_id, el.metadata, tree.depth + 1,
+                       tree.path || el.to_entity_id
+                FROM {self.table_name} el
+                JOIN tree ON el.from_entity_id = tree.to_entity_id
+                WHERE el.guild_id = %s AND el.link_type = 'possesses'
+                  AND tree.depth < %s
+                  AND NOT el.to_entity_id = ANY(tree.path)
+            )
+            SELECT tree.path AS tree_path, tree.depth AS tree_depth, tree.metadata AS tree_link_metadata, e.*
+            FROM tree
+            JOIN entities e ON e.id = tree.to_entity_id
+            ORDER BY tree.depth, e.name
         """
-        
-        # Use the entity repository's methods to handle conversion from dict to BaseEntity
-        parent_entity_dicts = repositories.entity.execute_query(query, tuple(params))
-        return repositories.entity._convert_list_to_base_entities(parent_entity_dicts)
+        root_node = PossessionNode(entity=root)
+        try:
+            with query_stats.track('EntityLinkRepository.get_possession_tree', query) as timer:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, (str(guild_id), str(root.id), str(guild_id), max_depth))
+                        rows = cur.fetchall()
+                        timer.rows = len(rows)
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            return root_node
+
+        # One row per path from the root; rows come out shallowest first, so parents are placed before children
+        nodes_by_path = {(str(root.id),): root_node}
+        for row in rows:
+            row = dict(row)
+            path = tuple(row.pop('tree_path'))
+            depth = row.pop('tree_depth')
+            link_metadata = row.pop('tree_link_metadata') or {}
+            if isinstance(link_metadata, str):
+                link_metadata = json.loads(link_metadata)
+            entity = repositories.entity._row_to_entity(row)
+            if not entity:
+                continue
+            parent_node = nodes_by_path.get(path[:-1])
+            if not parent_node:
+                continue
+            node = PossessionNode(
+                entity=entity,
+                quantity=link_metadata.get('quantity', 1),
+                depth=depth,
+                link_metadata=link_metadata
+            )
+            parent_node.children.append(node)
+            nodes_by_path[path] = node
+        return root_node
 
     def get_links_for_entity(self, guild_id: str, entity_id: str) -> List[EntityLink]:
         """Get all links involving this entity (both directions)"""
@@ -106,22 +183,33 @@ class EntityLinkRepository(BaseRepository[EntityLink]):
         )
         
         self.save(link, conflict_columns=['guild_id', 'from_entity_id', 'to_entity_id', 'link_type'])
+
+        from data.repositories.repository_factory import repositories
+        repositories.link_graph.add_link(guild_id, link.from_entity_id, link.to_entity_id, link_type, link.metadata)
         return link
 
+    def _forget_deleted(self, deleted_links: Optional[List[EntityLink]]) -> None:
+        """Write deleted links (returned by DELETE ... RETURNING) through to the link graph"""
+        from data.repositories.repository_factory import repositories
+        for link in deleted_links or []:
+            repositories.link_graph.remove_link(link.guild_id, link.from_entity_id, link.to_entity_id, link.link_type)
+
     def delete_link(self, link_id: str) -> bool:
         """Delete a link by ID"""
-        query = f"DELETE FROM {self.table_name} WHERE id = %s"
-        result = self.execute_query(query, (link_id,))
+        query = f"DELETE FROM {self.table_name} WHERE id = %s RETURNING *"
+        result = self.execute_query(query, (link_id,), select_override=True)
+        self._forget_deleted(result)
         return result is not None
 
     def delete_links_by_entities(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str = None) -> bool:
         """Delete links between two entities"""
         if link_type:
-            query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND from_entity_id = %s AND to_entity_id = %s AND link_type = %s"
-            self.execute_query(query, (str(guild_id), str(from_entity_id), str(to_entity_id), link_type))
+            query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND from_entity_id = %s AND to_entity_id = %s AND link_type = %s RETURNING *"
+            deleted = self.execute_query(query, (str(guild_id), str(from_entity_id), str(to_entity_id), link_type), select_override=True)
         else:
-            query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND from_entity_id = %s AND to_entity_id = %s"
-            self.execute_query(query, (str(guild_id), str(from_entity_id), str(to_entity_id)))
+            query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND from_entity_id = %s AND to_entity_id = %s RETURNING *"
+            deleted = self.execute_query(query, (str(guild_id), str(from_entity_id), str(to_entity_id)), select_override=True)
+        self._forget_deleted(deleted)
         return True
 
     def get_link_by_entities(self, guild_id: str, from_entity_id: str, to_entity_id: str, link_type: str = None) -> Optional[EntityLink]:
@@ -135,21 +223,136 @@ class EntityLinkRepository(BaseRepository[EntityLink]):
 
     def delete_all_links_for_entity(self, guild_id: str, entity_id: str) -> bool:
         """Delete all links involving an entity (used when deleting entities)"""
-        query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND (from_entity_id = %s OR to_entity_id = %s)"
-        self.execute_query(query, (str(guild_id), str(entity_id), str(entity_id)))
+        query = f"DELETE FROM {self.table_name} WHERE guild_id = %s AND (from_entity_id = %s OR to_entity_id = %s) RETURNING *"
+        deleted = self.execute_query(query, (str(guild_id), str(entity_id), str(entity_id)), select_override=True)
+        self._forget_deleted(deleted)
         return True
     
     def get_possessed_quantity(self, guild_id: str, parent_id: str, item_id: str) -> int:
         """Get the quantity of a specific item possessed by an entity"""
+        from data.repositories.repository_factory import repositories
         # Grab the quantity from the metadata if it exists. Default to 1
+        metadata = repositories.link_graph.get_metadata(guild_id, parent_id, item_id, 'possesses')
+        return metadata.get('quantity', 1) if metadata else 1
+    
+    def get_stack_quantity(self, guild_id: str, container_id: str, item_name: str) -> int:
+        """Total quantity of items with this name (case-insensitive) possessed by the container"""
         query = f"""
-            SELECT * 
-            FROM {self.table_name} 
-            WHERE guild_id = %s AND from_entity_id = %s AND to_entity_id = %s AND link_type = 'possesses'
+            SELECT COALESCE(SUM(COALESCE((el.metadata->>'quantity')::int, 1)), 0) AS quantity
+            FROM {self.table_name} el
+            JOIN entities e ON e.id = el.to_entity_id
+            WHERE el.guild_id = %s AND el.from_entity_id = %s AND el.link_type = 'possesses'
+              AND e.entity_type = 'item' AND lower(e.name) = lower(%s)
         """
-        link = self.execute_query(query, (str(guild_id), str(parent_id), str(item_id)), fetch_one=True)
-        return link.metadata.get('quantity', 1) if link else 1
-    
+        try:
+            with query_stats.track('EntityLinkRepository.get_stack_quantity', query) as timer:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, (str(guild_id), str(container_id), item_name))
+                        row = cur.fetchone()
+                        timer.rows = 1
+            return int(row['quantity']) if row else 0
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            return 0
+
+    def count_possessed_items(self, guild_id: str, container_id: str) -> int:
+        """Number of distinct items (stacks) possessed by the container"""
+        query = f"""
+            SELECT COUNT(*) AS item_count
+            FROM {self.table_name} el
+            JOIN entities e ON e.id = el.to_entity_id
+            WHERE el.guild_id = %s AND el.from_entity_id = %s AND el.link_type = 'possesses'
+              AND e.entity_type = 'item'
+        """
+        try:
+            with query_stats.track('EntityLinkRepository.count_possessed_items', query) as timer:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, (str(guild_id), str(container_id)))
+                        row = cur.fetchone()
+                        timer.rows = 1
+            return int(row['item_count']) if row else 0
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            return 0
+
+    def adjust_item_quantity(self, guild_id: str, container_id: str, item_id: str, delta: int,
+                             require_available: bool = False) -> Optional[Tuple[str, int]]:
+        """Atomically change the quantity on the container's possession link to an item"""
+        return self._adjust_possession_quantity(
+            "el.to_entity_id = %s", (str(item_id),),
+            guild_id, container_id, delta, require_available
+        )
+
+    def adjust_stack_quantity(self, guild_id: str, container_id: str, item_name: str, delta: int,
+                              require_available: bool = False) -> Optional[Tuple[str, int]]:
+        """Atomically change the quantity of the container's stack of items with this name (case-insensitive)"""
+        return self._adjust_possession_quantity(
+            "el.to_entity_id IN (SELECT id FROM entities WHERE guild_id = %s AND entity_type = 'item' AND lower(name) = lower(%s))",
+            (str(guild_id), item_name),
+            guild_id, container_id, delta, require_available
+        )
+
+    def _adjust_possession_quantity(self, match_sql: str, match_params: tuple, guild_id: str, container_id: str,
+                                    delta: int, require_available: bool) -> Optional[Tuple[str, int]]:
+        """
+        Add delta to a possession link's quantity in a single statement. The link row is locked while it
+        changes, so concurrent takes and gives can't lose updates, and it's deleted when nothing is left.
+        With require_available, nothing changes unless the stack holds at least -delta.
+        Returns (item id, new quantity), or None if there was no matching stack.
+        """
+        available_sql = "AND COALESCE((el.metadata->>'quantity')::int, 1) + %s >= 0" if require_available else ""
+        query = f"""
+            WITH locked AS (
+                SELECT el.id, el.to_entity_id, COALESCE((el.metadata->>'quantity')::int, 1) + %s AS new_quantity
+                FROM {self.table_name} el
+                WHERE el.guild_id = %s AND el.from_entity_id = %s AND el.link_type = 'possesses'
+                  AND {match_sql}
+                  {available_sql}
+                ORDER BY el.created_at
+                LIMIT 1
+                FOR UPDATE
+            ),
+            updated AS (
+                UPDATE {self.table_name} el
+                SET metadata = jsonb_set(COALESCE(el.metadata, '{{}}'::jsonb), '{{quantity}}', to_jsonb(locked.new_quantity))
+                FROM locked
+                WHERE el.id = locked.id AND locked.new_quantity > 0
+                RETURNING locked.to_entity_id, locked.new_quantity
+            ),
+            deleted AS (
+                DELETE FROM {self.table_name} el
+                USING locked
+                WHERE el.id = locked.id AND locked.new_quantity <= 0
+                RETURNING locked.to_entity_id, 0 AS new_quantity
+            )
+            SELECT * FROM updated
+            UNION ALL
+            SELECT * FROM deleted
+        """
+        params = (delta, str(guild_id), str(container_id)) + match_params + ((delta,) if require_available else ())
+        try:
+            with query_stats.track('EntityLinkRepository.adjust_possession_quantity', query) as timer:
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, params)
+                        row = cur.fetchone()
+                        timer.rows = 1 if row else 0
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+            return None
+
+        if not row:
+            return None
+        from data.repositories.repository_factory import repositories
+        item_id, new_quantity = row['to_entity_id'], int(row['new_quantity'])
+        if new_quantity > 0:
+            repositories.link_graph.update_metadata(guild_id, container_id, item_id, 'possesses', {'quantity': new_quantity}, replace=False)
+        else:
+            repositories.link_graph.remove_link(guild_id, container_id, item_id, 'possesses')
+        return item_id, new_quantity
+
     def update_metadata(self, link: EntityLink) -> EntityLink:
         """Update the metadata of an existing link"""
         query = f"""
@@ -158,4 +361,7 @@ class EntityLinkRepository(BaseRepository[EntityLink]):
             WHERE id = %s
         """
         self.execute_query(query, (json.dumps(link.metadata), link.id))
+
+        from data.repositories.repository_factory import repositories
+        repositories.link_graph.update_metadata(link.guild_id, link.from_entity_id, link.to_entity_id, link.link_type, link.metadata)
         return link
\ No newline at end of file
@@ -126,64 +126,13 @@ class EntityRepository(BaseRepository[Entity]):
             entities = self.execute_query(query, (str(guild_id),))
             return self._convert_list_to_base_entities(entities)
         
-        # Single optimized query for non-GM users
-        # Note: owner_id is only relevant for PCs, not for general entity access
-        access_query = f"""
-        WITH user_accessible AS (
-            -- User's own PCs (owner_id only matters for PCs)
-            SELECT e.* FROM {self.table_name} e 
-            WHERE e.guild_id = %s 
-            AND e.entity_type = 'pc'
-            AND e.owner_id = %s
-            
-            UNION
-            
-            -- All public entities (regardless of owner_id since it's not relevant for access)
-            SELECT e.* FROM {self.table_name} e 
-            WHERE e.guild_id = %s 
-            AND e.access_type = 'public'
-            AND NOT EXISTS (
-                -- Exclude if possessed by non-public entity
-                SELECT 1 FROM entity_links el 
-                JOIN {self.table_name} possessor ON possessor.id = el.from_entity_id
-                WHERE el.guild_id = %s 
-                AND el.to_entity_id = e.id 
-                AND el.link_type = 'possesses'
-                AND possessor.access_type != 'public'
-            )
-            AND NOT EXISTS (
-                -- Exclude if controlled by non-public entity
-                SELECT 1 FROM entity_links el 
-                JOIN {self.table_name} controller ON controller.id = el.from_entity_id
-                WHERE el.guild_id = %s 
-                AND el.to_entity_id = e.id 
-                AND el.link_type = 'controls'
-                AND controller.access_type != 'public'
-            )
-            
-            UNION
-            
-            -- Entities possessed/controlled by user's PCs
-            SELECT e.* FROM {self.table_name} e
-            JOIN entity_links el ON e.id = el.to_entity_id
-            JOIN {self.table_name} user_pc ON user_pc.id = el.from_entity_id
-            WHERE e.guild_id = %s 
-            AND el.guild_id = %s
-            AND user_pc.entity_type = 'pc'
-            AND user_pc.owner_id = %s
-            AND el.link_type IN ('possesses', 'controls')
-        )
-        SELECT DISTINCT * FROM user_accessible ORDER BY name
-        """
-        
-        entities = self.execute_query(access_query, (
-            str(guild_id), str(user_id),  # User's own PCs
-            str(guild_id),                # Public entities
-            str(guild_id),                # Possesses check
-            str(guild_id),                # Controls check
-            str(guild_id), str(guild_id), str(user_id)  # PC links
-        ), select_override=True)
-        
+        # Players see what the link graph's visibility index says, read back in one primary-key lookup
+        from .repository_factory import repositories
+        visible_ids = repositories.link_graph.get_visible_entity_ids(str(guild_id), str(user_id))
+        if not visible_ids:
+            return []
+        query = f"SELECT * FROM {self.table_name} WHERE id = ANY(%s) ORDER BY name"
+        entities = self.execute_query(query, (list(visible_ids),))
         return self._convert_list_to_base_entities(entities)
     
     def get_entities_controlled_by_user(self, guild_id: str, user_id: str) -> List[BaseEntity]:
@@ -233,6 +182,11 @@ class EntityRepository(BaseRepository[Entity]):
         )
         
         self.save(storage_entity, conflict_columns=['id'])
+        
+        from .repository_factory import repositories
+        repositories.name_index.set_entity_name(guild_id, entity.id, entity.name)
+        repositories.link_graph.set_entity(guild_id, entity.id, entity.owner_id, entity.entity_type.value, entity.access_type.value)
+        repositories.active_character.invalidate_character(entity.id)
     
     def delete_entity(self, guild_id: str, entity_id: str) -> None:
         """Delete an entity and all its links"""
@@ -248,9 +202,16 @@ class EntityRepository(BaseRepository[Entity]):
             # Delete the entity itself
             query = f"DELETE FROM {self.table_name} WHERE id = %s"
             self.execute_query(query, (entity_id,))
+            repositories.name_index.remove_entity(guild_id, entity_id)
+            repositories.link_graph.remove_entity(guild_id, entity_id)
+            repositories.active_character.invalidate_character(entity_id)
     
     def rename_entity(self, entity_id: str, new_name: str) -> bool:
         """Rename an entity"""
         query = f"UPDATE {self.table_name} SET name = %s WHERE id = %s"
         self.execute_query(query, (new_name, entity_id))
+        
+        from .repository_factory import repositories
+        repositories.name_index.rename_entity(entity_id, new_name)
+        repositories.active_character.invalidate_character(entity_id)
         return True
\ No newline at end of file
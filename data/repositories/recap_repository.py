@@ -1,6 +1,10 @@
-from typing import Optional, List
+import logging
+from typing import Dict, Optional, List
 from .base_repository import BaseRepository
-from data.models import AutoRecapSettings, ApiKey
+from data.cache import TTLCache
+from data.database import db_manager
+from data.query_stats import query_stats
+from data.models import AutoRecapSettings, ApiKey, RecapChunkSummary, StoryArchiveCoverage, StoryMessage
 
 class AutoRecapRepository(BaseRepository[AutoRecapSettings]):
     def __init__(self):
@@ -63,9 +67,187 @@ class AutoRecapRepository(BaseRepository[AutoRecapSettings]):
         results = self.execute_query(query)
         return [result.guild_id for result in results]
 
+class StoryMessageRepository(BaseRepository[StoryMessage]):
+    ROWS_PER_STATEMENT = 500
+
+    def __init__(self):
+        super().__init__('story_messages')
+    
+    def to_dict(self, entity: StoryMessage) -> dict:
+        return {
+            'channel_id': entity.channel_id,
+            'message_id': entity.message_id,
+            'part': entity.part,
+            'guild_id': entity.guild_id,
+            'created_at': entity.created_at,
+            'author': entity.author,
+            'content': entity.content
+        }
+    
+    def from_dict(self, data: dict) -> StoryMessage:
+        return StoryMessage(
+            channel_id=data['channel_id'],
+            message_id=data['message_id'],
+            part=data.get('part', 0),
+            guild_id=data['guild_id'],
+            created_at=data['created_at'],
+            author=data['author'],
+            content=data['content']
+        )
+    
+    def _insert_query(self, messages: List[StoryMessage]) -> str:
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(messages))
+        return f"""
+            INSERT INTO {self.table_name} (channel_id, message_id, part, guild_id, created_at, author, content)
+            VALUES {placeholders}
+            ON CONFLICT (channel_id, message_id, part) DO NOTHING
+        """
+    
+    def add_messages(self, messages: List[StoryMessage]) -> None:
+        """Archive story messages, ignoring any already archived"""
+        for start in range(0, len(messages), self.ROWS_PER_STATEMENT):
+            chunk = messages[start:start + self.ROWS_PER_STATEMENT]
+            params = tuple(value for message in chunk for value in self.to_dict(message).values())
+            self.execute_query(self._insert_query(chunk), params)
+    
+    def is_archived(self, channel_id: str, message_id: str) -> bool:
+        """Whether any part of a message is in the archive"""
+        query = f"SELECT * FROM {self.table_name} WHERE channel_id = %s AND message_id = %s LIMIT 1"
+        return self.execute_query(query, (str(channel_id), str(message_id)), fetch_one=True) is not None
+    
+    def replace_message(self, channel_id: str, message_id: str, messages: List[StoryMessage]) -> None:
+        """Swap an edited message's archived parts for its current ones, in one transaction"""
+        delete_query = f"DELETE FROM {self.table_name} WHERE channel_id = %s AND message_id = %s"
+        try:
+            with query_stats.track('StoryMessageRepository.replace_message', delete_query):
+                with db_manager.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(delete_query, (str(channel_id), str(message_id)))
+                        if messages:
+                            params = tuple(value for message in messages for value in self.to_dict(message).values())
+                            cur.execute(self._insert_query(messages), params)
+        except Exception as e:
+            logging.error(f"Database error: {e}")
+    
+    def delete_messages(self, channel_id: str, message_ids: List[str]) -> None:
+        """Remove deleted messages from the archive"""
+        query = f"DELETE FROM {self.table_name} WHERE channel_id = %s AND message_id = ANY(%s)"
+        self.execute_query(query, (str(channel_id), [str(message_id) for message_id in message_ids]))
+    
+    def delete_before(self, cutoff: float) -> None:
+        """Drop archived messages posted before a timestamp"""
+        query = f"DELETE FROM {self.table_name} WHERE created_at < %s"
+        self.execute_query(query, (cutoff,))
+    
+    def delete_guild(self, guild_id: str) -> None:
+        """Drop every archived message for a guild"""
+        query = f"DELETE FROM {self.table_name} WHERE guild_id = %s"
+        self.execute_query(query, (str(guild_id),))
+    
+    def get_window(self, channel_id: str, since: float, until: float) -> List[StoryMessage]:
+        """Get archived story messages in a channel between two timestamps, oldest first"""
+        query = f"""
+            SELECT * FROM {self.table_name}
+            WHERE channel_id = %s AND created_at >= %s AND created_at <= %s
+            ORDER BY created_at, part
+        """
+        return self.execute_query(query, (str(channel_id), since, until))
+
+class StoryArchiveCoverageRepository(BaseRepository[StoryArchiveCoverage]):
+    def __init__(self):
+        super().__init__('story_archive_coverage')
+    
+    def to_dict(self, entity: StoryArchiveCoverage) -> dict:
+        return {
+            'channel_id': entity.channel_id,
+            'guild_id': entity.guild_id,
+            'covered_from': entity.covered_from,
+            'covered_until': entity.covered_until
+        }
+    
+    def from_dict(self, data: dict) -> StoryArchiveCoverage:
+        return StoryArchiveCoverage(
+            channel_id=data['channel_id'],
+            guild_id=data['guild_id'],
+            covered_from=data['covered_from'],
+            covered_until=data['covered_until']
+        )
+    
+    def trim_before(self, cutoff: float) -> None:
+        """Stop claiming history before a timestamp once archived messages from then are dropped"""
+        query = f"DELETE FROM {self.table_name} WHERE covered_until < %s"
+        self.execute_query(query, (cutoff,))
+        query = f"UPDATE {self.table_name} SET covered_from = %s WHERE covered_from < %s"
+        self.execute_query(query, (cutoff, cutoff))
+    
+    def delete_guild(self, guild_id: str) -> None:
+        """Forget archived ranges for every channel in a guild"""
+        query = f"DELETE FROM {self.table_name} WHERE guild_id = %s"
+        self.execute_query(query, (str(guild_id),))
+    
+    def get_coverage(self, channel_id: str) -> Optional[StoryArchiveCoverage]:
+        """Get the archived time range for a channel"""
+        return self.find_by_id('channel_id', str(channel_id))
+    
+    def set_coverage(self, guild_id: str, channel_id: str, covered_from: float, covered_until: float) -> None:
+        """Record that a channel's history is archived between two timestamps"""
+        coverage = StoryArchiveCoverage(
+            channel_id=str(channel_id),
+            guild_id=str(guild_id),
+            covered_from=covered_from,
+            covered_until=covered_until
+        )
+        self.save(coverage, conflict_columns=['channel_id'])
+
+class RecapChunkSummaryRepository(BaseRepository[RecapChunkSummary]):
+    def __init__(self):
+        super().__init__('recap_chunk_summaries')
+    
+    def to_dict(self, entity: RecapChunkSummary) -> dict:
+        return {
+            'chunk_hash': entity.chunk_hash,
+            'guild_id': entity.guild_id,
+            'day': entity.day,
+            'summary': entity.summary
+        }
+    
+    def from_dict(self, data: dict) -> RecapChunkSummary:
+        return RecapChunkSummary(
+            chunk_hash=data['chunk_hash'],
+            guild_id=data['guild_id'],
+            day=data['day'],
+            summary=data['summary']
+        )
+    
+    def get_summaries(self, chunk_hashes: List[str]) -> Dict[str, str]:
+        """Get cached summaries for the given chunk hashes, keyed by hash"""
+        if not chunk_hashes:
+            return {}
+        query = f"SELECT * FROM {self.table_name} WHERE chunk_hash = ANY(%s)"
+        results = self.execute_query(query, (list(chunk_hashes),))
+        return {result.chunk_hash: result.summary for result in results}
+    
+    def save_summary(self, guild_id: str, chunk_hash: str, day: str, summary: str) -> None:
+        """Cache the summary of a chunk"""
+        self.save(RecapChunkSummary(chunk_hash=chunk_hash, guild_id=str(guild_id), day=day, summary=summary), conflict_columns=['chunk_hash'])
+    
+    def delete_before(self, day: str) -> None:
+        """Drop cached summaries for days before the given ISO date"""
+        query = f"DELETE FROM {self.table_name} WHERE day < %s"
+        self.execute_query(query, (day,))
+    
+    def delete_guild(self, guild_id: str) -> None:
+        """Drop every cached summary for a guild"""
+        query = f"DELETE FROM {self.table_name} WHERE guild_id = %s"
+        self.execute_query(query, (str(guild_id),))
+
 class ApiKeyRepository(BaseRepository[ApiKey]):
+    # Decrypted keys are kept briefly so status checks and recaps don't decrypt on every call
+    DECRYPTED_KEY_TTL_SECONDS = 300
+
     def __init__(self):
         super().__init__('api_keys')
+        self._key_cache = TTLCache(self.DECRYPTED_KEY_TTL_SECONDS)
     
     def to_dict(self, entity: ApiKey) -> dict:
         return {
@@ -81,11 +263,28 @@ class ApiKeyRepository(BaseRepository[ApiKey]):
     
     def get_openai_key(self, guild_id: str) -> Optional[str]:
         """Get OpenAI API key for a guild"""
-        from data.encryption import decrypt_api_key
+        found, api_key = self._key_cache.get(str(guild_id))
+        if found:
+            return api_key
+        
+        from data.encryption import decrypt_and_rotate_api_key
+        api_key = None
         api_key_entity = self.find_by_id('guild_id', str(guild_id))
         if api_key_entity and api_key_entity.openai_key:
-            return decrypt_api_key(api_key_entity.openai_key)
-        return None
+            api_key, rotated_key = decrypt_and_rotate_api_key(api_key_entity.openai_key)
+            if rotated_key:
+                # Stored under a previous master key, so re-encrypt it under the current one
+                self.save(ApiKey(guild_id=str(guild_id), openai_key=rotated_key), conflict_columns=['guild_id'])
+        self._key_cache.set(str(guild_id), api_key)
+        return api_key
+    
+    def has_openai_key(self, guild_id: str) -> bool:
+        """Check whether a guild has an OpenAI API key configured, without decrypting it"""
+        found, api_key = self._key_cache.get(str(guild_id))
+        if found:
+            return api_key is not None
+        api_key_entity = self.find_by_id('guild_id', str(guild_id))
+        return bool(api_key_entity and api_key_entity.openai_key)
 
     def set_openai_key(self, guild_id: str, api_key: str) -> None:
         """Set OpenAI API key for a guild, encrypting it before storage using cryptography"""
@@ -96,7 +295,9 @@ class ApiKeyRepository(BaseRepository[ApiKey]):
             openai_key=encrypted_key
         )
         self.save(key_entity, conflict_columns=['guild_id'])
+        self._key_cache.invalidate(str(guild_id))
     
     def remove_openai_key(self, guild_id: str) -> None:
         """Remove OpenAI API key for a guild"""
-        self.delete(F"guild_id = %s", (str(guild_id),))
\ No newline at end of file
+        self.delete(F"guild_id = %s", (str(guild_id),))
+        self._key_cache.invalidate(str(guild_id))
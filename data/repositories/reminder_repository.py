@@ -1,33 +1,122 @@
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from .base_repository import BaseRepository
-from data.models import Reminder, AutoReminderSettings, AutoReminderOptout, LastMessageTime
+from data.models import ScheduledReminder, AutoReminderSettings, AutoReminderOptout, LastMessageTime
+
+class ScheduledReminderRepository(BaseRepository[ScheduledReminder]):
+    # Claims older than this are assumed to belong to a sender that died and are released
+    CLAIM_TIMEOUT_SECONDS = 600
 
-class ReminderRepository(BaseRepository[Reminder]):
     def __init__(self):
-        super().__init__('reminders')
+        super().__init__('scheduled_reminders')
     
-    def to_dict(self, entity: Reminder) -> dict:
+    def to_dict(self, entity: ScheduledReminder) -> dict:
         return {
             'guild_id': entity.guild_id,
             'user_id': entity.user_id,
-            'timestamp': entity.timestamp
+            'kind': entity.kind,
+            'message': entity.message,
+            'reminder_time': entity.reminder_time,
+            'due_at': entity.due_at,
+            'claimed_at': entity.claimed_at
         }
     
-    def from_dict(self, data: dict) -> Reminder:
-        return Reminder(
+    def from_dict(self, data: dict) -> ScheduledReminder:
+        return ScheduledReminder(
+            id=data.get('id'),
             guild_id=data['guild_id'],
             user_id=data['user_id'],
-            timestamp=data['timestamp']
+            kind=data['kind'],
+            message=data.get('message'),
+            reminder_time=data['reminder_time'],
+            due_at=data['due_at'],
+            claimed_at=data.get('claimed_at')
         )
     
-    def set_reminder_time(self, guild_id: str, user_id: str, timestamp: float) -> None:
-        """Set reminder time for a user"""
-        reminder = Reminder(
-            guild_id=str(guild_id),
-            user_id=str(user_id),
-            timestamp=timestamp
+    def schedule_many(self, guild_id: str, user_ids: List[str], kind: str, reminder_time: float, due_at: float, message: str = None) -> List[ScheduledReminder]:
+        """Store the same reminder for several users in one statement"""
+        if not user_ids:
+            return []
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(user_ids))
+        query = f"""
+            INSERT INTO {self.table_name} (guild_id, user_id, kind, message, reminder_time, due_at)
+            VALUES {placeholders}
+            RETURNING *
+        """
+        params = tuple(
+            value
+            for user_id in user_ids
+            for value in (str(guild_id), str(user_id), kind, message, reminder_time, due_at)
         )
-        self.save(reminder, conflict_columns=['guild_id', 'user_id'])
+        return self.execute_query(query, params, select_override=True) or []
+    
+    def schedule_mention(self, guild_id: str, user_id: str, reminder_time: float, due_at: float) -> Optional[ScheduledReminder]:
+        """
+        Store an automatic mention reminder. A user has at most one pending per guild; mentioning them again
+        while one is pending moves its reminder time forward but keeps the original due time. One that's
+        already claimed for sending is left alone, and the new mention gets a reminder of its own.
+        """
+        query = f"""
+            INSERT INTO {self.table_name} (guild_id, user_id, kind, reminder_time, due_at)
+            VALUES (%s, %s, 'mention', %s, %s)
+            ON CONFLICT (guild_id, user_id) WHERE kind = 'mention' AND claimed_at IS NULL
+            DO UPDATE SET reminder_time = GREATEST({self.table_name}.reminder_time, EXCLUDED.reminder_time)
+            RETURNING *
+        """
+        return self.execute_query(query, (str(guild_id), str(user_id), reminder_time, due_at), fetch_one=True, select_override=True)
+    
+    def get_pending(self) -> List[ScheduledReminder]:
+        """Get all unclaimed reminders, soonest first"""
+        query = f"SELECT * FROM {self.table_name} WHERE claimed_at IS NULL ORDER BY due_at"
+        return self.execute_query(query)
+    
+    def claim_due(self, now: float, limit: int) -> List[ScheduledReminder]:
+        """Atomically claim up to limit reminders that are due"""
+        query = f"""
+            UPDATE {self.table_name}
+            SET claimed_at = %s
+            WHERE id IN (
+                SELECT id FROM {self.table_name}
+                WHERE claimed_at IS NULL AND due_at <= %s
+                ORDER BY due_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+        """
+        return self.execute_query(query, (now, now, limit), select_override=True) or []
+    
+    def release_stale_claims(self) -> int:
+        """
+        Make reminders claimed by a sender that never finished available again. A stale mention
+        reminder is dropped instead if the user has a pending or newer one, which covers it
+        (and would otherwise clash with it as the user's one pending mention).
+        """
+        query = f"""
+            WITH superseded AS (
+                DELETE FROM {self.table_name} stale
+                WHERE stale.kind = 'mention' AND stale.claimed_at IS NOT NULL AND stale.claimed_at < %s
+                  AND EXISTS (
+                      SELECT 1 FROM {self.table_name} other
+                      WHERE other.kind = 'mention' AND other.guild_id = stale.guild_id AND other.user_id = stale.user_id
+                        AND other.id != stale.id AND (other.claimed_at IS NULL OR other.id > stale.id)
+                  )
+                RETURNING id
+            )
+            UPDATE {self.table_name} SET claimed_at = NULL
+            WHERE claimed_at IS NOT NULL AND claimed_at < %s
+              AND id NOT IN (SELECT id FROM superseded)
+        """
+        cutoff = time.time() - self.CLAIM_TIMEOUT_SECONDS
+        return self.execute_query(query, (cutoff, cutoff)) or 0
+    
+    def delete_by_ids(self, reminder_ids: List[int]) -> None:
+        """Delete reminders that have been handled"""
+        if not reminder_ids:
+            return
+        query = f"DELETE FROM {self.table_name} WHERE id = ANY(%s)"
+        self.execute_query(query, (list(reminder_ids),))
 
 class AutoReminderSettingsRepository(BaseRepository[AutoReminderSettings]):
     def __init__(self):
@@ -95,8 +184,20 @@ class AutoReminderOptoutRepository(BaseRepository[AutoReminderOptout]):
         self.save(optout, conflict_columns=['guild_id', 'user_id'])
 
 class LastMessageTimeRepository(BaseRepository[LastMessageTime]):
+    """
+    Last message times are written behind: updates are coalesced in memory per
+    (guild_id, user_id) and written as one multi-row upsert by flush(), which runs
+    on a timer, when the buffer reaches FLUSH_THRESHOLD, and on shutdown.
+    """
+    FLUSH_THRESHOLD = 500
+    FLUSH_INTERVAL_SECONDS = 10
+    ROWS_PER_STATEMENT = 1000
+
     def __init__(self):
         super().__init__('last_message_times')
+        self._pending: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
     
     def to_dict(self, entity: LastMessageTime) -> dict:
         return {
@@ -113,16 +214,63 @@ class LastMessageTimeRepository(BaseRepository[LastMessageTime]):
         )
     
     def update_last_message_time(self, guild_id: str, user_id: str, timestamp: float) -> None:
-        """Update last message time for a user"""
-        last_msg = LastMessageTime(
-            guild_id=str(guild_id),
-            user_id=str(user_id),
-            timestamp=timestamp
-        )
-        self.save(last_msg, conflict_columns=['guild_id', 'user_id'])
+        """Buffer the last message time for a user. Flushes inline once the buffer is full."""
+        key = (str(guild_id), str(user_id))
+        with self._lock:
+            if timestamp > self._pending.get(key, float('-inf')):
+                self._pending[key] = timestamp
+            should_flush = len(self._pending) >= self.FLUSH_THRESHOLD
+        
+        if should_flush:
+            self.flush()
     
     def get_last_message_time(self, guild_id: str, user_id: str) -> Optional[float]:
-        """Get last message time for a user"""
+        """Get last message time for a user, including updates that haven't been flushed yet"""
+        with self._lock:
+            pending = self._pending.get((str(guild_id), str(user_id)))
+        if pending is not None:
+            return pending
+        
         query = f"SELECT * FROM {self.table_name} WHERE guild_id = %s AND user_id = %s"
         last_msg = self.execute_query(query, (str(guild_id), str(user_id)), fetch_one=True)
-        return last_msg.timestamp if last_msg else None
\ No newline at end of file
+        return last_msg.timestamp if last_msg else None
+    
+    def pending_count(self) -> int:
+        """Number of buffered updates waiting to be flushed"""
+        with self._lock:
+            return len(self._pending)
+    
+    def flush(self) -> int:
+        """Write all buffered updates with multi-row upserts. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending = self._pending
+                self._pending = {}
+            
+            rows = [(guild_id, user_id, timestamp) for (guild_id, user_id), timestamp in pending.items()]
+            written = 0
+            for start in range(0, len(rows), self.ROWS_PER_STATEMENT):
+                chunk = rows[start:start + self.ROWS_PER_STATEMENT]
+                placeholders = ', '.join(['(%s, %s, %s)'] * len(chunk))
+                query = f"""
+                    INSERT INTO {self.table_name} (guild_id, user_id, timestamp)
+                    VALUES {placeholders}
+                    ON CONFLICT (guild_id, user_id) DO UPDATE
+                    SET timestamp = GREATEST({self.table_name}.timestamp, EXCLUDED.timestamp)
+                """
+                params = tuple(value for row in chunk for value in row)
+                if self.execute_query(query, params) is None:
+                    # Write failed - put the rows back so the next flush retries them
+                    self._requeue(rows[start:])
+                    break
+                written += len(chunk)
+            return written
+    
+    def _requeue(self, rows) -> None:
+        with self._lock:
+            for guild_id, user_id, timestamp in rows:
+                key = (guild_id, user_id)
+                if timestamp > self._pending.get(key, float('-inf')):
+                    self._pending[key] = timestamp
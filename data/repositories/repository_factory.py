@@ -1,3 +1,6 @@
+from data.database import db_manager
+from data.link_graph import EntityLinkGraph
+from data.name_index import EntityNameIndex
 from data.repositories.entity_repository import EntityRepository
 from data.repositories.entity_link_repository import EntityLinkRepository
 from data.repositories.sticky_narration_repository import StickyNarrationRepository
@@ -9,10 +12,10 @@ from .character_repository import CharacterNicknameRepository, CharacterReposito
 from .scene_repository import SceneNotesRepository, SceneRepository, SceneNPCRepository, PinnedSceneMessageRepository
 from .initiative_repository import InitiativeRepository, ServerInitiativeDefaultsRepository
 from .reminder_repository import (
-    ReminderRepository, AutoReminderSettingsRepository, 
+    ScheduledReminderRepository, AutoReminderSettingsRepository, 
     AutoReminderOptoutRepository, LastMessageTimeRepository
 )
-from .recap_repository import AutoRecapRepository, ApiKeyRepository
+from .recap_repository import AutoRecapRepository, ApiKeyRepository, RecapChunkSummaryRepository, StoryArchiveCoverageRepository, StoryMessageRepository
 from .system_specific_repositories import (
     FateSceneAspectsRepository, FateSceneZonesRepository, FateGameAspectsRepository, 
     MGT2ESceneEnvironmentRepository, DefaultSkillsRepository, FateZoneAspectsRepository
@@ -40,7 +43,7 @@ class RepositoryFactory:
         self._server_initiative_defaults_repo = None
         
         # Reminder repositories
-        self._reminder_repo = None
+        self._scheduled_reminder_repo = None
         self._auto_reminder_settings_repo = None
         self._auto_reminder_optout_repo = None
         self._last_message_time_repo = None
@@ -48,6 +51,9 @@ class RepositoryFactory:
         # Recap repositories
         self._auto_recap_repo = None
         self._api_key_repo = None
+        self._story_message_repo = None
+        self._story_archive_coverage_repo = None
+        self._recap_chunk_summary_repo = None
         
         # System-specific repositories
         self._fate_aspects_repo = None
@@ -72,6 +78,12 @@ class RepositoryFactory:
         # Sticky narration repository
         self._sticky_narration_repo = None
 
+        # Entity name/nickname index
+        self._name_index = None
+
+        # Entity link graph
+        self._link_graph = None
+
     # Core repositories
     @property
     def server(self) -> "ServerRepository":
@@ -144,10 +156,10 @@ class RepositoryFactory:
     
     # Reminder repositories
     @property
-    def reminder(self) -> "ReminderRepository":
-        if self._reminder_repo is None:
-            self._reminder_repo = ReminderRepository()
-        return self._reminder_repo
+    def scheduled_reminder(self) -> "ScheduledReminderRepository":
+        if self._scheduled_reminder_repo is None:
+            self._scheduled_reminder_repo = ScheduledReminderRepository()
+        return self._scheduled_reminder_repo
     
     @property
     def auto_reminder_settings(self) -> "AutoReminderSettingsRepository":
@@ -180,6 +192,24 @@ class RepositoryFactory:
             self._api_key_repo = ApiKeyRepository()
         return self._api_key_repo
     
+    @property
+    def story_message(self) -> "StoryMessageRepository":
+        if self._story_message_repo is None:
+            self._story_message_repo = StoryMessageRepository()
+        return self._story_message_repo
+    
+    @property
+    def story_archive_coverage(self) -> "StoryArchiveCoverageRepository":
+        if self._story_archive_coverage_repo is None:
+            self._story_archive_coverage_repo = StoryArchiveCoverageRepository()
+        return self._story_archive_coverage_repo
+    
+    @property
+    def recap_chunk_summary(self) -> "RecapChunkSummaryRepository":
+        if self._recap_chunk_summary_repo is None:
+            self._recap_chunk_summary_repo = RecapChunkSummaryRepository()
+        return self._recap_chunk_summary_repo
+    
     # System-specific repositories
     @property
     def fate_aspects(self) -> "FateSceneAspectsRepository":
@@ -252,5 +282,28 @@ class RepositoryFactory:
             self._sticky_narration_repo = StickyNarrationRepository()
         return self._sticky_narration_repo
 
+    # Entity name/nickname index
+    @property
+    def name_index(self) -> "EntityNameIndex":
+        if self._name_index is None:
+            self._name_index = EntityNameIndex()
+        return self._name_index
+
+    # Entity link graph
+    @property
+    def link_graph(self) -> "EntityLinkGraph":
+        if self._link_graph is None:
+            self._link_graph = EntityLinkGraph()
+        return self._link_graph
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Await a synchronous repository method without blocking the event loop.
+
+        Usage:
+            character = await repositories.run(repositories.character.get_by_id, character_id)
+        """
+        return await db_manager.run(func, *args, **kwargs)
+
 # Global repository factory instance
 repositories = RepositoryFactory()
\ No newline at end of file
@@ -1,6 +1,8 @@
 from typing import List, Optional
 from .base_repository import BaseRepository
 from data.models import Scene, SceneNPC, PinnedSceneMessage, SceneNotes
+from data.database import db_manager
+from data.query_stats import query_stats
 import time
 import uuid
 
@@ -70,18 +72,21 @@ class SceneRepository(BaseRepository[Scene]):
     
     def set_active_scene(self, guild_id: str, scene_id: str) -> None:
         """Set a scene as active and deactivate all others"""
-        with self.db_manager.get_connection() as conn:
-            with conn.cursor() as cur:
-                # Deactivate all scenes in guild
-                cur.execute(
-                    f"UPDATE {self.table_name} SET is_active = false WHERE guild_id = %s",
-                    (str(guild_id),)
-                )
-                # Activate the specified scene
-                cur.execute(
-                    f"UPDATE {self.table_name} SET is_active = true WHERE guild_id = %s AND scene_id = %s",
-                    (str(guild_id), str(scene_id))
-                )
+        with query_stats.track('SceneRepository.set_active_scene') as timer:
+            with db_manager.get_connection() as conn:
+                with conn.cursor() as cur:
+                    # Deactivate all scenes in guild
+                    cur.execute(
+                        f"UPDATE {self.table_name} SET is_active = false WHERE guild_id = %s",
+                        (str(guild_id),)
+                    )
+                    timer.rows = cur.rowcount
+                    # Activate the specified scene
+                    cur.execute(
+                        f"UPDATE {self.table_name} SET is_active = true WHERE guild_id = %s AND scene_id = %s",
+                        (str(guild_id), str(scene_id))
+                    )
+                    timer.rows += cur.rowcount
     
     def rename_scene(self, guild_id: str, scene_id: str, new_name: str) -> None:
         """Rename a scene"""
@@ -1,15 +1,23 @@
 from typing import Optional
+import dataclasses
 import json
 
 from core.base_models import SystemType
 from core.generic_roll_mechanics import RollMechanicConfig
 from .base_repository import BaseRepository
 from data.models import ServerSettings
+from data.database import db_manager
+from data.cache import TTLCache
 import discord
 
 class ServerRepository(BaseRepository[ServerSettings]):
+    # Settings change rarely but are read on nearly every command, so they are cached per guild.
+    # The set_* methods invalidate explicitly; the TTL covers edits made outside this process.
+    SETTINGS_TTL_SECONDS = 300
+
     def __init__(self):
         super().__init__('server_settings')
+        self._settings_cache = TTLCache(self.SETTINGS_TTL_SECONDS)
     
     def to_dict(self, entity: ServerSettings) -> dict:
         return {
@@ -40,8 +48,36 @@ class ServerRepository(BaseRepository[ServerSettings]):
     
     def get_by_guild_id(self, guild_id: str) -> Optional[ServerSettings]:
         """Get server settings by guild ID"""
+        found, settings = self._settings_cache.get(str(guild_id))
+        if not found:
+            settings = self._load_settings(str(guild_id))
+        # Hand out a copy so callers that modify settings before saving can't alter the cache
+        return dataclasses.replace(settings) if settings else None
+
+    async def get_by_guild_id_async(self, guild_id: str) -> Optional[ServerSettings]:
+        """Get server settings, only leaving the event loop when they aren't cached"""
+        found, settings = self._settings_cache.get(str(guild_id))
+        if not found:
+            settings = await db_manager.run(self._load_settings, str(guild_id))
+        return dataclasses.replace(settings) if settings else None
+
+    def _load_settings(self, guild_id: str) -> Optional[ServerSettings]:
         query = f"SELECT * FROM {self.table_name} WHERE guild_id = %s"
-        return self.execute_query(query, (str(guild_id),), fetch_one=True)
+        settings = self.execute_query(query, (guild_id,), fetch_one=True)
+        self._settings_cache.set(guild_id, settings)
+        return settings
+
+    def invalidate_settings(self, guild_id: str) -> None:
+        """Drop cached settings for a guild so the next read goes to the database"""
+        self._settings_cache.invalidate(str(guild_id))
+
+    def get_cache_stats(self) -> dict:
+        """Hit/miss counters for the server settings cache"""
+        return self._settings_cache.get_stats()
+
+    def _save_settings(self, server: ServerSettings) -> None:
+        self.save(server, conflict_columns=['guild_id'])
+        self.invalidate_settings(server.guild_id)
     
     def get_system(self, guild_id: int) -> SystemType:
         """Get the RPG system for a guild"""
@@ -50,7 +86,7 @@ class ServerRepository(BaseRepository[ServerSettings]):
 
     async def has_gm_permission(self, guild_id: int, user: discord.Member) -> bool:
         """Check if user has GM permissions"""
-        server_settings = self.get_by_guild_id(str(guild_id))
+        server_settings = await self.get_by_guild_id_async(guild_id)
         if server_settings and server_settings.gm_role_id:
             gm_role = user.guild.get_role(int(server_settings.gm_role_id))
             if gm_role and gm_role in user.roles:
@@ -60,7 +96,7 @@ class ServerRepository(BaseRepository[ServerSettings]):
     
     async def has_player_or_gm_permission(self, guild_id: int, user: discord.Member) -> bool:
         """Check if user has player or GM permissions"""
-        server_settings = self.get_by_guild_id(str(guild_id))
+        server_settings = await self.get_by_guild_id_async(guild_id)
         if server_settings:
             player_role = user.guild.get_role(int(server_settings.player_role_id)) if server_settings.player_role_id else None
             gm_role = user.guild.get_role(int(server_settings.gm_role_id)) if server_settings.gm_role_id else None
@@ -76,8 +112,8 @@ class ServerRepository(BaseRepository[ServerSettings]):
         if server:
             server.system = system.value
         else:
-            server = ServerSettings(guild_id=guild_id, system=system.value)
-        self.save(server, conflict_columns=['guild_id'])
+            server = ServerSettings(guild_id=str(guild_id), system=system.value)
+        self._save_settings(server)
     
     def get_gm_role_id(self, guild_id: int) -> Optional[str]:
         """Get GM role ID for a guild"""
@@ -88,7 +124,7 @@ class ServerRepository(BaseRepository[ServerSettings]):
         """Set GM role for a guild"""
         server = self.get_by_guild_id(str(guild_id)) or ServerSettings(guild_id=str(guild_id))
         server.gm_role_id = str(role_id)
-        self.save(server, conflict_columns=['guild_id'])
+        self._save_settings(server)
     
     def get_player_role_id(self, guild_id: int) -> Optional[str]:
         """Get player role ID for a guild"""
@@ -99,7 +135,7 @@ class ServerRepository(BaseRepository[ServerSettings]):
         """Set player role for a guild"""
         server = self.get_by_guild_id(str(guild_id)) or ServerSettings(guild_id=str(guild_id))
         server.player_role_id = str(role_id)
-        self.save(server, conflict_columns=['guild_id'])
+        self._save_settings(server)
 
     def get_generic_base_roll(self, guild_id: int) -> Optional[int]:
         """Get the generic base roll for a guild"""
@@ -110,12 +146,12 @@ class ServerRepository(BaseRepository[ServerSettings]):
         """Set the generic base roll for a guild"""
         server = self.get_by_guild_id(str(guild_id)) or ServerSettings(guild_id=str(guild_id))
         server.generic_base_roll = base_roll
-        self.save(server, conflict_columns=['guild_id'])
+        self._save_settings(server)
 
     def get_core_roll_mechanic(self, guild_id: str) -> Optional[RollMechanicConfig]:
         """Get the core roll mechanic configuration for a guild"""
         server = self.get_by_guild_id(guild_id)
-        if server.core_roll_mechanic:
+        if server and server.core_roll_mechanic:
             return RollMechanicConfig.from_dict(server.core_roll_mechanic)
         return None
     
@@ -136,4 +172,4 @@ class ServerRepository(BaseRepository[ServerSettings]):
             server.core_roll_mechanic = config
         
         # Save with conflict resolution on guild_id
-        self.save(server, conflict_columns=['guild_id'])
\ No newline at end of file
+        self._save_settings(server)
\ No newline at end of file
@@ -1,6 +1,6 @@
 import json
-from typing import Optional
-from data.models import EntityDetails
+from typing import Dict, Iterable, Optional
+from data.models import EntityDetails, EntityLinkSummary
 from data.repositories.base_repository import BaseRepository
 
 
@@ -41,4 +41,42 @@ class EntityDetailsRepository(BaseRepository[EntityDetails]):
         )
     
     def get_by_id(self, entity_id: str) -> Optional[EntityDetails]:
-        return self.find_by_id('id', entity_id)
\ No newline at end of file
+        return self.find_by_id('id', entity_id)
+
+    def get_link_summary(self, guild_id: str, entity_id: str) -> EntityLinkSummary:
+        """An entity's possession and control links, without querying the view"""
+        return self.get_link_summaries(guild_id, [entity_id])[str(entity_id)]
+
+    def get_link_summaries(self, guild_id: str, entity_ids: Iterable[str]) -> Dict[str, EntityLinkSummary]:
+        """
+        Link summaries for many entities at once, built from the in-memory link graph and name index
+        (both kept current on every link and entity change) instead of the view's per-row subqueries.
+        """
+        from data.repositories.repository_factory import repositories
+        graph = repositories.link_graph
+        guild_id = str(guild_id)
+
+        linked_ids = {}
+        for entity_id in map(str, entity_ids):
+            linked_ids[entity_id] = {
+                'possessed_items': graph.get_child_ids(guild_id, entity_id, 'possesses'),
+                'possessed_by': graph.get_parent_ids(guild_id, entity_id, 'possesses'),
+                'controls': graph.get_child_ids(guild_id, entity_id, 'controls'),
+                'controlled_by': graph.get_parent_ids(guild_id, entity_id, 'controls'),
+            }
+
+        all_ids = {other for groups in linked_ids.values() for ids in groups.values() for other in ids}
+        names = repositories.name_index.get_entity_names(guild_id, all_ids)
+        entity_types = graph.get_entity_types(guild_id, all_ids)
+
+        summaries = {}
+        for entity_id, groups in linked_ids.items():
+            summary = EntityLinkSummary(entity_id)
+            for field_name, ids in groups.items():
+                entries = [
+                    {'id': other, 'name': names[other], 'entity_type': entity_types.get(other)}
+                    for other in ids if other in names
+                ]
+                setattr(summary, field_name, sorted(entries, key=lambda entry: entry['name'].casefold()))
+            summaries[entity_id] = summary
+        return summaries
\ No newline at end of file
@@ -1,6 +1,8 @@
 
 -- This SQL script creates a view that aggregates entity details along with their links
 -- Update this if you add new link types or entity attributes
+-- The bot itself reads link summaries from the in-memory link graph (EntityDetailsRepository.get_link_summaries);
+-- this view remains for ad-hoc queries and reporting
 CREATE OR REPLACE VIEW vw_entity_details AS
 SELECT 
     e.id,
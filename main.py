@@ -1,13 +1,16 @@
 import os
+import asyncio
 import logging
 import re
 import dotenv
 import discord
 from discord.ext import commands
 from commands import message_context_menu, narration_commands, user_context_menu
-from commands.narration import can_user_speak_as_character, process_narration, send_narration_webhook
+from commands.narration import can_user_speak_as_character, preload_narration_webhooks, process_narration, refresh_narration_webhook, send_narration_webhook
 from commands import character_commands, entity_commands, help_commands, initiative_commands, link_commands, reminder_commands, roll_commands, scene_commands, setup_commands, recap_commands, rules_commands
 from rpg_systems.fate import fate_commands
+from core.dm_dispatcher import dm_dispatcher
+from core.story_archive import archive_story_message, forget_guild_story, is_archived_post, mark_live_capture_started, refresh_archived_story_message, remove_archived_story_messages
 from core.initiative_views import GenericInitiativeView, PopcornInitiativeView
 from core.scene_views import GenericSceneView
 from rpg_systems.fate.fate_scene_views import FateSceneView
@@ -74,12 +77,48 @@ async def setup_hook():
     bot.add_view(FateSceneView())
     bot.add_view(MGT2ESceneView())
 
+    # Background write-behind for last message times
+    bot.loop.create_task(flush_last_message_times())
+    
+    # Rate-limited queue for reminder DMs
+    dm_dispatcher.start(bot)
+
     # Sync the command tree
     await bot.tree.sync()
 
+async def flush_last_message_times():
+    """Periodically write buffered last message times to the database"""
+    from data.repositories.repository_factory import repositories
+    await bot.wait_until_ready()
+
+    while not bot.is_closed():
+        await asyncio.sleep(repositories.last_message_time.FLUSH_INTERVAL_SECONDS)
+        try:
+            await repositories.run(repositories.last_message_time.flush)
+        except Exception as e:
+            logging.error(f"Error flushing last message times: {e}")
+
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user} ({bot.user.name})!')
+    
+    # New IC posts are archived from here on, so recaps only backfill history from before now
+    mark_live_capture_started()
+
+    # Optionally warm the narration webhook registry for IC channels
+    if os.getenv('PRELOAD_NARRATION_WEBHOOKS', 'false').lower() in ('1', 'true', 'yes'):
+        count = await preload_narration_webhooks(bot)
+        print(f"Preloaded {count} narration webhooks.")
+
+@bot.event
+async def on_webhooks_update(channel):
+    # A webhook in this channel was created, changed or deleted - drop ours if it's gone
+    await refresh_narration_webhook(channel)
+
+@bot.event
+async def on_guild_remove(guild):
+    # Story posts archived for recaps aren't kept once the bot leaves
+    await forget_guild_story(guild.id)
 
 @bot.event
 async def on_guild_join(guild):
@@ -110,12 +149,17 @@ async def on_message(message: discord.Message):
     from data.repositories.repository_factory import repositories
     
     if message.webhook_id:
+        # Narration webhook posts are story content for recaps
+        await archive_story_message(message, bot.user.id)
         return
 
     # Update the last message time for the user
     if message.guild:
         if message.author.id != bot.user.id:
-            repositories.last_message_time.update_last_message_time(str(message.guild.id), str(message.author.id), message.created_at.timestamp())
+            await repositories.run(
+                repositories.last_message_time.update_last_message_time,
+                str(message.guild.id), str(message.author.id), message.created_at.timestamp()
+            )
     
     # Handle mentions for automatic reminders (only for non-narration messages)
     if message.guild and message.mentions:
@@ -127,7 +171,7 @@ async def on_message(message: discord.Message):
     if message.guild and message.author.id != bot.user.id:
         # For threads, check the parent channel's type
         channel_to_check = message.channel.parent if isinstance(message.channel, discord.Thread) else message.channel
-        channel_type = repositories.channel_permissions.get_channel_type(str(message.guild.id), str(channel_to_check.id))
+        channel_type = await repositories.channel_permissions.get_channel_type_async(str(message.guild.id), str(channel_to_check.id))
         
         if channel_type == 'ic':
             # Process narration
@@ -144,26 +188,31 @@ async def on_message(message: discord.Message):
                 return
             else:
                 # Check for sticky character in this channel
-                sticky_char_id = repositories.sticky_narration.get_sticky_character(
+                sticky_char_id = await repositories.run(
+                    repositories.sticky_narration.get_sticky_character,
                     str(message.guild.id), 
                     str(message.author.id), 
                     str(channel_to_check.id) # Use the parent channel if we are in a thread
                 )
                 if sticky_char_id:
                     # Get the character and process as normal narration
-                    char = repositories.character.get_by_id(sticky_char_id)
+                    char = await repositories.run(repositories.character.get_by_id, sticky_char_id)
                     if char and await can_user_speak_as_character(str(message.guild.id), message.author.id, char):
                         await send_narration_webhook(message, char, message.content)
                         await message.delete()
                         return
 
+    # Narration and sticky posts returned above; they're archived when their webhook copy arrives
+    await archive_story_message(message, bot.user.id)
+
     await bot.process_commands(message)
 
 @bot.event
 async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
     """Handle raw message edits to catch edits on uncached messages."""
-    # Don't process edits from bots
-    if payload.cached_message and payload.cached_message.author.bot:
+    # Edits from bots only matter to the story archive (e.g. narration edited through the bot's webhook)
+    bot_edit = payload.cached_message is not None and payload.cached_message.author.bot
+    if bot_edit and not await is_archived_post(payload.cached_message):
         return
         
     try:
@@ -172,6 +221,13 @@ async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
     except (discord.NotFound, discord.Forbidden):
         return
 
+    # Keep the story archive in step with the edit
+    await refresh_archived_story_message(after, bot.user.id)
+
+    # Don't process edits from bots
+    if bot_edit:
+        return
+
     # Ignore edits from the bot itself
     if after.author.id == bot.user.id:
         return
@@ -199,6 +255,16 @@ async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
     # If you want to process commands on edit, you can do so here.
     await bot.process_commands(after)
 
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    if payload.guild_id:
+        await remove_archived_story_messages(payload.channel_id, [payload.message_id])
+
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    if payload.guild_id:
+        await remove_archived_story_messages(payload.channel_id, payload.message_ids)
+
 @bot.command()
 async def myguild(ctx: commands.Context):
     await ctx.send(f"This server's guild_id is {ctx.guild.id}")
@@ -207,4 +273,9 @@ is_deployment = os.getenv("RAILWAY_ENVIRONMENT") is not None
 log_level = logging.INFO if is_deployment else logging.DEBUG
 
 handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
-bot.run(os.getenv("DISCORD_BOT_TOKEN"), log_handler=handler, log_level=log_level)
\ No newline at end of file
+try:
+    bot.run(os.getenv("DISCORD_BOT_TOKEN"), log_handler=handler, log_level=log_level)
+finally:
+    from data.repositories.repository_factory import repositories
+    repositories.last_message_time.flush()
+    db_manager.close()
\ No newline at end of file
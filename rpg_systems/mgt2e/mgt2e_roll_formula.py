@@ -1,8 +1,7 @@
-import random
-import re
 from typing import Dict
 from dataclasses import dataclass
 from core.base_models import RollFormula
+from core.dice_expression import compile_dice_expression, is_dice_expression
 from typing import TYPE_CHECKING
 
 from core.generic_roll_mechanics import CoreRollMechanicType, RollMechanicConfig, SuccessCriteria
@@ -143,7 +142,7 @@ class MGT2ERollFormula(RollFormula):
         total_numeric_modifier = 0
         
         for key, value in self.modifiers.items():
-            if isinstance(value, str) and re.match(r'^\d*d\d+', value.replace(" ", "")):
+            if is_dice_expression(value):
                 formula += f"+{value}"
             else:
                 if not isinstance(value, bool):
@@ -159,37 +158,37 @@ class MGT2ERollFormula(RollFormula):
 
         return formula
 
+    def to_batch_request(self, character: "MGT2ECharacter", difficulty: int = None):
+        """Boons and banes become keep-highest/lowest 2 of 3d6"""
+        net_effect = self.boon_bane.net_effect
+        formula = "3d6kh2" if net_effect > 0 else "3d6kl2" if net_effect < 0 else "2d6"
+        modifiers = {key: value for key, value in self.get_modifiers(character).items() if key != "Boon/Bane"}
+        return self._batch_request(character, formula, modifiers, difficulty)
+
     def roll_formula(self, character: "MGT2ECharacter", base_roll: str) -> tuple:
         """Execute MGT2E boon/bane rolling mechanics"""
         
         # For MGT2E, the base roll should be 2d6, but we'll roll 3d6 for boons/banes
         if not base_roll.startswith("2d6"):
             # If it's not a 2d6 roll, fall back to standard mechanics
-            return super().roll_formula(character, base_roll, self)
+            return super().roll_formula(character, base_roll)
         
-        # Roll 3d6 for boon/bane mechanics
-        dice_rolls = [random.randint(1, 6) for _ in range(3)]
-        dice_rolls.sort()
-        
-        # Determine which dice to keep based on net boon/bane effect
+        # Roll 3d6 for boon/bane mechanics, keeping the best or worst 2
         net_effect = self.boon_bane.net_effect
-        
         if net_effect > 0:  # Boons - keep highest 2
-            dice_rolls = [random.randint(1, 6) for _ in range(3)]
-            dice_rolls.sort()
-            kept_dice = dice_rolls[-2:]
-            boon_bane_instruction = f"Boon"
+            dice_formula, boon_bane_instruction = "3d6kh2", "Boon"
         elif net_effect < 0:  # Banes - keep lowest 2
-            dice_rolls = [random.randint(1, 6) for _ in range(3)]
+            dice_formula, boon_bane_instruction = "3d6kl2", "Bane"
+        else:  # Cancel out - standard roll
+            dice_formula, boon_bane_instruction = "2d6", ""
+
+        rolled = compile_dice_expression(dice_formula).roll()[0]
+        dice_rolls = [chain[0] for chain in rolled.dice]
+        kept_dice = sorted(chain[0] for chain, kept in zip(rolled.dice, rolled.kept) if kept)
+        if boon_bane_instruction:
             dice_rolls.sort()
-            kept_dice = dice_rolls[:2]
-            boon_bane_instruction = f"Bane"
-        else:  # Cancel out - keep first 2 (standard roll)
-            dice_rolls = [random.randint(1, 6) for _ in range(2)]
-            kept_dice = dice_rolls
-            boon_bane_instruction = ""
-        
-        base_total = sum(kept_dice)
+        
+        base_total = rolled.total
         
         # Calculate other modifiers (excluding boon/bane)
         modifier_descriptions = []
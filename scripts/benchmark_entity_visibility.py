@@ -0,0 +1,127 @@
+"""
+Compare the old SQL visibility query for /entity list against the link graph's visibility index.
+
+Seeds a throwaway guild with ENTITY_COUNT entities and a realistic spread of possesses/controls links,
+prints EXPLAIN ANALYZE for the old three-way UNION and for the indexed read that replaced it,
+times the in-memory index, then deletes the guild again.
+
+Run from the repository root against a development database (uses the same .env settings as the bot):
+    python -m scripts.benchmark_entity_visibility
+"""
+import random
+import time
+import uuid
+import dotenv
+
+dotenv.load_dotenv()
+
+from data.database import db_manager
+from data.repositories.repository_factory import repositories
+
+ENTITY_COUNT = 10000
+PLAYER_COUNT = 20
+
+OLD_ACCESS_QUERY = """
+    WITH user_accessible AS (
+        SELECT e.* FROM entities e
+        WHERE e.guild_id = %(guild)s AND e.entity_type = 'pc' AND e.owner_id = %(user)s
+        UNION
+        SELECT e.* FROM entities e
+        WHERE e.guild_id = %(guild)s AND e.access_type = 'public'
+        AND NOT EXISTS (
+            SELECT 1 FROM entity_links el JOIN entities possessor ON possessor.id = el.from_entity_id
+            WHERE el.guild_id = %(guild)s AND el.to_entity_id = e.id AND el.link_type = 'possesses'
+            AND possessor.access_type != 'public'
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM entity_links el JOIN entities controller ON controller.id = el.from_entity_id
+            WHERE el.guild_id = %(guild)s AND el.to_entity_id = e.id AND el.link_type = 'controls'
+            AND controller.access_type != 'public'
+        )
+        UNION
+        SELECT e.* FROM entities e
+        JOIN entity_links el ON e.id = el.to_entity_id
+        JOIN entities user_pc ON user_pc.id = el.from_entity_id
+        WHERE e.guild_id = %(guild)s AND el.guild_id = %(guild)s
+        AND user_pc.entity_type = 'pc' AND user_pc.owner_id = %(user)s
+        AND el.link_type IN ('possesses', 'controls')
+    )
+    SELECT DISTINCT * FROM user_accessible ORDER BY name
+"""
+
+NEW_ACCESS_QUERY = "SELECT * FROM entities WHERE id = ANY(%(ids)s) ORDER BY name"
+
+def seed(cur, guild_id: str) -> None:
+    """Players' PCs each carry items and a companion; NPCs and containers carry items; ~10% is GM only"""
+    rng = random.Random(42)
+    players = [str(1000 + i) for i in range(PLAYER_COUNT)]
+    entities, links = [], []
+    holders = []
+    for i in range(ENTITY_COUNT):
+        entity_id = str(uuid.uuid4())
+        roll = rng.random()
+        if i < PLAYER_COUNT * 3:
+            entity_type, owner = 'pc', players[i % PLAYER_COUNT]
+        elif roll < 0.15:
+            entity_type, owner = 'npc', 'gm'
+        elif roll < 0.2:
+            entity_type, owner = 'container', 'gm'
+        elif roll < 0.25:
+            entity_type, owner = 'companion', 'gm'
+        else:
+            entity_type, owner = 'item', 'gm'
+        access = 'gm_only' if entity_type != 'pc' and rng.random() < 0.1 else 'public'
+        entities.append((entity_id, guild_id, f"Entity {i:05d}", owner, entity_type, 'generic', access))
+
+        if entity_type in ('pc', 'npc', 'container'):
+            holders.append((entity_id, entity_type))
+        elif holders and rng.random() < 0.8:
+            holder_id, holder_type = rng.choice(holders)
+            link_type = 'controls' if entity_type == 'companion' and holder_type == 'pc' else 'possesses'
+            links.append((str(uuid.uuid4()), guild_id, holder_id, entity_id, link_type))
+
+    cur.executemany(
+        "INSERT INTO entities (id, guild_id, name, owner_id, entity_type, system, access_type) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        entities
+    )
+    cur.executemany(
+        "INSERT INTO entity_links (id, guild_id, from_entity_id, to_entity_id, link_type) VALUES (%s, %s, %s, %s, %s)",
+        links
+    )
+    print(f"Seeded {len(entities)} entities and {len(links)} links")
+
+def explain(cur, title: str, query: str, params: dict) -> None:
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+    plan = [row['QUERY PLAN'] for row in cur.fetchall()]
+    print(f"\n=== {title} ===")
+    print("\n".join(plan))
+
+def main() -> None:
+    guild_id = f"benchmark-{uuid.uuid4()}"
+    user_id = "1000"
+    with db_manager.get_connection() as conn:
+        with conn.cursor() as cur:
+            seed(cur, guild_id)
+    try:
+        start = time.perf_counter()
+        visible_ids = repositories.link_graph.get_visible_entity_ids(guild_id, user_id)
+        first_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for _ in range(100):
+            repositories.link_graph.get_visible_entity_ids(guild_id, user_id)
+        warm_ms = (time.perf_counter() - start) * 10
+        print(f"Visibility index: {len(visible_ids)} visible • first call (loads the guild) {first_ms:.1f}ms • warm {warm_ms:.3f}ms")
+
+        with db_manager.get_connection() as conn:
+            with conn.cursor() as cur:
+                explain(cur, "Old: UNION with correlated NOT EXISTS", OLD_ACCESS_QUERY, {'guild': guild_id, 'user': user_id})
+                explain(cur, "New: visible ids by primary key", NEW_ACCESS_QUERY, {'ids': list(visible_ids)})
+    finally:
+        with db_manager.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM entity_links WHERE guild_id = %s", (guild_id,))
+                cur.execute("DELETE FROM entities WHERE guild_id = %s", (guild_id,))
+        repositories.link_graph.invalidate_guild(guild_id)
+
+if __name__ == "__main__":
+    main()